@@ -10,7 +10,15 @@ def create_app():
     Cria e configura uma instância da aplicação Flask (Application Factory).
     """
     app = Flask(__name__)
-    CORS(app)
+
+    from .database import WRITE_LSN_HEADER, add_write_lsn_header
+    CORS(app, expose_headers=[WRITE_LSN_HEADER])
+
+    from .json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app)
+
+    from . import metrics
+    metrics.init_app(app)
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'sua_chave_secreta_muito_segura_para_desenvolvimento')
 
 
@@ -22,6 +30,9 @@ def create_app():
         if db is not None:
             db.close()
 
+    # Envia ao cliente o LSN das escritas feitas na requisição
+    app.after_request(add_write_lsn_header)
+
     # Importa e registra os Blueprints
     from .auth import routes as auth_routes
     from .api import routes as api_routes
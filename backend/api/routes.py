@@ -1,11 +1,12 @@
 # backend/api/routes.py
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, send_file
 from pydantic import ValidationError
-from ..database import get_db
+from ..database import get_db, get_pool_stats, read_only, mark_primary_write
 from ..auth.decorators import jwt_required
-from ..services import unit_service, summary_service, reading_service, veiculo_service
-from .schemas import ProcessReadingsPayload, VeiculoCreate, VeiculoUpdate
+from ..services import unit_service, summary_service, reading_service, veiculo_service, job_service, export_service
+from ..services.pagination import clamp_limit, decode_cursor, encode_cursor, page_response
+from .schemas import ProcessReadingsPayload, TariffSimulationPayload, VeiculoCreate, VeiculoUpdate
 
 api_bp = Blueprint('api_bp', __name__)
 
@@ -13,6 +14,7 @@ api_bp = Blueprint('api_bp', __name__)
 
 @api_bp.route('/units', methods=['GET'])
 @jwt_required
+@read_only
 def get_all_units():
     db = get_db()
     user_id = request.user_id
@@ -21,14 +23,21 @@ def get_all_units():
 
 @api_bp.route('/units/<int:unit_id>/bills', methods=['GET'])
 @jwt_required
+@read_only
 def get_bills_for_unit(unit_id):
     db = get_db()
     user_id = request.user_id
-    response, status_code = unit_service.get_bills_for_unit_service(db, user_id, unit_id)
+    response, status_code = unit_service.get_bills_for_unit_service(
+        db, user_id, unit_id,
+        limit=request.args.get('limit', type=int),
+        cursor=request.args.get('cursor'),
+        fields=request.args.get('fields')
+    )
     return jsonify(response), status_code
 
 @api_bp.route('/units/<int:unit_id>/moradores', methods=['GET'])
 @jwt_required
+@read_only
 def get_moradores_for_unit(unit_id):
     db = get_db()
     user_id = request.user_id
@@ -37,6 +46,7 @@ def get_moradores_for_unit(unit_id):
 
 @api_bp.route('/units/<int:unit_id>/veiculos', methods=['GET'])
 @jwt_required
+@read_only
 def get_veiculos_for_unit(unit_id):
     db = get_db()
     veiculos = veiculo_service.get_veiculos_by_lote(db, unit_id)
@@ -45,6 +55,7 @@ def get_veiculos_for_unit(unit_id):
 @api_bp.route('/monthly-summary/<string:year_month>', defaults={'sort_by_param': None}, methods=['GET'])
 @api_bp.route('/monthly-summary/<string:year_month>/<string:sort_by_param>', methods=['GET'])
 @jwt_required
+@read_only
 def get_monthly_summary(year_month, sort_by_param):
     db = get_db()
     user_profile = request.user_profile
@@ -52,15 +63,46 @@ def get_monthly_summary(year_month, sort_by_param):
     try:
         response, status_code = summary_service.get_monthly_summary_service(
             db=db, year_month=year_month, sort_by=sort_by_param,
-            order=order_param, user_profile=user_profile
+            order=order_param, user_profile=user_profile,
+            fields=request.args.get('fields')
         )
-        return jsonify(response), status_code
+        if status_code != 200:
+            return jsonify(response), status_code
+        # ETag do corpo; o navegador revalida com If-None-Match e recebe 304 se nada mudou
+        resp = jsonify(response)
+        resp.add_etag()
+        resp.cache_control.private = True
+        resp.cache_control.no_cache = True
+        return resp.make_conditional(request)
     except Exception as e:
         print(f"Erro inesperado em get_monthly_summary: {e}")
         return jsonify({'error': 'Ocorreu um erro interno ao processar o resumo.'}), 500
 
+@api_bp.route('/distribution/<string:year_month>', methods=['GET'])
+@jwt_required
+@read_only
+def get_distribution(year_month):
+    db = get_db()
+    # Importado aqui para que o numpy não seja carregado no arranque do worker
+    from ..services import distribution_service
+    try:
+        response, status_code = distribution_service.get_distribution_service(
+            db, year_month, bins=request.args.get('bins', type=int)
+        )
+        if status_code != 200:
+            return jsonify(response), status_code
+        resp = jsonify(response)
+        resp.add_etag()
+        resp.cache_control.private = True
+        resp.cache_control.no_cache = True
+        return resp.make_conditional(request)
+    except Exception as e:
+        print(f"Erro inesperado em get_distribution: {e}")
+        return jsonify({'error': 'Ocorreu um erro interno ao calcular a distribuição.'}), 500
+
 @api_bp.route('/latest-readings', methods=['GET'])
 @jwt_required
+@read_only
 def get_latest_readings():
     db = get_db()
     try:
@@ -76,6 +118,9 @@ def get_latest_readings():
 def process_readings():
     """
     Endpoint para receber os dados de leitura e executar o pipeline de faturação completo.
+    Com '?mode=async' o pipeline é colocado na fila e a resposta traz o id do job,
+    que pode ser acompanhado em GET /api/jobs/<job_id>. Com '?recalculate=true'
+    o mês é recalculado mesmo que nenhum insumo tenha mudado.
     """
     db = get_db()
     json_data = request.get_json()
@@ -87,8 +132,21 @@ def process_readings():
         # 1. Validação do payload com Pydantic (permanece igual)
         payload = ProcessReadingsPayload(**json_data)
 
+        engine = request.args.get('engine', 'sql')
+        # O motor em Python ainda não tem paridade verificada com as procedures
+        if engine == 'python' and request.user_profile != 'admin':
+            return jsonify({"error": "O motor de faturação 'python' é restrito a administradores."}), 403
+        recalculate = request.args.get('recalculate', 'false').lower() in ('1', 'true')
+        if request.args.get('mode') == 'async':
+            response, status_code = job_service.submit_billing_job_service(
+                db, payload, request.user_id, engine=engine, recalculate=recalculate
+            )
+            return jsonify(response), status_code
+
         # 2. Chamada do NOVO serviço orquestrador
-        response, status_code = reading_service.run_billing_pipeline_service(db, payload)
+        response, status_code = reading_service.run_billing_pipeline_service(
+            db, payload, engine=engine, recalculate=recalculate
+        )
         
         return jsonify(response), status_code
 
@@ -98,6 +156,45 @@ def process_readings():
         print(f"Erro inesperado em process_readings: {e}")
         return jsonify({'error': 'Ocorreu um erro interno no servidor ao processar as leituras.'}), 500
 
+@api_bp.route('/simulations/tariff', methods=['POST'])
+@jwt_required
+@read_only
+def simulate_tariff():
+    """
+    Simula uma tabela de tarifas candidata sobre os meses já faturados,
+    sem gravar nada. Restrito a administradores.
+    """
+    if request.user_profile != 'admin':
+        return jsonify({'error': 'Acesso restrito a administradores.'}), 403
+    db = get_db()
+    json_data = request.get_json()
+
+    if not json_data:
+        return jsonify({"error": "Payload JSON não encontrado ou inválido."}), 400
+
+    try:
+        payload = TariffSimulationPayload(**json_data)
+        # Importado aqui para que o numpy não seja carregado no arranque do worker
+        from ..services import simulation_service
+        response, status_code = simulation_service.simulate_tariff_service(db, payload)
+        return jsonify(response), status_code
+    except ValidationError as e:
+        return jsonify({"error": "Dados de entrada inválidos.", "details": e.errors()}), 422
+    except Exception as e:
+        print(f"Erro inesperado em simulate_tariff: {e}")
+        return jsonify({'error': 'Ocorreu um erro interno ao simular as tarifas.'}), 500
+
+@api_bp.route('/jobs/<string:job_id>', methods=['GET'])
+@jwt_required
+def get_job(job_id):
+    db = get_db()
+    try:
+        response, status_code = job_service.get_job_service(db, job_id, request.user_id, request.user_profile)
+        return jsonify(response), status_code
+    except Exception as e:
+        print(f"Erro inesperado em get_job: {e}")
+        return jsonify({'error': 'Ocorreu um erro interno ao buscar o job.'}), 500
+
 # --- Rotas para Veiculos ---
 
 @api_bp.route('/veiculos', methods=['POST'])
@@ -107,17 +204,36 @@ def create_veiculo():
     schema = VeiculoCreate(**data)
     db = get_db()
     veiculo = veiculo_service.create_veiculo(db, schema)
+    mark_primary_write(db)
     return jsonify(veiculo.to_dict()), 201
 
 @api_bp.route('/veiculos', methods=['GET'])
 @jwt_required
+@read_only
 def get_veiculos():
     db = get_db()
-    veiculos = veiculo_service.get_veiculos(db)
-    return jsonify([v.to_dict() for v in veiculos])
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    if limit is None and cursor is None:
+        veiculos = veiculo_service.get_veiculos(db)
+        return jsonify([v.to_dict() for v in veiculos])
+
+    # Paginação por keyset em id, com cursor opaco
+    limit = clamp_limit(limit)
+    after_id = None
+    if cursor:
+        try:
+            after_id = int(decode_cursor(cursor)['i'])
+        except (ValueError, KeyError, TypeError):
+            return jsonify({'error': 'Cursor inválido.'}), 400
+    veiculos = veiculo_service.get_veiculos_after(db, after_id=after_id, limit=limit + 1)
+    page = page_response(veiculos, limit, lambda v: encode_cursor({'i': v.id}))
+    page["items"] = [v.to_dict() for v in page["items"]]
+    return jsonify(page)
 
 @api_bp.route('/veiculos/<int:veiculo_id>', methods=['GET'])
 @jwt_required
+@read_only
 def get_veiculo(veiculo_id):
     db = get_db()
     veiculo = veiculo_service.get_veiculo(db, veiculo_id)
@@ -132,6 +248,7 @@ def update_veiculo(veiculo_id):
     schema = VeiculoUpdate(**data)
     db = get_db()
     veiculo = veiculo_service.update_veiculo(db, veiculo_id, schema)
+    mark_primary_write(db)
     if not veiculo:
         return jsonify({'error': 'Veiculo not found'}), 404
     return jsonify(veiculo.to_dict())
@@ -141,6 +258,39 @@ def update_veiculo(veiculo_id):
 def delete_veiculo(veiculo_id):
     db = get_db()
     veiculo = veiculo_service.delete_veiculo(db, veiculo_id)
+    mark_primary_write(db)
     if not veiculo:
         return jsonify({'error': 'Veiculo not found'}), 404
     return jsonify(veiculo.to_dict())
+
+# --- Rotas de administração ---
+
+@api_bp.route('/admin/db-pool', methods=['GET'])
+@jwt_required
+def get_db_pool_stats():
+    if request.user_profile != 'admin':
+        return jsonify({'error': 'Acesso restrito a administradores.'}), 403
+    return jsonify(get_pool_stats()), 200
+
+@api_bp.route('/admin/export/<string:table>/<int:year>', methods=['GET'])
+@jwt_required
+@read_only
+def export_table_year(table, year):
+    """Uma partição anual de 'agua_cobranca' ou 'producao' em Parquet/Arrow IPC."""
+    if request.user_profile != 'admin':
+        return jsonify({'error': 'Acesso restrito a administradores.'}), 403
+    db = get_db()
+    export_format = request.args.get('format', 'parquet')
+    try:
+        result, status_code = export_service.export_year_service(db, table, year, export_format)
+        if status_code != 200:
+            return jsonify(result), status_code
+        ext, mimetype = (
+            ('parquet', 'application/vnd.apache.parquet') if export_format == 'parquet'
+            else ('arrow', 'application/vnd.apache.arrow.file')
+        )
+        return send_file(result, mimetype=mimetype, as_attachment=True,
+                         download_name=f'{table}_year={year}.{ext}')
+    except Exception as e:
+        print(f"Erro inesperado em export_table_year: {e}")
+        return jsonify({'error': 'Ocorreu um erro interno ao exportar os dados.'}), 500
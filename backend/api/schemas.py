@@ -1,6 +1,6 @@
 # backend/api/schemas.py
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, validator
 from typing import List, Optional
 from datetime import date, datetime
 
@@ -27,6 +27,16 @@ class ProcessReadingsPayload(BaseModel):
         # Permite o uso de 'alias' para mapear nomes de campos do JSON
         allow_population_by_field_name = True
 
+    @validator('unit_readings')
+    def unique_units(cls, readings):
+        # A tabela temporária tem chave única (data_ref, codigo_lote)
+        seen, repeated = set(), set()
+        for reading in readings:
+            (repeated if reading.codigo_lote in seen else seen).add(reading.codigo_lote)
+        if repeated:
+            raise ValueError(f"Unidades repetidas nas leituras: {', '.join(map(str, sorted(repeated)))}.")
+        return readings
+
 # --- Schemas para Veiculo ---
 
 class VeiculoBase(BaseModel):
@@ -52,3 +62,21 @@ class VeiculoInDBBase(VeiculoBase):
 
 class Veiculo(VeiculoInDBBase):
     pass
+
+# --- Schemas para simulação de tarifas ---
+
+class TariffBandPayload(BaseModel):
+    """Uma faixa da tabela de tarifas candidata."""
+    faixa: str
+    consumo_inicial: float = 0
+    consumo_final: Optional[float] = None
+    valor_m3: float
+    parcela_deduzir: float = 0
+
+class TariffSimulationPayload(BaseModel):
+    """Schema para o payload da rota /simulations/tariff."""
+    start_month: date
+    end_month: date
+    tariff: List[TariffBandPayload] = Field(..., min_items=1)
+    # Tabela de esgoto; se omitida, usa a mesma de água (como o motor de faturação)
+    sewage_tariff: Optional[List[TariffBandPayload]] = None
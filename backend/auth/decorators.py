@@ -1,8 +1,42 @@
 # backend/auth/decorators.py
 
+import hashlib
+import os
+import time
 import jwt
 from functools import wraps
 from flask import request, jsonify, current_app
+from ..services.cache import LRUCache
+
+# Cache dos claims de tokens já verificados. A chave inclui a SECRET_KEY, pelo
+# que uma rotação da chave invalida naturalmente as entradas antigas, e cada
+# entrada expira no máximo no 'exp' do próprio token.
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', '4096'))
+TOKEN_CACHE_MAX_TTL = float(os.environ.get('TOKEN_CACHE_MAX_TTL', '300'))
+_token_cache = LRUCache(maxsize=TOKEN_CACHE_SIZE)
+
+def _decode_token(token: str, secret_key: str) -> dict:
+    """
+    Retorna os claims de um token, verificando a assinatura apenas se ainda
+    não estiverem em cache. Só tokens válidos entram na cache, pelo que as
+    exceções de jwt.decode continuam a ser levantadas como antes.
+    """
+    cache_key = hashlib.sha256(f"{secret_key}\0{token}".encode()).digest()
+    data = _token_cache.get(cache_key)
+    if data is not None:
+        return data
+
+    data = jwt.decode(token, secret_key, algorithms=["HS256"])
+    ttl = TOKEN_CACHE_MAX_TTL
+    if 'exp' in data:
+        ttl = min(ttl, float(data['exp']) - time.time())
+    if ttl > 0:
+        _token_cache.set(cache_key, data, ttl=ttl)
+    return data
+
+def token_cache_stats() -> dict:
+    """Contadores da cache de tokens (tamanho, acertos, falhas, taxa de acerto)."""
+    return _token_cache.stats()
 
 def jwt_required(f):
     """
@@ -20,7 +54,7 @@ def jwt_required(f):
 
         try:
             # Decodifica o token usando a chave secreta da configuração da aplicação
-            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
+            data = _decode_token(token, current_app.config['SECRET_KEY'])
             # Anexa os dados do usuário ao objeto 'request' para que a rota possa acessá-los
             request.user_id = data['user_id']
             request.user_profile = data.get('profile', 'user')
@@ -0,0 +1,107 @@
+# backend/benchmarks/json_serialization.py
+#
+# Compara a serialização de um ano de contas de todas as unidades:
+#   before: WaterBill.to_dict() (float()/isoformat() campo a campo) + json da stdlib
+#   to_dict+orjson: as mesmas conversões, codificadas pelo FastJSONProvider
+#   after: valores crus das colunas (Decimal/date, como vêm do banco) direto
+#          para o FastJSONProvider
+# Os dados são sintéticos; não é preciso banco.
+#
+# Uso: python -m backend.benchmarks.json_serialization [--units 200] [--months 12] [--runs 5]
+
+import argparse
+import json
+import random
+import statistics
+import time
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from ..json_provider import FastJSONProvider
+from ..models import WaterBill
+
+
+def _make_bills(units: int, months: int):
+    rng = random.Random(42)
+    bills = []
+    for codigo_lote in range(1, units + 1):
+        for m in range(months):
+            data_ref = date(2023 + m // 12, m % 12 + 1, 1)
+            consumo = rng.randint(0, 40)
+            values = {c.name: None for c in WaterBill.__table__.columns}
+            values.update(
+                id=str(uuid.UUID(int=rng.getrandbits(128))),
+                codigo_lote=codigo_lote,
+                data_ref=data_ref,
+                data_display=data_ref.strftime("%m/%Y"),
+                leitura=rng.randint(0, 9999),
+                consumo_medido_m3=consumo,
+                consumo_esgoto_m3=consumo,
+                total_esgoto_rs=consumo * 4.1,
+                faixa_esgoto="F2",
+                tarifa_esgoto=Decimal("4.10"),
+                deduzir_esgoto=Decimal("1.25"),
+                faixa_agua="F2",
+                tarifa_agua=Decimal("5.35"),
+                deduzir_agua=Decimal("2.50"),
+                cobrado_agua_prod_rs=consumo * 5.35,
+                preco_m3_comprado_rs=Decimal("7.80"),
+                cobrado_agua_comp_rs=0.0,
+                cobrado_total_agua_rs=consumo * 5.35,
+                cobrado_area_comum_rs=12.5,
+                cobrado_outros_gastos_rs=3.2,
+                total_conta_rs=consumo * 9.45 + 15.7,
+                data_leitura=datetime(data_ref.year, data_ref.month, 28, 9, 30),
+                mes_mensagem="",
+                mes_consumo_media_m3=18,
+                mes_consumo_mediana_m3=17,
+                media_movel_6_meses_anteriores=19,
+                media_movel_12_meses_anteriores=18,
+                mes_outros_gastos_rs=Decimal("150.00"),
+            )
+            bills.append(values)
+    return bills
+
+
+def _time_ms(fn, runs: int):
+    samples = []
+    size = 0
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        size = len(fn())
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {"median_ms": round(statistics.median(samples), 2), "bytes": size}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de serialização JSON das contas.")
+    parser.add_argument("--units", type=int, default=200)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    app = Flask(__name__)
+    default_json = DefaultJSONProvider(app)
+    fast_json = FastJSONProvider(app)
+
+    raw_rows = _make_bills(args.units, args.months)
+    orm_bills = [WaterBill(**values) for values in raw_rows]
+    api_keys = WaterBill.API_FIELDS
+    raw_api_rows = [{k: r[k] for k in api_keys} for r in raw_rows]
+
+    result = {
+        "bills": len(raw_rows),
+        "before": _time_ms(lambda: default_json.dumps([b.to_dict() for b in orm_bills]), args.runs),
+        "to_dict+orjson": _time_ms(lambda: fast_json.dumps([b.to_dict() for b in orm_bills]), args.runs),
+        "after": _time_ms(lambda: fast_json.dumps(raw_api_rows), args.runs),
+    }
+    result["speedup"] = round(result["before"]["median_ms"] / result["after"]["median_ms"], 1)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
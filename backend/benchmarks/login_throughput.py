@@ -0,0 +1,88 @@
+# backend/benchmarks/login_throughput.py
+#
+# Simula um pico de logins: N threads verificam senhas ao mesmo tempo que uma
+# thread mede a latência de uma chamada barata da API. Compara o hashing
+# inline (como era) com o executor limitado de password_hasher.
+#
+# Uso: python -m backend.benchmarks.login_throughput [--clients 32] [--logins 4]
+
+import argparse
+import json
+import statistics
+import threading
+import time
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from ..services import password_hasher
+
+
+def _cheap_call_latencies(stop: threading.Event):
+    latencies = []
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        sum(range(2000))  # trabalho típico de um endpoint JSON simples
+        latencies.append((time.perf_counter() - t0) * 1000)
+        time.sleep(0.005)
+    return latencies
+
+
+def _run(verify, stored_hash, clients, logins_per_client):
+    ok, rejected, login_ms = 0, 0, []
+    lock = threading.Lock()
+
+    def client():
+        nonlocal ok, rejected
+        for _ in range(logins_per_client):
+            t0 = time.perf_counter()
+            try:
+                verify(stored_hash, 'senha-de-teste')
+                with lock:
+                    ok += 1
+                    login_ms.append((time.perf_counter() - t0) * 1000)
+            except password_hasher.HashingOverloaded:
+                with lock:
+                    rejected += 1
+
+    stop = threading.Event()
+    cheap = []
+    probe = threading.Thread(target=lambda: cheap.extend(_cheap_call_latencies(stop)))
+    probe.start()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    probe.join()
+
+    return {
+        "logins_ok": ok,
+        "rejected_503": rejected,
+        "logins_per_s": round(ok / elapsed, 1),
+        "login_p50_ms": round(statistics.median(login_ms), 1) if login_ms else None,
+        "cheap_call_p95_ms": round(statistics.quantiles(cheap, n=20)[-1], 3) if len(cheap) >= 20 else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de throughput de login.")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--logins", type=int, default=4, help="Logins por cliente.")
+    args = parser.parse_args(argv)
+
+    stored_hash = generate_password_hash('senha-de-teste', method=password_hasher.PASSWORD_HASH_METHOD)
+    result = {
+        "method": password_hasher.PASSWORD_HASH_METHOD,
+        "workers": password_hasher.PASSWORD_HASH_WORKERS,
+        "queue_limit": password_hasher.PASSWORD_HASH_QUEUE_LIMIT,
+        "inline": _run(check_password_hash, stored_hash, args.clients, args.logins),
+        "executor": _run(password_hasher.verify_password, stored_hash, args.clients, args.logins),
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
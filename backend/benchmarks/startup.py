@@ -0,0 +1,78 @@
+# backend/benchmarks/startup.py
+#
+# Mede o arranque a frio de um worker: tempo de 'import backend', tempo de
+# create_app(), memória residente após o arranque e quais dependências
+# pesadas ficaram carregadas. Cada amostra corre num processo novo.
+#
+# Uso: python -m backend.benchmarks.startup [--runs 5] [--max-create-app-ms 500]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ("reportlab", "matplotlib", "numpy")
+
+_CHILD_CODE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import backend
+t1 = time.perf_counter()
+backend.create_app()
+t2 = time.perf_counter()
+rss_kb = 0
+with open('/proc/self/status') as f:
+    for line in f:
+        if line.startswith('VmRSS:'):
+            rss_kb = int(line.split()[1])
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "create_app_ms": (t2 - t1) * 1000,
+    "rss_mb": rss_kb / 1024,
+    "loaded": [m for m in %r if m in sys.modules],
+}))
+"""
+
+
+def _run_once(env):
+    output = subprocess.check_output(
+        [sys.executable, "-c", _CHILD_CODE % (HEAVY_MODULES,)],
+        env=env,
+        cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    )
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de arranque do backend.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-create-app-ms", type=float, default=None,
+                        help="Falha (código 1) se a mediana de create_app() passar deste valor.")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    # create_engine não conecta no arranque; valores fictícios bastam se o .env não existir
+    for key, default in (("DB_USER", "bench"), ("DB_PASSWORD", "bench"), ("DB_HOST", "localhost"),
+                         ("DB_PORT", "5432"), ("DB_NAME", "bench")):
+        env.setdefault(key, default)
+
+    samples = [_run_once(env) for _ in range(args.runs)]
+    summary = {
+        "runs": args.runs,
+        "import_ms_median": round(statistics.median(s["import_ms"] for s in samples), 1),
+        "create_app_ms_median": round(statistics.median(s["create_app_ms"] for s in samples), 1),
+        "rss_mb_median": round(statistics.median(s["rss_mb"] for s in samples), 1),
+        "heavy_modules_loaded": samples[-1]["loaded"],
+    }
+    print(json.dumps(summary, indent=2))
+
+    if args.max_create_app_ms is not None and summary["create_app_ms_median"] > args.max_create_app_ms:
+        print(f"create_app() acima do limite de {args.max_create_app_ms} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
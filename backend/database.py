@@ -1,10 +1,17 @@
 # backend/database.py
 
+import itertools
 import os
+import re
+import threading
+import time
+from functools import wraps
+from typing import Optional
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, exc, text
+from sqlalchemy.pool import QueuePool, NullPool
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
-from flask import g # Importar o 'g' do Flask
+from flask import g, has_request_context, request # Importar o 'g' do Flask
 
 load_dotenv()
 
@@ -17,21 +24,238 @@ DB_NAME = os.environ.get("DB_NAME")
 
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-engine = create_engine(DATABASE_URL)
+def _env_bool(name: str, default: str) -> bool:
+    return os.environ.get(name, default).lower() in ('1', 'true', 'yes', 'on')
+
+# --- Configuração do pool de conexões ---
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", "true")
+# Com PgBouncer (modo transação) o pooling fica a cargo dele e não se usam
+# parâmetros de sessão; o statement_timeout é sempre aplicado com SET LOCAL.
+DB_PGBOUNCER = _env_bool("DB_PGBOUNCER", "false")
+# Timeout padrão das queries (ms); 0 desativa. Rotas podem sobrepor com @statement_timeout.
+DB_STATEMENT_TIMEOUT_MS = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", "0"))
+# Timeout das rotas de relatório (vw_relatorio_24m / report_24m).
+REPORT_STATEMENT_TIMEOUT_MS = int(os.environ.get("REPORT_STATEMENT_TIMEOUT_MS", "15000"))
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool que regista quanto tempo os pedidos esperam por uma conexão.
+    Um checkout conta como espera quando, à entrada, não havia conexão livre
+    nem overflow disponível; a verificação é feita fora do lock do pool, por
+    isso 'waits' é uma aproximação sob concorrência.
+    """
+
+    def __init__(self, *args, max_overflow: int = 10, **kwargs):
+        super().__init__(*args, max_overflow=max_overflow, **kwargs)
+        self.max_overflow = max_overflow
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time_total_s = 0.0
+        self.wait_time_max_s = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        exhausted = self.checkedin() == 0 and self.max_overflow > -1 and self.overflow() >= self.max_overflow
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+                if exhausted:
+                    self._record_wait(time.perf_counter() - start)
+            raise
+        with self._stats_lock:
+            self.checkouts += 1
+            if exhausted:
+                self._record_wait(time.perf_counter() - start)
+        return connection
+
+    def _record_wait(self, waited: float):
+        self.waits += 1
+        self.wait_time_total_s += waited
+        self.wait_time_max_s = max(self.wait_time_max_s, waited)
+
+
+def _make_engine(url: str):
+    if DB_PGBOUNCER:
+        return create_engine(url, poolclass=NullPool, pool_pre_ping=DB_POOL_PRE_PING)
+    return create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+
+
+engine = _make_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# --- Réplicas de leitura ---
+# URLs completas separadas por vírgula (ex.: postgresql://u:p@replica1:5432/db,...).
+DB_REPLICA_URLS = [url.strip() for url in os.environ.get("DB_REPLICA_URLS", "").split(",") if url.strip()]
+
+# Leitura das próprias escritas: após uma escrita, a resposta leva o LSN do
+# primário em X-DB-Write-LSN; o cliente reenvia-o em X-DB-Min-LSN e a leitura
+# só vai para uma réplica que já o tenha reproduzido. O marcador viaja com o
+# cliente, por isso vale seja qual for o worker que atende a leitura.
+WRITE_LSN_HEADER = "X-DB-Write-LSN"
+MIN_LSN_HEADER = "X-DB-Min-LSN"
+_LSN_RE = re.compile(r"^[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}$")
+
+replica_engines = [_make_engine(url) for url in DB_REPLICA_URLS]
+ReplicaSessionLocals = [sessionmaker(autocommit=False, autoflush=False, bind=e) for e in replica_engines]
+_replica_counter = itertools.count()
+
+
+def _apply_statement_timeout(session, transaction, connection):
+    """
+    Aplica o statement_timeout da sessão no início de cada transação.
+    SET LOCAL vale só para a transação, o que é seguro com PgBouncer.
+    """
+    timeout_ms = session.info.get('statement_timeout_ms', DB_STATEMENT_TIMEOUT_MS)
+    if timeout_ms:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+
+
+for _session_factory in [SessionLocal, *ReplicaSessionLocals]:
+    event.listen(_session_factory, "after_begin", _apply_statement_timeout)
+
+
+def mark_primary_write(db: Session) -> Optional[str]:
+    """
+    Regista uma escrita já confirmada no primário. Com réplicas configuradas,
+    obtém o LSN atual do primário e, dentro de uma requisição, envia-o ao
+    cliente em X-DB-Write-LSN. Retorna o LSN (None sem réplicas), para quem
+    escreve fora de uma requisição (ex.: jobs do pipeline) o guardar.
+    """
+    if not ReplicaSessionLocals:
+        return None
+    lsn = db.execute(text("SELECT pg_current_wal_lsn()::text")).scalar()
+    remember_primary_write(lsn)
+    return lsn
+
+
+def remember_primary_write(lsn: Optional[str]):
+    """Agenda o envio do LSN de uma escrita na resposta da requisição atual."""
+    if lsn and has_request_context():
+        g.primary_write_lsn = lsn
+
+
+def add_write_lsn_header(response):
+    """Hook after_request: devolve ao cliente o LSN da escrita feita no pedido."""
+    lsn = g.pop('primary_write_lsn', None)
+    if lsn:
+        response.headers[WRITE_LSN_HEADER] = lsn
+    return response
+
+
+def _requested_min_lsn() -> Optional[str]:
+    value = request.headers.get(MIN_LSN_HEADER, '').strip()
+    return value if _LSN_RE.match(value) else None
+
+
+def _replica_caught_up(session: Session, lsn: str) -> bool:
+    """A réplica já reproduziu o WAL até 'lsn'? (NULL fora de recuperação conta como não)."""
+    return bool(session.execute(
+        text("SELECT pg_last_wal_replay_lsn() >= CAST(:lsn AS pg_lsn)"), {"lsn": lsn}
+    ).scalar())
+
+
+def read_only(f):
+    """
+    Decorador de rota que marca a requisição como só de leitura: get_db passa
+    a entregar uma sessão numa réplica, se houver. Deve ficar abaixo de @jwt_required.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        g.db_read_only = True
+        return f(*args, **kwargs)
+    return decorated
+
+
+def statement_timeout(timeout_ms: int):
+    """
+    Decorador de rota que define o statement_timeout (ms) das queries feitas
+    pela sessão da requisição. Deve ficar abaixo de @jwt_required.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            g.statement_timeout_ms = timeout_ms
+            return f(*args, **kwargs)
+        return decorated
+    return decorator
+
+
 # Função de dependência para obter a sessão do banco
 def get_db() -> Session:
     """
     Cria uma sessão de banco de dados por requisição, a armazena no
     contexto 'g' do Flask e a reutiliza se já existir para a mesma requisição.
+    Rotas marcadas com @read_only recebem uma sessão numa réplica, exceto se
+    o cliente enviar em X-DB-Min-LSN uma escrita que a réplica ainda não
+    reproduziu (leitura das próprias escritas).
     """
     if 'db' not in g:
-        g.db = SessionLocal()
-        print("--- Nova conexão com o banco de dados estabelecida ---")
+        timeout_ms = g.get('statement_timeout_ms', DB_STATEMENT_TIMEOUT_MS)
+        db = None
+        if ReplicaSessionLocals and g.get('db_read_only'):
+            db = ReplicaSessionLocals[next(_replica_counter) % len(ReplicaSessionLocals)]()
+            db.info['statement_timeout_ms'] = timeout_ms
+            min_lsn = _requested_min_lsn()
+            if min_lsn and not _replica_caught_up(db, min_lsn):
+                db.close()
+                db = None
+        if db is None:
+            db = SessionLocal()
+            db.info['statement_timeout_ms'] = timeout_ms
+        g.db = db
     return g.db
 
+
+def get_pool_stats() -> dict:
+    """Estado atual do pool de conexões (primário e réplicas) e contadores de espera."""
+    stats = _engine_pool_stats(engine)
+    stats["pgbouncer_mode"] = DB_PGBOUNCER
+    stats["replicas"] = [
+        {"host": e.url.host, **_engine_pool_stats(e)} for e in replica_engines
+    ]
+    return stats
+
+
+def _engine_pool_stats(db_engine) -> dict:
+    pool = db_engine.pool
+    stats = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "max_overflow": getattr(pool, "max_overflow", DB_MAX_OVERFLOW),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool._stats_lock:
+            stats.update({
+                "checkouts_total": pool.checkouts,
+                "waits_total": pool.waits,
+                "wait_time_total_s": round(pool.wait_time_total_s, 4),
+                "wait_time_max_s": round(pool.wait_time_max_s, 4),
+                "timeouts_total": pool.timeouts,
+            })
+    return stats
+
 def test_db_connection():
     """Tenta conectar ao banco de dados e executar uma query simples."""
     print("--- Testando conexão com o banco de dados... ---")
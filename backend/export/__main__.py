@@ -0,0 +1,33 @@
+# backend/export/__main__.py
+#
+# Exporta o histórico completo para Parquet ou Arrow IPC, particionado por ano.
+#
+# Uso: python -m backend.export --out DIR [--table agua_cobranca|producao|all] [--format parquet|arrow]
+
+import argparse
+import json
+
+from ..database import SessionLocal
+from ..services.export_service import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, EXPORT_TABLES, export_partitioned
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exportação colunar do histórico de faturação.")
+    parser.add_argument("--out", required=True, help="Diretório de destino.")
+    parser.add_argument("--table", choices=[*EXPORT_TABLES, "all"], default="all")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="parquet")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    tables = list(EXPORT_TABLES) if args.table == "all" else [args.table]
+    db = SessionLocal()
+    try:
+        for table in tables:
+            summary = export_partitioned(db, table, args.out, args.format, chunk_size=args.chunk_size)
+            print(json.dumps(summary, indent=2))
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
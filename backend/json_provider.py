@@ -0,0 +1,50 @@
+# backend/json_provider.py
+
+from datetime import date
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.engine import Row
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - o provider volta ao json da stdlib
+    orjson = None
+
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+
+
+def _default(value):
+    """Tipos que chegam crus das queries: Decimal (Numeric), datas e Row."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, Row):
+        return value._asdict()
+    if isinstance(value, date):
+        # Só usado sem orjson (que já serializa datas em ISO 8601)
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável em JSON: {type(value).__name__}")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Provider JSON da aplicação. Usa orjson quando disponível e serializa
+    diretamente Decimal, date/datetime e Row do SQLAlchemy, para que os
+    serviços possam devolver linhas sem converter campo a campo.
+    Sem orjson, mantém o mesmo formato com o json da stdlib.
+    """
+
+    default = staticmethod(_default)
+
+    def dumps(self, obj, **kwargs) -> str:
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        option = _ORJSON_OPTIONS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
@@ -0,0 +1,183 @@
+# backend/metrics.py
+
+import hmac
+import os
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Com vários workers (gunicorn), cada processo grava as métricas em ficheiros
+# neste diretório e o /metrics soma-os. O diretório deve existir, ser limpo
+# no arranque do servidor, e o gunicorn deve chamar mark_process_dead(pid)
+# no hook child_exit. Sem a variável, as métricas ficam em memória.
+PROMETHEUS_MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+# Token opcional exigido em 'Authorization: Bearer <token>' no /metrics.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+_ROWS_BUCKETS = (0, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000)
+_ROUND_TRIP_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 500, 1000)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Latência das requisições HTTP por rota.",
+    ("method", "route", "status"), buckets=_DURATION_BUCKETS,
+)
+PIPELINE_PHASE_DURATION = Histogram(
+    "billing_pipeline_phase_duration_seconds", "Duração de cada fase do pipeline de faturação.",
+    ("phase", "engine"), buckets=_DURATION_BUCKETS,
+)
+PIPELINE_PHASE_ROWS = Histogram(
+    "billing_pipeline_phase_rows", "Linhas afetadas por cada fase do pipeline de faturação.",
+    ("phase", "engine"), buckets=_ROWS_BUCKETS,
+)
+PIPELINE_PHASE_ROUND_TRIPS = Histogram(
+    "billing_pipeline_phase_round_trips", "Comandos enviados ao banco por cada fase do pipeline de faturação.",
+    ("phase", "engine"), buckets=_ROUND_TRIP_BUCKETS,
+)
+PIPELINE_RUNS = Counter(
+    "billing_pipeline_runs_total", "Execuções do pipeline de faturação por resultado.",
+    ("engine", "outcome"),
+)
+
+
+# --- Contagem de idas ao banco ---
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_round_trip(conn, cursor, statement, parameters, context, executemany):
+    conn.info["round_trips"] = conn.info.get("round_trips", 0) + 1
+
+
+def add_round_trips(connection, count: int = 1):
+    """Conta comandos enviados diretamente pelo cursor do driver (ex.: COPY)."""
+    connection.info["round_trips"] = connection.info.get("round_trips", 0) + count
+
+
+class PhaseTiming:
+    """Medidas de uma fase: duração, linhas afetadas e idas ao banco."""
+
+    def __init__(self, phase: str):
+        self.phase = phase
+        self.rows = None
+        self.duration_ms = None
+        self.round_trips = None
+
+    def as_log(self) -> dict:
+        return {
+            "phase": self.phase,
+            "duration_ms": self.duration_ms,
+            "rows": self.rows,
+            "round_trips": self.round_trips,
+        }
+
+
+@contextmanager
+def track_phase(db, phase: str, engine: str):
+    """
+    Mede uma fase do pipeline sobre a sessão 'db'. Quem chama preenche
+    'timing.rows'; a duração e as idas ao banco são apuradas à saída e
+    registadas nos histogramas. Fases que falham não são registadas.
+    """
+    timing = PhaseTiming(phase)
+    info = db.connection().info
+    trips_before = info.get("round_trips", 0)
+    start = time.perf_counter()
+    yield timing
+    elapsed = time.perf_counter() - start
+    timing.duration_ms = round(elapsed * 1000, 1)
+    timing.round_trips = info.get("round_trips", 0) - trips_before
+
+    PIPELINE_PHASE_DURATION.labels(phase, engine).observe(elapsed)
+    PIPELINE_PHASE_ROUND_TRIPS.labels(phase, engine).observe(timing.round_trips)
+    if timing.rows is not None:
+        PIPELINE_PHASE_ROWS.labels(phase, engine).observe(timing.rows)
+
+
+# --- Caches em memória ---
+
+class CacheStatsCollector:
+    """
+    Lê os contadores das caches em memória (LRUCache.stats) a cada recolha.
+    As caches são por processo: em modo multiprocesso, cada série leva o pid
+    do worker que respondeu ao /metrics.
+    """
+
+    def __init__(self, sources: dict, pid: str = None):
+        self.sources = sources
+        self.pid = pid
+
+    def collect(self):
+        label_names = ["cache"] + (["pid"] if self.pid else [])
+        entries = GaugeMetricFamily("app_cache_entries", "Entradas em cada cache em memória.", labels=label_names)
+        hits = CounterMetricFamily("app_cache_hits", "Acertos de cada cache em memória.", labels=label_names)
+        misses = CounterMetricFamily("app_cache_misses", "Falhas de cada cache em memória.", labels=label_names)
+        for name, stats_fn in self.sources.items():
+            stats = stats_fn()
+            labels = [name] + ([self.pid] if self.pid else [])
+            entries.add_metric(labels, stats["size"])
+            hits.add_metric(labels, stats["hits"])
+            misses.add_metric(labels, stats["misses"])
+        return [entries, hits, misses]
+
+
+def _cache_sources() -> dict:
+    from .auth.decorators import token_cache_stats
+    from .services.access_service import membership_cache_stats
+    return {"token": token_cache_stats, "unit_access": membership_cache_stats}
+
+
+# --- Latência por rota e endpoint /metrics ---
+
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+
+def _observe_request(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        # A regra da rota (ex.: /api/units/<int:unit_id>) mantém a cardinalidade baixa
+        route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        HTTP_REQUEST_DURATION.labels(request.method, route, str(response.status_code)).observe(
+            time.perf_counter() - started
+        )
+    return response
+
+
+def metrics_view():
+    """Métricas no formato de texto do Prometheus, somadas entre os workers."""
+    if METRICS_TOKEN:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(supplied, METRICS_TOKEN):
+            return Response("Não autorizado.\n", status=401, mimetype="text/plain")
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(CacheStatsCollector(_cache_sources(), pid=str(os.getpid())))
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead(pid: int):
+    """Para o hook child_exit do gunicorn: descarta os ficheiros do worker que saiu."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
+
+
+_cache_collector_registered = False
+
+
+def init_app(app):
+    """Regista a medição de latência por rota, as métricas das caches e o endpoint /metrics."""
+    global _cache_collector_registered
+    if not PROMETHEUS_MULTIPROC_DIR and not _cache_collector_registered:
+        REGISTRY.register(CacheStatsCollector(_cache_sources()))
+        _cache_collector_registered = True
+    app.before_request(_start_timer)
+    app.after_request(_observe_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view, methods=["GET"])
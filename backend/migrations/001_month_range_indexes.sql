@@ -0,0 +1,15 @@
+-- 001: índices para filtros de mês em intervalo semiaberto
+-- (data_ref >= inicio AND data_ref < proximo_mes) e para o histórico por unidade.
+
+-- Resumo mensal: filtra por mês e projeta apenas lote, total e consumo.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_agua_cobranca_data_ref_lote
+    ON newtab_agua_cobranca (data_ref, codigo_lote)
+    INCLUDE (total_conta_rs, consumo_medido_m3);
+
+-- Contas de uma unidade (mais recente primeiro) e última leitura por unidade.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_agua_cobranca_lote_data_ref_desc
+    ON newtab_agua_cobranca (codigo_lote, data_ref DESC);
+
+-- Produção do mês.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_producao_data_ref
+    ON newtab_producao (data_ref);
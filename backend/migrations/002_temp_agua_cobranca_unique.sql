@@ -0,0 +1,12 @@
+-- 002: chave única (data_ref, codigo_lote) na tabela temporária, usada pelo
+-- upsert da Fase 1 do pipeline de faturação.
+
+-- Remove linhas repetidas de execuções antigas, mantendo a mais recente.
+DELETE FROM newtemp_agua_cobranca a
+    USING newtemp_agua_cobranca b
+    WHERE a.data_ref = b.data_ref
+      AND a.codigo_lote = b.codigo_lote
+      AND a.id < b.id;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_temp_agua_cobranca_data_ref_lote
+    ON newtemp_agua_cobranca (data_ref, codigo_lote);
@@ -0,0 +1,33 @@
+-- 003: relatório de 24 meses pré-calculado (mesmo formato de vw_relatorio_24m).
+-- Uma linha por unidade; mes01_* é o mês mais recente e mes24_* o mais antigo.
+-- Preencher com: python -m backend.reports rebuild-24m
+
+CREATE TABLE IF NOT EXISTS newtab_relatorio_24m (
+    codigo_lote INTEGER NOT NULL PRIMARY KEY REFERENCES newtab_lotes (codigo_lote),
+    data_ref DATE NOT NULL,
+    mes01_data_display VARCHAR(20), mes01_mediana INTEGER, mes01_consumo INTEGER, mes01_ranking INTEGER, mes01_total_conta DOUBLE PRECISION, mes01_mensagem VARCHAR,
+    mes02_data_display VARCHAR(20), mes02_mediana INTEGER, mes02_consumo INTEGER, mes02_ranking INTEGER, mes02_total_conta DOUBLE PRECISION, mes02_mensagem VARCHAR,
+    mes03_data_display VARCHAR(20), mes03_mediana INTEGER, mes03_consumo INTEGER, mes03_ranking INTEGER, mes03_total_conta DOUBLE PRECISION, mes03_mensagem VARCHAR,
+    mes04_data_display VARCHAR(20), mes04_mediana INTEGER, mes04_consumo INTEGER, mes04_ranking INTEGER, mes04_total_conta DOUBLE PRECISION, mes04_mensagem VARCHAR,
+    mes05_data_display VARCHAR(20), mes05_mediana INTEGER, mes05_consumo INTEGER, mes05_ranking INTEGER, mes05_total_conta DOUBLE PRECISION, mes05_mensagem VARCHAR,
+    mes06_data_display VARCHAR(20), mes06_mediana INTEGER, mes06_consumo INTEGER, mes06_ranking INTEGER, mes06_total_conta DOUBLE PRECISION, mes06_mensagem VARCHAR,
+    mes07_data_display VARCHAR(20), mes07_mediana INTEGER, mes07_consumo INTEGER, mes07_ranking INTEGER, mes07_total_conta DOUBLE PRECISION, mes07_mensagem VARCHAR,
+    mes08_data_display VARCHAR(20), mes08_mediana INTEGER, mes08_consumo INTEGER, mes08_ranking INTEGER, mes08_total_conta DOUBLE PRECISION, mes08_mensagem VARCHAR,
+    mes09_data_display VARCHAR(20), mes09_mediana INTEGER, mes09_consumo INTEGER, mes09_ranking INTEGER, mes09_total_conta DOUBLE PRECISION, mes09_mensagem VARCHAR,
+    mes10_data_display VARCHAR(20), mes10_mediana INTEGER, mes10_consumo INTEGER, mes10_ranking INTEGER, mes10_total_conta DOUBLE PRECISION, mes10_mensagem VARCHAR,
+    mes11_data_display VARCHAR(20), mes11_mediana INTEGER, mes11_consumo INTEGER, mes11_ranking INTEGER, mes11_total_conta DOUBLE PRECISION, mes11_mensagem VARCHAR,
+    mes12_data_display VARCHAR(20), mes12_mediana INTEGER, mes12_consumo INTEGER, mes12_ranking INTEGER, mes12_total_conta DOUBLE PRECISION, mes12_mensagem VARCHAR,
+    mes13_data_display VARCHAR(20), mes13_mediana INTEGER, mes13_consumo INTEGER, mes13_ranking INTEGER, mes13_total_conta DOUBLE PRECISION, mes13_mensagem VARCHAR,
+    mes14_data_display VARCHAR(20), mes14_mediana INTEGER, mes14_consumo INTEGER, mes14_ranking INTEGER, mes14_total_conta DOUBLE PRECISION, mes14_mensagem VARCHAR,
+    mes15_data_display VARCHAR(20), mes15_mediana INTEGER, mes15_consumo INTEGER, mes15_ranking INTEGER, mes15_total_conta DOUBLE PRECISION, mes15_mensagem VARCHAR,
+    mes16_data_display VARCHAR(20), mes16_mediana INTEGER, mes16_consumo INTEGER, mes16_ranking INTEGER, mes16_total_conta DOUBLE PRECISION, mes16_mensagem VARCHAR,
+    mes17_data_display VARCHAR(20), mes17_mediana INTEGER, mes17_consumo INTEGER, mes17_ranking INTEGER, mes17_total_conta DOUBLE PRECISION, mes17_mensagem VARCHAR,
+    mes18_data_display VARCHAR(20), mes18_mediana INTEGER, mes18_consumo INTEGER, mes18_ranking INTEGER, mes18_total_conta DOUBLE PRECISION, mes18_mensagem VARCHAR,
+    mes19_data_display VARCHAR(20), mes19_mediana INTEGER, mes19_consumo INTEGER, mes19_ranking INTEGER, mes19_total_conta DOUBLE PRECISION, mes19_mensagem VARCHAR,
+    mes20_data_display VARCHAR(20), mes20_mediana INTEGER, mes20_consumo INTEGER, mes20_ranking INTEGER, mes20_total_conta DOUBLE PRECISION, mes20_mensagem VARCHAR,
+    mes21_data_display VARCHAR(20), mes21_mediana INTEGER, mes21_consumo INTEGER, mes21_ranking INTEGER, mes21_total_conta DOUBLE PRECISION, mes21_mensagem VARCHAR,
+    mes22_data_display VARCHAR(20), mes22_mediana INTEGER, mes22_consumo INTEGER, mes22_ranking INTEGER, mes22_total_conta DOUBLE PRECISION, mes22_mensagem VARCHAR,
+    mes23_data_display VARCHAR(20), mes23_mediana INTEGER, mes23_consumo INTEGER, mes23_ranking INTEGER, mes23_total_conta DOUBLE PRECISION, mes23_mensagem VARCHAR,
+    mes24_data_display VARCHAR(20), mes24_mediana INTEGER, mes24_consumo INTEGER, mes24_ranking INTEGER, mes24_total_conta DOUBLE PRECISION, mes24_mensagem VARCHAR,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
@@ -0,0 +1,13 @@
+-- 004: janela de consumo por unidade para as médias móveis de 6 e 12 meses.
+-- Preencher com: python -m backend.stats rebuild
+
+CREATE TABLE IF NOT EXISTS newtab_consumo_janela (
+    codigo_lote INTEGER NOT NULL PRIMARY KEY REFERENCES newtab_lotes (codigo_lote),
+    ultimo_mes DATE NOT NULL,
+    consumos INTEGER[] NOT NULL,
+    soma_6 BIGINT NOT NULL,
+    contagem_6 INTEGER NOT NULL,
+    soma_12 BIGINT NOT NULL,
+    contagem_12 INTEGER NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
@@ -0,0 +1,15 @@
+-- 005: jobs assíncronos do pipeline de faturação (POST /api/process-readings?mode=async).
+
+CREATE TABLE IF NOT EXISTS newtab_pipeline_jobs (
+    id VARCHAR(36) NOT NULL PRIMARY KEY,
+    user_id BIGINT,
+    data_ref DATE,
+    engine VARCHAR(20),
+    status VARCHAR(20) NOT NULL,
+    status_code INTEGER,
+    logs JSON,
+    result JSON,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
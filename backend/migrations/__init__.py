@@ -0,0 +1,80 @@
+# backend/migrations/__init__.py
+
+import os
+import re
+
+from sqlalchemy import text
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+_VERSION_RE = re.compile(r"^(\d+)_.+\.sql$")
+_CONCURRENT_INDEX_RE = re.compile(
+    r"^CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE
+)
+
+
+def _migration_files():
+    files = []
+    for name in os.listdir(MIGRATIONS_DIR):
+        match = _VERSION_RE.match(name)
+        if match:
+            files.append((match.group(1), name))
+    return sorted(files)
+
+
+def _split_statements(sql: str):
+    """Separa o ficheiro em comandos, ignorando linhas de comentário."""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith('--')]
+    return [stmt.strip() for stmt in "\n".join(lines).split(';') if stmt.strip()]
+
+
+def _index_is_valid(conn, name: str):
+    """True/False conforme pg_index.indisvalid, ou None se o índice não existir."""
+    return conn.execute(
+        text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"), {"name": name}
+    ).scalar()
+
+
+def _run_statement(conn, statement: str):
+    """
+    Executa um comando da migração. Um CREATE INDEX CONCURRENTLY interrompido
+    deixa o índice INVALID, e o IF NOT EXISTS o ignoraria: nesse caso o índice
+    é removido e recriado, e a sua validade é confirmada no fim.
+    """
+    match = _CONCURRENT_INDEX_RE.match(statement)
+    if match and _index_is_valid(conn, match.group(1)) is False:
+        print(f"--- Índice inválido {match.group(1)} removido para ser recriado ---")
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {match.group(1)}"))
+    conn.execute(text(statement))
+    if match and not _index_is_valid(conn, match.group(1)):
+        raise RuntimeError(f"O índice {match.group(1)} não ficou válido após a migração.")
+
+
+def apply_migrations(engine):
+    """
+    Aplica, por ordem de versão, os ficheiros NNN_*.sql ainda não registados
+    em 'schema_migrations'. Cada comando corre em autocommit, o que permite
+    CREATE INDEX CONCURRENTLY. Retorna a lista de versões aplicadas.
+    """
+    applied_now = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version VARCHAR(20) PRIMARY KEY, name VARCHAR(255) NOT NULL, "
+            "applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+        ))
+        applied = {row.version for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+        for version, name in _migration_files():
+            if version in applied:
+                continue
+            with open(os.path.join(MIGRATIONS_DIR, name), encoding='utf-8') as f:
+                statements = _split_statements(f.read())
+            for statement in statements:
+                _run_statement(conn, statement)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                {"version": version, "name": name},
+            )
+            print(f"--- Migração {name} aplicada ---")
+            applied_now.append(version)
+    return applied_now
@@ -0,0 +1,10 @@
+# backend/migrations/__main__.py
+# Uso: python -m backend.migrations
+
+from ..database import engine
+from . import apply_migrations
+
+if __name__ == '__main__':
+    applied = apply_migrations(engine)
+    if not applied:
+        print("--- Nenhuma migração pendente ---")
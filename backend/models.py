@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, TIMESTAMP, Numeric, Boolean, BigInteger, Double, func
+from sqlalchemy import ARRAY, Column, Integer, String, Float, Date, ForeignKey, TIMESTAMP, Numeric, Boolean, BigInteger, Double, Index, JSON, Table, func
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -105,6 +105,31 @@ class WaterBill(Base):
             "mes_outros_gastos_rs": float(self.mes_outros_gastos_rs) if self.mes_outros_gastos_rs is not None else 0.0
         }
 
+    # Campos expostos pela API (as chaves de to_dict); todos são colunas da tabela.
+    API_FIELDS = (
+        "id", "codigo_lote", "data_ref", "data_display", "leitura",
+        "consumo_medido_m3", "consumo_esgoto_m3", "total_esgoto_rs",
+        "consumo_produzido_m3", "consumo_comprado_m3", "cobrado_total_agua_rs",
+        "cobrado_area_comum_rs", "cobrado_outros_gastos_rs", "total_conta_rs",
+        "faixa_esgoto", "tarifa_esgoto", "deduzir_esgoto", "faixa_agua",
+        "tarifa_agua", "deduzir_agua", "cobrado_agua_prod_rs",
+        "preco_m3_comprado_rs", "cobrado_agua_comp_rs", "data_leitura",
+        "mes_mensagem", "mes_consumo_media_m3", "mes_consumo_mediana_m3",
+        "media_movel_6_meses_anteriores", "media_movel_12_meses_anteriores",
+        "mes_outros_gastos_rs",
+    )
+
+    @classmethod
+    def row_to_dict(cls, row, fields):
+        """
+        Retorna apenas 'fields' de uma linha projetada (Row). Decimal e datas
+        seguem crus: o provider JSON da aplicação os serializa.
+        """
+        result = {field: getattr(row, field) for field in fields}
+        if "mes_outros_gastos_rs" in result and result["mes_outros_gastos_rs"] is None:
+            result["mes_outros_gastos_rs"] = 0.0
+        return result
+
 
 class TempWaterBill(Base):
     __tablename__ = "newtemp_agua_cobranca"
@@ -151,6 +176,11 @@ class TempWaterBill(Base):
     media_movel_12_meses_anteriores = Column(Integer)
     mes_outros_gastos_rs = Column(Numeric(12,2), default=0.0)
 
+    # Uma linha por unidade e mês; a Fase 1 grava por upsert nesta chave
+    __table_args__ = (
+        Index("ux_temp_agua_cobranca_data_ref_lote", "data_ref", "codigo_lote", unique=True),
+    )
+
 
 class Tariff(Base):
     __tablename__ = "newtab_tarifa"
@@ -309,3 +339,85 @@ class Veiculo(Base):
             "cor": self.cor,
             "tipo": self.tipo,
         }
+
+
+class PipelineJob(Base):
+    __tablename__ = "newtab_pipeline_jobs"
+
+    id = Column(String(36), primary_key=True)
+    user_id = Column(BigInteger)
+    data_ref = Column(Date)
+    engine = Column(String(20))
+    status = Column(String(20), nullable=False, default='queued')
+    status_code = Column(Integer)
+    logs = Column(JSON, default=list)
+    result = Column(JSON)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    started_at = Column(TIMESTAMP(timezone=True))
+    finished_at = Column(TIMESTAMP(timezone=True))
+
+    def to_dict(self):
+        duration_s = None
+        if self.started_at and self.finished_at:
+            duration_s = (self.finished_at - self.started_at).total_seconds()
+        result = self.result or {}
+        return {
+            "id": self.id,
+            "status": self.status,
+            "status_code": self.status_code,
+            "data_ref": self.data_ref.isoformat() if self.data_ref else None,
+            "engine": self.engine,
+            "logs": self.logs or [],
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "duration_s": duration_s,
+            "message": result.get("message"),
+            "error": result.get("error"),
+            "data": result.get("data"),
+            "changed_units": result.get("changed_units"),
+            "removed_units": result.get("removed_units"),
+        }
+
+
+class ConsumptionWindow(Base):
+    """
+    Estado das médias móveis de uma unidade: consumos dos últimos 13 meses
+    (consumos[0] é 'ultimo_mes') e somas/contagens das janelas de 6 e 12 meses
+    que terminam em 'ultimo_mes'. Meses sem conta ficam como NULL.
+    """
+    __tablename__ = "newtab_consumo_janela"
+
+    codigo_lote = Column(Integer, ForeignKey("newtab_lotes.codigo_lote"), primary_key=True)
+    ultimo_mes = Column(Date, nullable=False)
+    consumos = Column(ARRAY(Integer), nullable=False)
+    soma_6 = Column(BigInteger, nullable=False, default=0)
+    contagem_6 = Column(Integer, nullable=False, default=0)
+    soma_12 = Column(BigInteger, nullable=False, default=0)
+    contagem_12 = Column(Integer, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+# Relatório de 24 meses pré-calculado (mesmo formato de vw_relatorio_24m):
+# uma linha por unidade, mes01_* é o mês mais recente e mes24_* o mais antigo.
+REPORT_24M_MONTHS = 24
+REPORT_24M_FIELDS = (
+    ("data_display", String(20)),
+    ("mediana", Integer),
+    ("consumo", Integer),
+    ("ranking", Integer),
+    ("total_conta", Float),
+    ("mensagem", String),
+)
+
+report_24m_store = Table(
+    "newtab_relatorio_24m", Base.metadata,
+    Column("codigo_lote", Integer, ForeignKey("newtab_lotes.codigo_lote"), primary_key=True),
+    Column("data_ref", Date, nullable=False),
+    *[
+        Column(f"mes{i:02d}_{name}", type_)
+        for i in range(1, REPORT_24M_MONTHS + 1)
+        for name, type_ in REPORT_24M_FIELDS
+    ],
+    Column("updated_at", TIMESTAMP(timezone=True), server_default=func.now()),
+)
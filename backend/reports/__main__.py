@@ -0,0 +1,38 @@
+# backend/reports/__main__.py
+#
+# Manutenção do relatório de 24 meses pré-calculado (newtab_relatorio_24m).
+#
+# Uso: python -m backend.reports rebuild-24m   # recalcula todas as unidades do histórico
+#      python -m backend.reports check-24m     # compara com vw_relatorio_24m (código 1 se divergir)
+
+import argparse
+import json
+import sys
+
+from ..database import SessionLocal
+from ..services import report_store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Relatório de 24 meses pré-calculado.")
+    parser.add_argument("command", choices=("rebuild-24m", "check-24m"))
+    parser.add_argument("--max-mismatches", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild-24m":
+            rows = report_store.rebuild_report_store(db)
+            db.commit()
+            print(f"--- Relatório 24m reconstruído: {rows} unidades ---")
+            return 0
+
+        result = report_store.check_report_store(db, max_mismatches=args.max_mismatches)
+        print(json.dumps(result, indent=2, default=str))
+        return 0 if result["consistent"] else 1
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
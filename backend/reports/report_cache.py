@@ -0,0 +1,125 @@
+# backend/reports/report_cache.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Limite da camada em memória (bytes) e diretório opcional da camada em disco.
+REPORT_CACHE_MAX_BYTES = int(os.environ.get("REPORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+REPORT_CACHE_DIR = os.environ.get("REPORT_CACHE_DIR")
+# Tempo máximo (segundos) que um PDF é servido da cache, em qualquer camada.
+REPORT_CACHE_TTL_SECONDS = float(os.environ.get("REPORT_CACHE_TTL_SECONDS", "3600"))
+
+
+class ReportCache:
+    """
+    Cache dos PDFs finalizados, por (codigo_lote, versão dos dados).
+    A camada em memória é LRU limitada pelo total de bytes; a camada em disco,
+    se configurada, é partilhada entre os processos. Guarda-se apenas a versão
+    mais recente de cada unidade, e nenhuma entrada vive mais que 'ttl'
+    segundos: invalidate() só limpa a memória do processo que o chama.
+    """
+
+    def __init__(self, max_bytes: int = REPORT_CACHE_MAX_BYTES, cache_dir: str = REPORT_CACHE_DIR,
+                 ttl: float = REPORT_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _disk_path(self, codigo_lote: int, version: str) -> str:
+        return os.path.join(self.cache_dir, f"unit_{codigo_lote}_{version}.pdf")
+
+    def _drop_disk(self, codigo_lote: int, keep_version: str = None):
+        if not self.cache_dir:
+            return
+        prefix = f"unit_{codigo_lote}_"
+        keep = os.path.basename(self._disk_path(codigo_lote, keep_version)) if keep_version else None
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and name != keep:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    pass
+
+    def _store_memory(self, codigo_lote: int, version: str, pdf_bytes: bytes, stored_at: float = None):
+        with self._lock:
+            previous = self._memory.pop(codigo_lote, None)
+            if previous is not None:
+                self._size -= len(previous[1])
+            if len(pdf_bytes) > self.max_bytes:
+                return
+            self._memory[codigo_lote] = (version, pdf_bytes, stored_at if stored_at is not None else time.time())
+            self._size += len(pdf_bytes)
+            while self._size > self.max_bytes:
+                _, (_, evicted, _) = self._memory.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _expired(self, stored_at: float) -> bool:
+        return time.time() - stored_at > self.ttl
+
+    def get(self, codigo_lote: int, version: str):
+        """Retorna os bytes do PDF em cache para esta versão, ou None."""
+        with self._lock:
+            entry = self._memory.get(codigo_lote)
+            if entry is not None and entry[0] == version:
+                if not self._expired(entry[2]):
+                    self._memory.move_to_end(codigo_lote)
+                    return entry[1]
+                del self._memory[codigo_lote]
+                self._size -= len(entry[1])
+
+        if self.cache_dir:
+            path = self._disk_path(codigo_lote, version)
+            try:
+                # O mtime marca quando o ficheiro foi gravado por qualquer processo
+                stored_at = os.path.getmtime(path)
+                if self._expired(stored_at):
+                    return None
+                with open(path, 'rb') as f:
+                    pdf_bytes = f.read()
+            except FileNotFoundError:
+                return None
+            self._store_memory(codigo_lote, version, pdf_bytes, stored_at)
+            return pdf_bytes
+        return None
+
+    def put(self, codigo_lote: int, version: str, pdf_bytes: bytes):
+        """Guarda o PDF e descarta versões anteriores da mesma unidade."""
+        self._store_memory(codigo_lote, version, pdf_bytes)
+        if self.cache_dir:
+            path = self._disk_path(codigo_lote, version)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(pdf_bytes)
+            os.replace(tmp_path, path)
+            self._drop_disk(codigo_lote, keep_version=version)
+
+    def invalidate(self, codigo_lote: int = None):
+        """Remove os PDFs de uma unidade ou, sem argumento, de todas."""
+        with self._lock:
+            if codigo_lote is None:
+                self._memory.clear()
+                self._size = 0
+            else:
+                entry = self._memory.pop(codigo_lote, None)
+                if entry is not None:
+                    self._size -= len(entry[1])
+        if self.cache_dir:
+            if codigo_lote is None:
+                for name in os.listdir(self.cache_dir):
+                    if name.startswith("unit_") and name.endswith(".pdf"):
+                        try:
+                            os.remove(os.path.join(self.cache_dir, name))
+                        except FileNotFoundError:
+                            pass
+            else:
+                self._drop_disk(codigo_lote)
+
+
+report_cache = ReportCache()
@@ -1,20 +1,148 @@
 # backend/report_generator.py
 import io
-import matplotlib
-matplotlib.use('Agg') # Use 'Agg' backend for non-interactive plotting
-import matplotlib.pyplot as plt
 from reportlab.lib.pagesizes import letter, A4, landscape # Importar landscape
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.lib.units import inch
 from reportlab.lib.colors import black, blue, red, green, lightgrey, white
+from reportlab.graphics.shapes import Drawing, Group, String
+from reportlab.graphics.charts.linecharts import HorizontalLineChart
+from reportlab.graphics.charts.legends import LineLegend
+from reportlab.graphics.widgets.markers import makeMarker
+
+# Tamanho do gráfico no PDF (paisagem)
+CHART_WIDTH = 10.5 * inch
+CHART_HEIGHT = 3.5 * inch
+
+# --- Estilos construídos uma única vez ---
+STYLES = getSampleStyleSheet()
+STYLES.add(ParagraphStyle(name='H1_Center', alignment=TA_CENTER, fontSize=10, fontName='Helvetica'))
+STYLES.add(ParagraphStyle(name='H2_Left', alignment=TA_LEFT, fontSize=10, fontName='Helvetica', spaceAfter=6))
+STYLES.add(ParagraphStyle(name='Normal_Left', alignment=TA_LEFT, fontSize=8, fontName='Helvetica'))
+STYLES.add(ParagraphStyle(name='Normal_Right', alignment=TA_RIGHT, fontSize=8, fontName='Helvetica'))
+STYLES.add(ParagraphStyle(name='Cell_Center', alignment=TA_CENTER, fontSize=7, fontName='Helvetica'))
+STYLES.add(ParagraphStyle(name='Cell_Left', alignment=TA_LEFT, fontSize=7, fontName='Helvetica'))
+STYLES.add(ParagraphStyle(name='Cell_Right', alignment=TA_RIGHT, fontSize=7, fontName='Helvetica'))
+STYLES.add(ParagraphStyle(name='Message_Style', alignment=TA_LEFT, fontSize=7, fontName='Helvetica', textColor=red))
+STYLES.add(ParagraphStyle(name='Message_Good', alignment=TA_LEFT, fontSize=7, fontName='Helvetica', textColor=green))
+STYLES.add(ParagraphStyle(name='Message_Neutral', alignment=TA_LEFT, fontSize=7, fontName='Helvetica', textColor=blue))
+
+DATA_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), lightgrey), # Cabeçalho da tabela (Mês, Mês, Mês...)
+    ('TEXTCOLOR', (0, 0), (-1, 0), black),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica'),
+    ('FONTSIZE', (1, 0), (-1, 0), 6), # Tamanho da fonte dos data_ref
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), white), # Fundo branco para as linhas de dados
+    ('GRID', (0, 0), (-1, -1), 0.5, black), # Todas as bordas
+    ('FONTNAME', (0, 1), (0, -1), 'Helvetica'), # Deixar labels das linhas em negrito
+    ('FONTSIZE', (0, 1), (0, -1), 9), # Tamanho da fonte das labels das linhas
+    ('FONTSIZE', (1, 2), (-1, -1), 8), # Tamanho da fonte das labels das linhas
+    ('ALIGN', (0, 1), (0, -1), 'LEFT'), # Alinhar labels das linhas à esquerda
+    ('LEFTPADDING', (0,0), (-1,-1), 3),
+    ('RIGHTPADDING', (0,0), (-1,-1), 3),
+    ('TOPPADDING', (0,0), (-1,-1), 3),
+    ('BOTTOMPADDING', (0,0), (-1,-1), 3),
+])
+
+def generate_consumption_drawing(consumption_data, median_data, months_labels, unit_name,
+                                 width=CHART_WIDTH, height=CHART_HEIGHT):
+    """
+    Gera o gráfico de linha do consumo da unidade vs. mediana do condomínio
+    como um Drawing vetorial do ReportLab, para ser inserido direto no PDF.
+    Séries sem nenhum valor são omitidas; se nenhuma tiver valores, o desenho
+    traz apenas o aviso "Sem dados de consumo no período.".
+    Retorna None se não houver meses para desenhar.
+    """
+    if not months_labels:
+        return None
+
+    drawing = Drawing(width, height)
+
+    # (valores, cor, legenda, tracejado, marcador) de cada série com dados;
+    # o HorizontalLineChart falha ao desenhar uma linha sem nenhum ponto.
+    series = [
+        (values, color, label, dash, marker)
+        for values, color, label, dash, marker in (
+            ([float(v) if v is not None else None for v in consumption_data], blue, 'Consumo (m³)', None,
+             makeMarker('FilledCircle', size=4, fillColor=blue, strokeColor=blue)),
+            ([float(v) if v is not None else None for v in median_data], red, 'Mediana Condomínio (m³)', (4, 3),
+             makeMarker('Cross', size=5, fillColor=red, strokeColor=red)),
+        )
+        if any(v is not None for v in values)
+    ]
+    if not series:
+        drawing.add(String(width / 2, height / 2, 'Sem dados de consumo no período.',
+                           fontName='Helvetica', fontSize=9, textAnchor='middle'))
+        return drawing
+
+    chart = HorizontalLineChart()
+    chart.x = 0.55 * inch
+    chart.y = 0.7 * inch
+    chart.width = width - 0.75 * inch
+    chart.height = height - 1.05 * inch
+    chart.data = [values for values, *_ in series]
+    chart.joinedLines = 1
+    chart.strokeColor = black
+    chart.strokeWidth = 0.5
+
+    chart.categoryAxis.categoryNames = [str(label) for label in months_labels]
+    chart.categoryAxis.labels.angle = 60
+    chart.categoryAxis.labels.boxAnchor = 'ne'
+    chart.categoryAxis.labels.dx = 4
+    chart.categoryAxis.labels.dy = -2
+    chart.categoryAxis.labels.fontName = 'Helvetica'
+    chart.categoryAxis.labels.fontSize = 7
+
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.labels.fontName = 'Helvetica'
+    chart.valueAxis.labels.fontSize = 7
+    chart.valueAxis.visibleGrid = 1
+    chart.valueAxis.gridStrokeColor = lightgrey
+    chart.valueAxis.gridStrokeWidth = 0.5
+
+    for i, (_, color, _, dash, marker) in enumerate(series):
+        chart.lines[i].strokeColor = color
+        chart.lines[i].strokeWidth = 1.2
+        if dash:
+            chart.lines[i].strokeDashArray = dash
+        chart.lines[i].symbol = marker
+    drawing.add(chart)
+
+    # Título do eixo Y, rodado 90 graus
+    y_title = Group(String(0, 0, 'Consumo (m³)', fontName='Helvetica', fontSize=8, textAnchor='middle'))
+    y_title.rotate(90)
+    y_title.translate(chart.y + chart.height / 2, -0.15 * inch)
+    drawing.add(y_title)
+
+    legend = LineLegend()
+    legend.x = chart.x + 0.15 * inch
+    legend.y = chart.y + chart.height - 0.1 * inch
+    legend.fontName = 'Helvetica'
+    legend.fontSize = 7
+    legend.alignment = 'right'
+    legend.boxAnchor = 'nw'
+    legend.columnMaximum = 2
+    legend.dx = 18
+    legend.dy = 2
+    legend.deltay = 11
+    legend.colorNamePairs = [(color, label) for _, color, label, _, _ in series]
+    drawing.add(legend)
+
+    return drawing
 
 def generate_consumption_chart(consumption_data, median_data, months_labels, unit_name):
     """
     Gera um gráfico de linha do consumo da unidade vs. mediana do condomínio.
-    Retorna o gráfico como um buffer de imagem PNG.
+    Retorna o gráfico como um buffer de imagem PNG (renderizador matplotlib).
     """
+    import matplotlib
+    matplotlib.use('Agg') # Use 'Agg' backend for non-interactive plotting
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots(figsize=(10, 4))
     
     ax.plot(months_labels, consumption_data, label=f'Consumo (m³)', marker='o', color='blue')
@@ -38,7 +166,7 @@ def create_unit_report_pdf(unit_data, chart_image_buffer):
     """
     Cria um relatório PDF para uma única unidade.
     unit_data: Dicionário contendo os dados pivotados da view.
-    chart_image_buffer: Buffer de BytesIO contendo a imagem PNG do gráfico.
+    chart_image_buffer: Drawing vetorial do gráfico ou buffer de BytesIO com a imagem PNG.
     Retorna um buffer de BytesIO contendo o PDF.
     """
     buffer = io.BytesIO()
@@ -47,20 +175,7 @@ def create_unit_report_pdf(unit_data, chart_image_buffer):
                             rightMargin=0.5*inch, leftMargin=0.5*inch, # Margens mais estreitas
                             topMargin=0.5*inch, bottomMargin=0.5*inch) # Margens mais estreitas
 
-    styles = getSampleStyleSheet()
-    
-    # Custom styles
-    styles.add(ParagraphStyle(name='H1_Center', alignment=TA_CENTER, fontSize=10, fontName='Helvetica'))
-    styles.add(ParagraphStyle(name='H2_Left', alignment=TA_LEFT, fontSize=10, fontName='Helvetica', spaceAfter=6))
-    styles.add(ParagraphStyle(name='Normal_Left', alignment=TA_LEFT, fontSize=8, fontName='Helvetica'))
-    styles.add(ParagraphStyle(name='Normal_Right', alignment=TA_RIGHT, fontSize=8, fontName='Helvetica'))
-    styles.add(ParagraphStyle(name='Cell_Center', alignment=TA_CENTER, fontSize=7, fontName='Helvetica'))
-    styles.add(ParagraphStyle(name='Cell_Left', alignment=TA_LEFT, fontSize=7, fontName='Helvetica'))
-    styles.add(ParagraphStyle(name='Cell_Right', alignment=TA_RIGHT, fontSize=7, fontName='Helvetica'))
-    styles.add(ParagraphStyle(name='Message_Style', alignment=TA_LEFT, fontSize=7, fontName='Helvetica', textColor=red))
-    styles.add(ParagraphStyle(name='Message_Good', alignment=TA_LEFT, fontSize=7, fontName='Helvetica', textColor=green))
-    styles.add(ParagraphStyle(name='Message_Neutral', alignment=TA_LEFT, fontSize=7, fontName='Helvetica', textColor=blue))
-
+    styles = STYLES
 
     story = []
 
@@ -71,7 +186,10 @@ def create_unit_report_pdf(unit_data, chart_image_buffer):
     #story.append(Spacer(1, 0.1 * inch))
 
     # Chart
-    if chart_image_buffer:
+    if isinstance(chart_image_buffer, Drawing):
+        story.append(chart_image_buffer)
+        story.append(Spacer(1, 0.2 * inch))
+    elif chart_image_buffer:
         img = Image(chart_image_buffer)
         img.drawWidth = 10.5 * inch # Aumentar largura para caber em paisagem
         img.drawHeight = 3.5 * inch # Ajustar altura
@@ -143,25 +261,7 @@ def create_unit_report_pdf(unit_data, chart_image_buffer):
 
     if len(table_headers_row) > 1: # Se houver pelo menos um mês de dados
         table = Table(table_data, colWidths=col_widths)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), lightgrey), # Cabeçalho da tabela (Mês, Mês, Mês...)
-            ('TEXTCOLOR', (0, 0), (-1, 0), black),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica'),
-            ('FONTSIZE', (1, 0), (-1, 0), 6), # Tamanho da fonte dos data_ref
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), white), # Fundo branco para as linhas de dados
-            ('GRID', (0, 0), (-1, -1), 0.5, black), # Todas as bordas
-            ('FONTNAME', (0, 1), (0, -1), 'Helvetica'), # Deixar labels das linhas em negrito
-            ('FONTSIZE', (0, 1), (0, -1), 9), # Tamanho da fonte das labels das linhas
-            ('FONTSIZE', (1, 2), (-1, -1), 8), # Tamanho da fonte das labels das linhas
-            ('ALIGN', (0, 1), (0, -1), 'LEFT'), # Alinhar labels das linhas à esquerda
-            ('LEFTPADDING', (0,0), (-1,-1), 3),
-            ('RIGHTPADDING', (0,0), (-1,-1), 3),
-            ('TOPPADDING', (0,0), (-1,-1), 3),
-            ('BOTTOMPADDING', (0,0), (-1,-1), 3),
-        ]))
+        table.setStyle(DATA_TABLE_STYLE)
         story.append(table)
     else:
         story.append(Paragraph("Não há dados de consumo disponíveis para esta unidade no período.", styles['Normal_Left']))
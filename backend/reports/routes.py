@@ -1,16 +1,27 @@
 # backend/reports/routes.py
 
-from flask import Blueprint, request, jsonify, send_file
-from ..database import get_db
+import csv
+import io
+from flask import Blueprint, Response, current_app, g, request, jsonify, send_file, stream_with_context
+from ..database import get_db, read_only, statement_timeout, REPORT_STATEMENT_TIMEOUT_MS
 from ..auth.decorators import jwt_required
 from ..services import report_service # Importa o serviço de relatório
 
 reports_bp = Blueprint('reports_bp', __name__)
 
+REPORT_24M_STREAM_FORMATS = ('ndjson', 'csv')
+
 @reports_bp.route('/reports/24m', methods=['GET'])
 @jwt_required
+@read_only
+@statement_timeout(REPORT_STATEMENT_TIMEOUT_MS)
 def get_24m_report():
     db = get_db()
+    export_format = request.args.get('format', 'json')
+    if export_format in REPORT_24M_STREAM_FORMATS:
+        return _stream_24m_report(db, export_format)
+    if export_format != 'json':
+        return jsonify({'error': f"Formato inválido: {export_format}. Use json, {', '.join(REPORT_24M_STREAM_FORMATS)}."}), 400
     try:
         data, status_code = report_service.get_24m_report_data(db)
         return jsonify(data), status_code
@@ -18,9 +29,60 @@ def get_24m_report():
         print(f"Erro inesperado em get_24m_report: {e}")
         return jsonify({'error': 'Ocorreu um erro interno ao buscar o relatório.'}), 500
 
+def _stream_24m_report(db, export_format):
+    """
+    Envia o relatório 24m em blocos (NDJSON ou CSV) à medida que saem do cursor.
+    A sessão passa a pertencer à resposta: o teardown da requisição corre antes
+    do fim do streaming e não deve fechá-la. O cursor já está aberto antes do
+    primeiro bloco, por isso a sessão é fechada também quando a resposta é
+    fechada sem o gerador ter corrido (ex.: cliente que desliga logo).
+    """
+    g.pop('db', None)
+    try:
+        columns, chunks = report_service.stream_24m_report_data(db)
+    except Exception as e:
+        db.close()
+        print(f"Erro inesperado em get_24m_report (stream): {e}")
+        return jsonify({'error': 'Ocorreu um erro interno ao buscar o relatório.'}), 500
+
+    def generate():
+        try:
+            if export_format == 'csv':
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(columns)
+                yield buffer.getvalue()
+                for rows in chunks:
+                    buffer.seek(0)
+                    buffer.truncate()
+                    writer.writerows([row[c] for c in columns] for row in rows)
+                    yield buffer.getvalue()
+            else:
+                dumps = current_app.json.dumps
+                for rows in chunks:
+                    yield ''.join(dumps(row) + '\n' for row in rows)
+        except Exception as e:
+            # O status 200 já foi enviado; o cliente vê o corpo truncado.
+            print(f"Erro durante o streaming do relatório 24m: {e}")
+        finally:
+            db.close()
+
+    if export_format == 'csv':
+        response = Response(stream_with_context(generate()), mimetype='text/csv')
+        response.headers['Content-Disposition'] = 'attachment; filename=relatorio_24m.csv'
+    else:
+        response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    # Evita que um proxy reverso acumule a resposta antes de enviá-la
+    response.headers['X-Accel-Buffering'] = 'no'
+    # Session.close() é idempotente: pode correr aqui e no 'finally' do gerador
+    response.call_on_close(db.close)
+    return response
+
 # ROTA REFATORADA
 @reports_bp.route('/report/unit/<int:codigo_lote>/<string:data_ref_mes>', methods=['GET'])
 @jwt_required
+@read_only
+@statement_timeout(REPORT_STATEMENT_TIMEOUT_MS)
 def get_unit_report_pdf(codigo_lote, data_ref_mes):
     db = get_db()
     user_id = request.user_id
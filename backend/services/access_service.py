@@ -0,0 +1,83 @@
+# backend/services/access_service.py
+
+import os
+import threading
+import time
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+from ..models import UserLote
+from .cache import LRUCache
+
+# Conjunto de codigo_lote de cada usuário. 'newtab_usuarios_lotes' é mantida
+# no banco, por isso a cada UNIT_ACCESS_CHECK_INTERVAL segundos uma query
+# barata confirma a assinatura da tabela e, se mudou, esvazia a cache.
+# Alterações feitas pelo ORM deste processo invalidam a entrada na hora.
+_membership_cache = LRUCache(
+    maxsize=int(os.environ.get("UNIT_ACCESS_CACHE_SIZE", "10000")),
+    ttl=float(os.environ.get("UNIT_ACCESS_CACHE_TTL", "300")),
+)
+UNIT_ACCESS_CHECK_INTERVAL = float(os.environ.get("UNIT_ACCESS_CHECK_INTERVAL", "5"))
+
+_table_fingerprint = None
+_checked_at = 0.0
+_check_lock = threading.Lock()
+
+def _fingerprint(db: Session) -> str:
+    """Assinatura do conteúdo de 'newtab_usuarios_lotes'."""
+    return db.execute(text(
+        f"SELECT md5(coalesce(string_agg(user_id || ':' || codigo_lote, ',' "
+        f"ORDER BY user_id, codigo_lote), '')) FROM {UserLote.__tablename__}"
+    )).scalar()
+
+def _check_table_changes(db: Session):
+    """Esvazia a cache se 'newtab_usuarios_lotes' mudou desde a última verificação."""
+    global _table_fingerprint, _checked_at
+    with _check_lock:
+        now = time.monotonic()
+        if now - _checked_at < UNIT_ACCESS_CHECK_INTERVAL:
+            return
+        fingerprint = _fingerprint(db)
+        if fingerprint != _table_fingerprint:
+            _membership_cache.clear()
+            _table_fingerprint = fingerprint
+        _checked_at = now
+
+def get_user_unit_ids(db: Session, user_id: int) -> frozenset:
+    """
+    Retorna o conjunto de unidades (codigo_lote) a que o usuário tem acesso,
+    carregado de 'newtab_usuarios_lotes' uma única vez por período de cache.
+    """
+    _check_table_changes(db)
+    unit_ids = _membership_cache.get(user_id)
+    if unit_ids is None:
+        rows = db.query(UserLote.codigo_lote).filter(UserLote.user_id == user_id).all()
+        unit_ids = frozenset(row.codigo_lote for row in rows)
+        _membership_cache.set(user_id, unit_ids)
+    return unit_ids
+
+def prime_user_unit_ids(user_id: int, unit_ids):
+    """Preenche a cache com um conjunto já obtido por outra query."""
+    _membership_cache.set(user_id, frozenset(unit_ids))
+
+def user_has_unit_access(db: Session, user_id: int, codigo_lote: int) -> bool:
+    """Verifica em memória se o usuário tem acesso à unidade."""
+    return codigo_lote in get_user_unit_ids(db, user_id)
+
+def invalidate_user_units(user_id: int = None):
+    """Descarta o conjunto de um usuário ou, sem argumento, de todos."""
+    if user_id is None:
+        _membership_cache.clear()
+    else:
+        _membership_cache.delete(user_id)
+
+def membership_cache_stats() -> dict:
+    return _membership_cache.stats()
+
+@event.listens_for(UserLote, "after_insert")
+@event.listens_for(UserLote, "after_update")
+@event.listens_for(UserLote, "after_delete")
+def _on_user_lote_change(mapper, connection, target):
+    invalidate_user_units(target.user_id)
+    # Numa linha passada a outro usuário, o anterior também perde o acesso
+    for previous_user_id in inspect(target).attrs.user_id.history.deleted:
+        invalidate_user_units(previous_user_id)
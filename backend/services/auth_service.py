@@ -3,8 +3,10 @@
 import datetime
 import jwt
 from sqlalchemy.orm import Session
-from werkzeug.security import generate_password_hash, check_password_hash
 from ..models import User
+from .password_hasher import hash_password, verify_password, needs_rehash, HashingOverloaded
+
+_OVERLOADED_RESPONSE = ({'error': 'Servidor ocupado. Tente novamente em instantes.'}, 503)
 
 def register_user_service(db: Session, data: dict):
     """
@@ -20,7 +22,10 @@ def register_user_service(db: Session, data: dict):
     if db.query(User).filter_by(email_usuario=email_usuario).first():
         return {'error': 'Email já cadastrado!'}, 409
 
-    hashed_password = generate_password_hash(senha_usuario, method='pbkdf2:sha256')
+    try:
+        hashed_password = hash_password(senha_usuario)
+    except HashingOverloaded:
+        return _OVERLOADED_RESPONSE
     new_user = User(
         nome_usuario=nome_usuario,
         email_usuario=email_usuario,
@@ -44,9 +49,22 @@ def login_user_service(db: Session, data: dict, secret_key: str):
 
     user = db.query(User).filter_by(email_usuario=email_usuario).first()
 
-    if not user or not check_password_hash(user.senha_usuario, senha_usuario):
+    try:
+        password_ok = user is not None and verify_password(user.senha_usuario, senha_usuario)
+    except HashingOverloaded:
+        return _OVERLOADED_RESPONSE
+
+    if not password_ok:
         return {'error': 'Credenciais inválidas!'}, 401
 
+    # Atualiza de forma transparente hashes gerados com parâmetros antigos
+    try:
+        if needs_rehash(user.senha_usuario):
+            user.senha_usuario = hash_password(senha_usuario)
+            db.commit()
+    except HashingOverloaded:
+        pass
+
     token = jwt.encode({
         'user_id': user.id,
         'email': user.email_usuario,
@@ -0,0 +1,209 @@
+# backend/services/billing_engine.py
+
+from datetime import date, datetime, time
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from ..models import Production, TempWaterBill
+from .date_utils import month_range
+from .tariff_index import TariffBands, get_tariff_index
+
+# Colunas de custo calculadas pelo motor, na mesma nomenclatura de 'newtemp_agua_cobranca'.
+ENGINE_COLUMNS = (
+    "mes_pct_comprado_consumido", "consumo_esgoto_m3", "consumo_produzido_m3", "consumo_comprado_m3",
+    "faixa_esgoto", "tarifa_esgoto", "deduzir_esgoto", "total_esgoto_rs",
+    "faixa_agua", "tarifa_agua", "deduzir_agua", "cobrado_agua_prod_rs",
+    "preco_m3_comprado_rs", "cobrado_agua_comp_rs", "cobrado_total_agua_rs",
+    "cobrado_area_comum_rs", "cobrado_outros_gastos_rs", "total_conta_rs",
+    "mes_consumo_agua_m3", "mes_compra_agua_m3", "mes_cobrado_agua_prod_rs",
+)
+
+# Colunas que são texto; as restantes são comparadas numericamente.
+_TEXT_COLUMNS = {"faixa_esgoto", "faixa_agua"}
+
+
+def load_tariff_bands(db: Session, data_ref: date) -> TariffBands:
+    """
+    Busca as faixas de tarifa vigentes na data de referência no índice de
+    tarifas, confirmando antes que 'newtab_tarifa' não mudou noutro processo.
+    """
+    return get_tariff_index(db, revalidate=True).bands_for(data_ref)
+
+
+def load_area_comum_rs(db: Session, data_ref: date) -> float:
+    """
+    Busca o custo de área comum do mês em 'newtab_producao' (0 se não houver).
+    """
+    ref, next_month = month_range(datetime.combine(data_ref, time.min))
+    value = db.query(Production.mes_area_comum_rs).filter(
+        Production.data_ref >= ref, Production.data_ref < next_month
+    ).scalar()
+    return float(value) if value is not None else 0.0
+
+
+def compute_bills(consumptions, bands: TariffBands, producao_m3: Optional[float],
+                  compra_rs: Optional[float], outros_rs: Optional[float],
+                  area_comum_rs: Optional[float] = 0.0,
+                  sewage_bands: Optional[TariffBands] = None) -> dict:
+    """
+    Calcula, numa única passagem vetorizada, todas as colunas de custo de um
+    mês inteiro. Espelha as regras de procedure_update_20 e procedure_update_30:
+    faixa por consumo medido, rateio entre água produzida e comprada pela
+    proporção comprada do mês, e rateio igualitário de área comum e outros gastos.
+
+    Retorna um dicionário {coluna: np.ndarray} alinhado com 'consumptions'.
+    """
+    consumo = np.nan_to_num(np.asarray(consumptions, dtype=np.float64), nan=0.0)
+    consumo = np.where(consumo < 0, 0.0, consumo)
+    n_units = consumo.size
+    sewage_bands = sewage_bands or bands
+
+    total_m3 = float(consumo.sum())
+    producao = float(producao_m3 or 0.0)
+    compra_m3 = max(total_m3 - producao, 0.0)
+    pct_comprado = compra_m3 / total_m3 if total_m3 > 0 else 0.0
+    preco_m3_comprado = round(float(compra_rs or 0.0) / compra_m3, 2) if compra_m3 > 0 else 0.0
+
+    consumo_comprado = np.round(consumo * pct_comprado)
+    consumo_produzido = consumo - consumo_comprado
+
+    agua_idx = bands.classify(consumo)
+    tarifa_agua = bands.valor_m3[agua_idx]
+    deduzir_agua = bands.parcela_deduzir[agua_idx]
+    cobrado_agua_prod = np.round(np.maximum(consumo_produzido * tarifa_agua - deduzir_agua, 0.0), 2)
+
+    esgoto_idx = sewage_bands.classify(consumo)
+    tarifa_esgoto = sewage_bands.valor_m3[esgoto_idx]
+    deduzir_esgoto = sewage_bands.parcela_deduzir[esgoto_idx]
+    total_esgoto = np.round(np.maximum(consumo * tarifa_esgoto - deduzir_esgoto, 0.0), 2)
+
+    cobrado_agua_comp = np.round(consumo_comprado * preco_m3_comprado, 2)
+    cobrado_total_agua = cobrado_agua_prod + cobrado_agua_comp
+
+    area_comum_unit = round(float(area_comum_rs or 0.0) / n_units, 2) if n_units else 0.0
+    outros_unit = round(float(outros_rs or 0.0) / n_units, 2) if n_units else 0.0
+    cobrado_area_comum = np.full(n_units, area_comum_unit)
+    cobrado_outros = np.full(n_units, outros_unit)
+
+    total_conta = np.round(cobrado_total_agua + total_esgoto + cobrado_area_comum + cobrado_outros, 2)
+
+    return {
+        "mes_pct_comprado_consumido": np.full(n_units, pct_comprado),
+        "consumo_esgoto_m3": consumo.astype(np.int64),
+        "consumo_produzido_m3": consumo_produzido.astype(np.int64),
+        "consumo_comprado_m3": consumo_comprado.astype(np.int64),
+        "faixa_esgoto": sewage_bands.faixa[esgoto_idx],
+        "tarifa_esgoto": tarifa_esgoto,
+        "deduzir_esgoto": deduzir_esgoto,
+        "total_esgoto_rs": total_esgoto,
+        "faixa_agua": bands.faixa[agua_idx],
+        "tarifa_agua": tarifa_agua,
+        "deduzir_agua": deduzir_agua,
+        "cobrado_agua_prod_rs": cobrado_agua_prod,
+        "preco_m3_comprado_rs": np.full(n_units, preco_m3_comprado),
+        "cobrado_agua_comp_rs": cobrado_agua_comp,
+        "cobrado_total_agua_rs": cobrado_total_agua,
+        "cobrado_area_comum_rs": cobrado_area_comum,
+        "cobrado_outros_gastos_rs": cobrado_outros,
+        "total_conta_rs": total_conta,
+        "mes_consumo_agua_m3": np.full(n_units, int(round(total_m3)), dtype=np.int64),
+        "mes_compra_agua_m3": np.full(n_units, int(round(compra_m3)), dtype=np.int64),
+        "mes_cobrado_agua_prod_rs": np.full(n_units, round(float(cobrado_agua_prod.sum()), 2)),
+    }
+
+
+def _fetch_month_inputs(db: Session, data_ref: date):
+    """
+    Lê da tabela temporária os insumos gravados pela Fase 1 para o mês.
+    """
+    return db.query(
+        TempWaterBill.id,
+        TempWaterBill.codigo_lote,
+        TempWaterBill.consumo_medido_m3,
+        TempWaterBill.mes_producao_agua_m3,
+        TempWaterBill.mes_compra_agua_rs,
+        TempWaterBill.mes_outros_gastos_rs,
+    ).filter(TempWaterBill.data_ref == data_ref).order_by(TempWaterBill.codigo_lote).all()
+
+
+def _compute_for_rows(db: Session, data_ref: date, rows) -> dict:
+    consumptions = [r.consumo_medido_m3 if r.consumo_medido_m3 is not None else np.nan for r in rows]
+    first = rows[0]
+    return compute_bills(
+        consumptions,
+        load_tariff_bands(db, data_ref),
+        producao_m3=first.mes_producao_agua_m3,
+        compra_rs=first.mes_compra_agua_rs,
+        outros_rs=first.mes_outros_gastos_rs,
+        area_comum_rs=load_area_comum_rs(db, data_ref),
+    )
+
+
+def run_engine_for_month(db: Session, data_ref: date) -> int:
+    """
+    Substitui procedure_update_20/30: calcula os custos do mês em memória e
+    grava todas as colunas de uma vez com um único UPDATE ... FROM unnest(...).
+    Não faz commit. Retorna o número de linhas atualizadas.
+    """
+    rows = _fetch_month_inputs(db, data_ref)
+    if not rows:
+        return 0
+    result = _compute_for_rows(db, data_ref, rows)
+
+    params = {"ids": [r.id for r in rows]}
+    for column in ENGINE_COLUMNS:
+        params[column] = result[column].tolist()
+
+    unnest_args = ", ".join(f"CAST(:{c} AS {_sql_array_type(c)})" for c in ENGINE_COLUMNS)
+    set_clause = ", ".join(f"{c} = v.{c}" for c in ENGINE_COLUMNS)
+    db.execute(
+        text(
+            f"UPDATE {TempWaterBill.__tablename__} AS t SET {set_clause} "
+            f"FROM unnest(CAST(:ids AS bigint[]), {unnest_args}) AS v(id, {', '.join(ENGINE_COLUMNS)}) "
+            f"WHERE t.id = v.id"
+        ),
+        params,
+    )
+    return len(rows)
+
+
+def _sql_array_type(column: str) -> str:
+    sql_type = TempWaterBill.__table__.c[column].type.compile(dialect=postgresql.dialect())
+    return f"{sql_type}[]"
+
+
+def compare_with_sql_results(db: Session, data_ref: date, tolerance: float = 0.01) -> List[dict]:
+    """
+    Verificação de paridade: recalcula o mês com o motor a partir dos insumos
+    já processados pelas procedures e compara coluna a coluna com o que está
+    gravado em 'newtemp_agua_cobranca'. Retorna a lista de divergências.
+    """
+    inputs = _fetch_month_inputs(db, data_ref)
+    if not inputs:
+        return []
+    result = _compute_for_rows(db, data_ref, inputs)
+
+    stored = db.query(TempWaterBill).filter(TempWaterBill.data_ref == data_ref).order_by(TempWaterBill.codigo_lote).all()
+    mismatches = []
+    for i, bill in enumerate(stored):
+        for column in ENGINE_COLUMNS:
+            expected = getattr(bill, column)
+            actual = result[column][i]
+            if column in _TEXT_COLUMNS:
+                equal = (expected or '') == (actual or '')
+            elif expected is None:
+                equal = False
+            else:
+                equal = abs(float(expected) - float(actual)) <= tolerance
+            if not equal:
+                mismatches.append({
+                    "codigo_lote": bill.codigo_lote,
+                    "coluna": column,
+                    "sql": float(expected) if expected is not None and column not in _TEXT_COLUMNS else expected,
+                    "motor": actual.item() if hasattr(actual, 'item') else actual,
+                })
+    return mismatches
@@ -0,0 +1,18 @@
+# backend/services/date_utils.py
+
+from datetime import date, datetime
+
+
+def month_range(value):
+    """
+    Retorna o intervalo semiaberto [início do mês, início do mês seguinte)
+    que contém a data informada, no mesmo tipo (date ou datetime) da entrada.
+    Filtros no formato 'data_ref >= inicio AND data_ref < proximo' podem usar
+    um índice simples em data_ref, ao contrário de date_trunc('month', data_ref).
+    """
+    if isinstance(value, datetime):
+        start = value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    else:
+        start = date(value.year, value.month, 1)
+    next_month = start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    return start, next_month
@@ -0,0 +1,156 @@
+# backend/services/distribution_service.py
+
+import os
+from datetime import date
+
+import numpy as np
+from dateutil.parser import parse
+from sqlalchemy.orm import Session
+
+from ..models import WaterBill
+from .cache import LRUCache
+from .date_utils import month_range
+
+DISTRIBUTION_PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+DISTRIBUTION_DEFAULT_BINS = 10
+DISTRIBUTION_MAX_BINS = 100
+
+# Só meses fechados (anteriores ao mês corrente) ficam em cache. O TTL limita o
+# tempo que outros processos levam a ver um mês fechado reprocessado.
+_distribution_cache = LRUCache(
+    maxsize=int(os.environ.get("DISTRIBUTION_CACHE_SIZE", "128")),
+    ttl=float(os.environ.get("DISTRIBUTION_CACHE_TTL", "3600")),
+)
+
+
+def _column_stats(values: np.ndarray, bins: int):
+    """
+    Estatísticas de uma coluna (sem NaN) e, por valor, o ranking (1 = maior,
+    empates partilham a posição, como RANK() DESC) e o z-score.
+    """
+    n = len(values)
+    if n == 0:
+        return {"count": 0}, np.array([]), np.array([])
+
+    mean = float(values.mean())
+    std = float(values.std())
+    counts, edges = np.histogram(values, bins=bins)
+    stats = {
+        "count": n,
+        "mean": mean,
+        "std": std,
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "percentiles": {
+            f"p{p}": float(v) for p, v in zip(DISTRIBUTION_PERCENTILES, np.percentile(values, DISTRIBUTION_PERCENTILES))
+        },
+        "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+    }
+
+    ascending = np.sort(values)
+    ranks = 1 + n - np.searchsorted(ascending, values, side='right')
+    z_scores = (values - mean) / std if std > 0 else np.zeros(n)
+    return stats, ranks, z_scores
+
+
+def _per_unit(column: np.ndarray, bins: int):
+    """Aplica _column_stats aos valores presentes e devolve ranks/z alinhados com 'column' (None se ausente)."""
+    present = ~np.isnan(column)
+    stats, ranks, z_scores = _column_stats(column[present], bins)
+    rank_col = [None] * len(column)
+    z_col = [None] * len(column)
+    for i, rank, z in zip(np.flatnonzero(present).tolist(), ranks.tolist(), z_scores.tolist()):
+        rank_col[i] = rank
+        z_col[i] = round(z, 4)
+    return stats, rank_col, z_col
+
+
+def compute_month_distribution(db: Session, month_start: date, bins: int = DISTRIBUTION_DEFAULT_BINS) -> dict:
+    """
+    Distribuição do consumo e do custo das unidades num mês, calculada com
+    NumPy sobre uma única leitura das duas colunas.
+    """
+    start, next_month = month_range(month_start)
+    rows = db.query(
+        WaterBill.codigo_lote, WaterBill.consumo_medido_m3, WaterBill.total_conta_rs
+    ).filter(
+        WaterBill.data_ref >= start,
+        WaterBill.data_ref < next_month,
+        WaterBill.codigo_lote.isnot(None),
+    ).order_by(WaterBill.codigo_lote).all()
+
+    codigos = [r.codigo_lote for r in rows]
+    consumption = np.array([np.nan if r.consumo_medido_m3 is None else r.consumo_medido_m3 for r in rows], dtype=np.float64)
+    cost = np.array([np.nan if r.total_conta_rs is None else r.total_conta_rs for r in rows], dtype=np.float64)
+
+    consumption_stats, consumption_rank, consumption_z = _per_unit(consumption, bins)
+    cost_stats, cost_rank, cost_z = _per_unit(cost, bins)
+
+    return {
+        "data_ref": start.isoformat(),
+        "unit_count": len(rows),
+        "consumption": consumption_stats,
+        "cost": cost_stats,
+        "units": [
+            {
+                "codigo_lote": codigo_lote,
+                "consumption_m3": rows[i].consumo_medido_m3,
+                "cost_rs": rows[i].total_conta_rs,
+                "consumption_rank": consumption_rank[i],
+                "consumption_z": consumption_z[i],
+                "cost_rank": cost_rank[i],
+                "cost_z": cost_z[i],
+            }
+            for i, codigo_lote in enumerate(codigos)
+        ],
+    }
+
+
+def _is_closed(month_start: date) -> bool:
+    return month_start < month_range(date.today())[0]
+
+
+def get_month_distribution(db: Session, month_start: date, bins: int = DISTRIBUTION_DEFAULT_BINS) -> dict:
+    """Distribuição do mês, servida da cache quando o mês já está fechado."""
+    month_start = month_range(month_start)[0]
+    if not _is_closed(month_start):
+        return compute_month_distribution(db, month_start, bins)
+
+    cache_key = (month_start, bins)
+    result = _distribution_cache.get(cache_key)
+    if result is None:
+        result = compute_month_distribution(db, month_start, bins)
+        _distribution_cache.set(cache_key, result)
+    return result
+
+
+def get_distribution_service(db: Session, year_month: str, bins: int = None):
+    """
+    Lógica de negócio do endpoint /distribution/<year_month>: percentis,
+    histograma, ranking e z-score por unidade, para consumo e custo.
+    """
+    try:
+        date_obj = parse(year_month + '-01')
+    except ValueError:
+        try:
+            date_obj = parse(year_month)
+        except ValueError:
+            return {'error': 'Formato de data inválido. Use YYYY-MM ou YYYY-MM-DD.'}, 400
+
+    bins = DISTRIBUTION_DEFAULT_BINS if bins is None else bins
+    if not 1 <= bins <= DISTRIBUTION_MAX_BINS:
+        return {'error': f'O parâmetro bins deve estar entre 1 e {DISTRIBUTION_MAX_BINS}.'}, 400
+
+    month_start = date_obj.date().replace(day=1)
+    result = dict(get_month_distribution(db, month_start, bins))
+    result["closed"] = _is_closed(month_start)
+    return result, 200
+
+
+def invalidate_distribution(data_ref):
+    """
+    Remove da cache a distribuição do mês de 'data_ref' (todas as divisões do
+    histograma). Chamado pelo pipeline de faturação após o commit.
+    """
+    month = date(data_ref.year, data_ref.month, 1)
+    _distribution_cache.delete_where(lambda key: key[0] == month)
@@ -0,0 +1,152 @@
+# backend/services/export_service.py
+
+import io
+import os
+from datetime import date, datetime
+
+from sqlalchemy import BigInteger, Boolean, Date, Float, Integer, Numeric, String, TIMESTAMP, select
+from sqlalchemy.orm import Session
+
+from ..models import Production, WaterBill
+
+# Tabelas exportáveis, pelo nome usado na URL e na linha de comando.
+EXPORT_TABLES = {
+    "agua_cobranca": WaterBill,
+    "producao": Production,
+}
+EXPORT_FORMATS = ("parquet", "arrow")
+# Linhas lidas do cursor do servidor por bloco (um RecordBatch por bloco e ano).
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", "10000"))
+
+# Partição das linhas sem data_ref (convenção Hive).
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+def _arrow_type(pa, column):
+    """Tipo Arrow de uma coluna do modelo. 'data_ref' é sempre exportada como data."""
+    if column.name == "data_ref":
+        return pa.date32()
+    col_type = column.type
+    # A ordem importa: Float é subclasse de Numeric e BigInteger de Integer.
+    if isinstance(col_type, Float):
+        return pa.float64()
+    if isinstance(col_type, Numeric):
+        return pa.decimal128(col_type.precision or 38, col_type.scale or 0)
+    if isinstance(col_type, BigInteger):
+        return pa.int64()
+    if isinstance(col_type, Integer):
+        return pa.int32()
+    if isinstance(col_type, Boolean):
+        return pa.bool_()
+    if isinstance(col_type, TIMESTAMP):
+        return pa.timestamp("us")
+    if isinstance(col_type, Date):
+        return pa.date32()
+    if isinstance(col_type, String):
+        return pa.string()
+    raise TypeError(f"Tipo sem correspondência em Arrow: {column.name} ({col_type})")
+
+
+def arrow_schema(table: str):
+    """Schema Arrow da tabela exportável 'table'."""
+    import pyarrow as pa
+
+    return pa.schema([pa.field(c.name, _arrow_type(pa, c)) for c in EXPORT_TABLES[table].__table__.columns])
+
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def iter_record_batches(db: Session, table: str, schema, year: int = None, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Lê a tabela por um cursor do lado do servidor, em ordem de data_ref, e
+    gera (ano, RecordBatch) com os tipos de 'schema'. Com 'year', lê só esse ano.
+    """
+    import pyarrow as pa
+
+    model = EXPORT_TABLES[table]
+    columns = list(model.__table__.columns)
+    date_idx = [c.name for c in columns].index("data_ref")
+    query = select(*columns).order_by(model.data_ref)
+    if year is not None:
+        start, end = date(year, 1, 1), date(year + 1, 1, 1)
+        if isinstance(model.data_ref.type, TIMESTAMP):
+            start, end = datetime(year, 1, 1), datetime(year + 1, 1, 1)
+        query = query.where(model.data_ref >= start, model.data_ref < end)
+
+    result = db.execute(query, execution_options={"stream_results": True, "yield_per": chunk_size})
+    try:
+        for rows in result.partitions(chunk_size):
+            by_year = {}
+            for row in rows:
+                row = list(row)
+                row[date_idx] = _as_date(row[date_idx])
+                by_year.setdefault(row[date_idx].year if row[date_idx] else None, []).append(row)
+            for row_year, year_rows in by_year.items():
+                arrays = [
+                    pa.array(values, type=field.type)
+                    for values, field in zip(zip(*year_rows), schema)
+                ]
+                yield row_year, pa.RecordBatch.from_arrays(arrays, schema=schema)
+    finally:
+        result.close()
+
+
+def _open_writer(sink, schema, export_format: str):
+    if export_format == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(sink, schema)
+    import pyarrow as pa
+    return pa.ipc.new_file(sink, schema)
+
+
+def export_partitioned(db: Session, table: str, out_dir: str, export_format: str = "parquet",
+                       chunk_size: int = EXPORT_CHUNK_SIZE) -> dict:
+    """
+    Exporta a tabela inteira para 'out_dir/<tabela>/year=AAAA/part-0.<ext>'.
+    Retorna o número de linhas e os ficheiros escritos por ano.
+    """
+    schema = arrow_schema(table)
+    ext = "parquet" if export_format == "parquet" else "arrow"
+    writers, files, rows = {}, {}, 0
+    try:
+        for row_year, batch in iter_record_batches(db, table, schema, chunk_size=chunk_size):
+            if row_year not in writers:
+                partition = NULL_PARTITION if row_year is None else str(row_year)
+                path = os.path.join(out_dir, table, f"year={partition}", f"part-0.{ext}")
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                writers[row_year] = _open_writer(path, schema, export_format)
+                files[partition] = path
+            writers[row_year].write(batch)
+            rows += batch.num_rows
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return {"table": table, "format": export_format, "rows": rows, "files": files}
+
+
+def export_year_service(db: Session, table: str, year: int, export_format: str = "parquet"):
+    """
+    Exporta um ano (uma partição) da tabela para um buffer em memória.
+    Retorna (buffer, 200) ou (erro, status).
+    """
+    if table not in EXPORT_TABLES:
+        return {'error': f"Tabela inválida: {table}. Use uma de {', '.join(EXPORT_TABLES)}."}, 400
+    if export_format not in EXPORT_FORMATS:
+        return {'error': f"Formato inválido: {export_format}. Use um de {', '.join(EXPORT_FORMATS)}."}, 400
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return {'error': 'Exportação indisponível: pyarrow não está instalado.'}, 501
+
+    schema = arrow_schema(table)
+    buffer = io.BytesIO()
+    writer = _open_writer(buffer, schema, export_format)
+    try:
+        for _, batch in iter_record_batches(db, table, schema, year=year):
+            writer.write(batch)
+    finally:
+        writer.close()
+    buffer.seek(0)
+    return buffer, 200
@@ -0,0 +1,16 @@
+# backend/services/fieldsets.py
+
+
+def parse_fields(raw: str, allowed) -> list:
+    """
+    Interpreta o parâmetro '?fields=a,b,c'. Retorna a lista de campos pedidos
+    (sem repetições, na ordem informada) ou None se o parâmetro não veio.
+    Levanta ValueError se algum campo não pertencer a 'allowed'.
+    """
+    if raw is None or not raw.strip():
+        return None
+    fields = list(dict.fromkeys(f.strip() for f in raw.split(',') if f.strip()))
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise ValueError(f"Campos inválidos: {', '.join(unknown)}. Permitidos: {', '.join(allowed)}.")
+    return fields
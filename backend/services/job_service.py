@@ -0,0 +1,173 @@
+# backend/services/job_service.py
+
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from ..api.schemas import ProcessReadingsPayload
+from ..database import SessionLocal, remember_primary_write
+from ..models import PipelineJob
+from . import reading_service
+
+PIPELINE_JOB_WORKERS = int(os.environ.get("PIPELINE_JOB_WORKERS", "2"))
+# Jobs 'queued'/'running' sem progresso há mais que isto (segundos) são dados
+# como perdidos (ex.: o processo que os executava morreu) e marcados 'failed'.
+PIPELINE_JOB_STALE_SECONDS = int(os.environ.get("PIPELINE_JOB_STALE_SECONDS", "1800"))
+
+_PENDING_STATUSES = ('queued', 'running')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PIPELINE_JOB_WORKERS, thread_name_prefix="pipeline-job")
+        return _executor
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+def _to_json(value):
+    """Normaliza o resultado do pipeline (Decimal, datas) para a coluna JSON."""
+    return json.loads(json.dumps(value, default=_json_default))
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def submit_billing_job_service(db: Session, payload: ProcessReadingsPayload, user_id: int, engine: str = 'sql',
+                               recalculate: bool = False):
+    """
+    Regista um job do pipeline de faturação e o coloca na fila do executor.
+    Retorna imediatamente o identificador do job.
+    """
+    if engine not in reading_service.BILLING_ENGINES:
+        return {"error": f"Motor de faturação inválido: {engine}. Use um de {', '.join(reading_service.BILLING_ENGINES)}."}, 400
+
+    job = PipelineJob(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        data_ref=payload.production_data.data_ref,
+        engine=engine,
+        status='queued',
+        logs=[],
+    )
+    db.add(job)
+    db.commit()
+
+    _get_executor().submit(_run_billing_job, job.id, payload, engine, recalculate)
+
+    return {
+        "message": "Pipeline de faturação colocado na fila.",
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/jobs/{job.id}",
+    }, 202
+
+
+def _run_billing_job(job_id: str, payload: ProcessReadingsPayload, engine: str, recalculate: bool = False):
+    """
+    Executa o pipeline numa thread do executor. O estado do job é gravado numa
+    sessão própria, para que o rollback do pipeline não apague o progresso.
+    """
+    job_db = SessionLocal()
+    pipeline_db = SessionLocal()
+    started = _now()
+    try:
+        job = job_db.get(PipelineJob, job_id)
+        job.status = 'running'
+        job.started_at = started
+        job_db.commit()
+
+        def on_log(entry):
+            elapsed_s = round((_now() - started).total_seconds(), 3)
+            job.logs = (job.logs or []) + [{**entry, "elapsed_s": elapsed_s}]
+            job_db.commit()
+
+        response, status_code = reading_service.run_billing_pipeline_service(
+            pipeline_db, payload, engine=engine, on_log=on_log, recalculate=recalculate
+        )
+
+        job.status = 'done' if status_code == 200 else 'failed'
+        job.status_code = status_code
+        job.result = _to_json({k: v for k, v in response.items() if k != 'logs'})
+        job.finished_at = _now()
+        job_db.commit()
+    except Exception as e:
+        job_db.rollback()
+        print(f"ERRO no job de faturação {job_id}: {e}")
+        job = job_db.get(PipelineJob, job_id)
+        if job is not None:
+            job.status = 'failed'
+            job.status_code = 500
+            job.result = {"error": f"Ocorreu um erro no job de faturação: {str(e)}"}
+            job.finished_at = _now()
+            job_db.commit()
+    finally:
+        pipeline_db.close()
+        job_db.close()
+
+
+def _last_activity(job: PipelineJob):
+    """Momento do último progresso conhecido do job: criação, início ou último log."""
+    if job.started_at is None:
+        return job.created_at
+    elapsed = max((entry.get("elapsed_s") or 0 for entry in job.logs or []), default=0)
+    return job.started_at + timedelta(seconds=elapsed)
+
+
+def _fail_if_stale(db: Session, job: PipelineJob):
+    """
+    Marca como 'failed' um job pendente sem progresso há mais de
+    PIPELINE_JOB_STALE_SECONDS. O UPDATE só vale se o job ainda estiver
+    pendente, para não sobrescrever um job que terminou entretanto.
+    """
+    last_activity = _last_activity(job)
+    if job.status not in _PENDING_STATUSES or last_activity is None:
+        return
+    if _now() - last_activity <= timedelta(seconds=PIPELINE_JOB_STALE_SECONDS):
+        return
+    db.execute(
+        update(PipelineJob)
+        .where(PipelineJob.id == job.id, PipelineJob.status.in_(_PENDING_STATUSES))
+        .values(
+            status='failed',
+            status_code=500,
+            result={"error": "O job foi interrompido antes de terminar (sem progresso registado)."},
+            finished_at=_now(),
+        )
+    )
+    db.commit()
+    db.refresh(job)
+
+
+def get_job_service(db: Session, job_id: str, user_id: int, user_profile: str):
+    """
+    Retorna o estado, os logs por fase, os tempos e o resultado de um job.
+    """
+    job = db.get(PipelineJob, job_id)
+    if not job:
+        return {'error': 'Job não encontrado.'}, 404
+    if job.user_id != user_id and user_profile != 'admin':
+        return {'error': 'Acesso negado a este job.'}, 403
+    _fail_if_stale(db, job)
+    # O pipeline escreveu fora da requisição; o LSN segue na resposta do job
+    remember_primary_write((job.result or {}).get("write_lsn"))
+    return job.to_dict(), 200
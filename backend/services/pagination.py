@@ -0,0 +1,45 @@
+# backend/services/pagination.py
+
+import base64
+import json
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+
+
+def encode_cursor(values: dict) -> str:
+    """Codifica a posição da última linha da página num token opaco."""
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token: str) -> dict:
+    """Decodifica um token de cursor. Levanta ValueError se for inválido."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Cursor inválido.")
+    if not isinstance(values, dict):
+        raise ValueError("Cursor inválido.")
+    return values
+
+
+def clamp_limit(limit) -> int:
+    """Aplica o valor padrão e o máximo permitido ao parâmetro 'limit'."""
+    if limit is None:
+        return DEFAULT_PAGE_LIMIT
+    return max(1, min(int(limit), MAX_PAGE_LIMIT))
+
+
+def page_response(items, limit: int, cursor_for) -> dict:
+    """
+    Monta a resposta paginada a partir de até limit+1 linhas: a linha extra
+    só indica que há próxima página. 'cursor_for' gera o cursor da última linha.
+    """
+    has_more = len(items) > limit
+    items = items[:limit]
+    return {
+        "items": items,
+        "next_cursor": cursor_for(items[-1]) if has_more and items else None,
+    }
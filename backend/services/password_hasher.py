@@ -0,0 +1,77 @@
+# backend/services/password_hasher.py
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Método/custo do hash (formato do werkzeug, ex.: 'pbkdf2:sha256:600000' ou 'scrypt').
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+# Hashes em execução simultânea e quantos podem aguardar na fila antes de recusar.
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', str(os.cpu_count() or 2)))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.environ.get('PASSWORD_HASH_QUEUE_LIMIT', '16'))
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', '10'))
+
+
+class HashingOverloaded(Exception):
+    """A fila de hashing está cheia ou o hash não terminou a tempo; o pedido deve ser recusado (503)."""
+
+
+class BoundedHasher:
+    """
+    Executor dedicado ao hashing de senhas. Limita o trabalho em curso a
+    workers + queue_limit; acima disso recusa de imediato em vez de acumular.
+    Um hash que não termina em 'timeout' segundos também é recusado; a tarefa
+    continua no executor e liberta o lugar quando acabar.
+    O pbkdf2 do hashlib liberta o GIL, pelo que os hashes correm em paralelo
+    sem bloquear as restantes threads do worker.
+    """
+
+    def __init__(self, workers: int, queue_limit: int, timeout: float):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self.timeout = timeout
+        self.rejected = 0
+        self.timed_out = 0
+
+    def run(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingOverloaded()
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self.timed_out += 1
+            raise HashingOverloaded() from None
+
+
+_hasher = BoundedHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT, PASSWORD_HASH_TIMEOUT)
+
+
+def hash_password(password: str) -> str:
+    """Gera o hash com o método configurado, no executor de hashing."""
+    return _hasher.run(generate_password_hash, password, method=PASSWORD_HASH_METHOD)
+
+
+def verify_password(stored_hash: str, password: str) -> bool:
+    """Verifica a senha contra o hash guardado, no executor de hashing."""
+    return _hasher.run(check_password_hash, stored_hash, password)
+
+
+@lru_cache(maxsize=1)
+def _current_method_prefix() -> str:
+    # O werkzeug completa o método com os parâmetros padrão (ex.: iterações);
+    # um hash de referência dá o prefixo exato que os hashes novos terão.
+    return hash_password('').split('$', 1)[0]
+
+
+def needs_rehash(stored_hash: str) -> bool:
+    """Indica se o hash guardado usa parâmetros diferentes dos atuais."""
+    return stored_hash.split('$', 1)[0] != _current_method_prefix()
@@ -3,59 +3,219 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import text # Importar 'text' para executar SQL
 from ..api.schemas import ProcessReadingsPayload
+from ..database import mark_primary_write
+from ..metrics import PIPELINE_RUNS, add_round_trips, track_phase
 from ..models import TempWaterBill, Unit
+from ..reports.report_cache import report_cache
+from . import report_store, rolling_stats, summary_service
+import csv
+import io
 import statistics
+import sys
 from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
 
 # --- FASE 1: Lógica de preparação e inserção ---
-def _step1_prepare_and_store_data(db: Session, payload: ProcessReadingsPayload):
+
+# Colunas gravadas na tabela temporária pela Fase 1, na ordem usada pelo COPY.
+_TEMP_COPY_COLUMNS = (
+    "data_ref", "codigo_lote", "leitura", "consumo_medido_m3", "data_leitura",
+    "mes_producao_agua_m3", "mes_compra_agua_rs", "mes_outros_gastos_rs",
+    "consumo_esgoto_m3", "consumo_produzido_m3", "consumo_comprado_m3",
+    "nome_lote", "data_display", "mes_consumo_agua_m3",
+    "mes_consumo_media_m3", "mes_consumo_mediana_m3", "mes_mensagem",
+    "media_movel_6_meses_anteriores", "media_movel_12_meses_anteriores",
+)
+
+# Insumos que decidem se a linha de uma unidade mudou entre execuções. As
+# restantes colunas da Fase 1 são sementes que as Fases 2-4 sobrescrevem.
+_TEMP_INPUT_COLUMNS = (
+    "leitura", "consumo_medido_m3", "data_leitura",
+    "mes_producao_agua_m3", "mes_compra_agua_rs", "mes_outros_gastos_rs",
+    "nome_lote", "data_display", "mes_consumo_agua_m3",
+    "mes_consumo_media_m3", "mes_consumo_mediana_m3",
+    "media_movel_6_meses_anteriores", "media_movel_12_meses_anteriores",
+)
+
+# Colunas calculadas pelas Fases 2-4; o upsert limpa-as para que as fases
+# partam sempre dos insumos, como numa linha recém-inserida.
+_TEMP_DERIVED_COLUMNS = tuple(
+    c.name for c in TempWaterBill.__table__.columns if c.name != "id" and c.name not in _TEMP_COPY_COLUMNS
+)
+
+_TEMP_KEY_COLUMNS = ("data_ref", "codigo_lote")
+
+# Valor inicial de mes_mensagem: o default da coluna no modelo, que o antigo
+# INSERT via ORM aplicava (o COPY não aplica defaults do lado do Python).
+_MENSAGEM_SEED = TempWaterBill.__table__.c.mes_mensagem.default.arg
+
+# Tabela de sessão que recebe o COPY antes do upsert; é descartada no commit.
+_STAGING_TABLE = "stage_agua_cobranca"
+
+_COPY_NULL = r"\N"
+
+
+def _to_int(value):
+    """
+    Converte um valor numérico para inteiro arredondando como o PostgreSQL
+    (metade para longe do zero), já que o COPY não faz cast de '12.5' para integer.
+    """
+    if value is None:
+        return None
+    return int(Decimal(str(value)).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def _load_unit_names(db: Session, codigos_lote):
+    """
+    Busca numa única query o nome de todas as unidades informadas.
+    Retorna um dicionário {codigo_lote: nome_lote}.
+    """
+    if not codigos_lote:
+        return {}
+    rows = db.query(Unit.codigo_lote, Unit.nome_lote).filter(Unit.codigo_lote.in_(codigos_lote)).all()
+    return {row.codigo_lote: row.nome_lote for row in rows}
+
+
+def _copy_rows_to_temp(db: Session, rows, table_name: str = TempWaterBill.__tablename__):
+    """
+    Envia as linhas para 'table_name' (por omissão 'newtemp_agua_cobranca')
+    com um único COPY FROM STDIN, dentro da mesma transação da sessão (o
+    commit continua com o orquestrador).
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for row in rows:
+        writer.writerow([_COPY_NULL if value is None else value for value in row])
+    buffer.seek(0)
+
+    copy_sql = (
+        f"COPY {table_name} ({', '.join(_TEMP_COPY_COLUMNS)}) "
+        f"FROM STDIN WITH (FORMAT csv, NULL '{_COPY_NULL}')"
+    )
+    connection = db.connection()
+    with connection.connection.cursor() as cursor:
+        cursor.copy_expert(copy_sql, buffer)
+    add_round_trips(connection)
+
+
+def _upsert_staged_rows(db: Session, data_ref_date, reseed_all: bool = False):
+    """
+    Aplica a tabela de preparação sobre 'newtemp_agua_cobranca' sem apagar e
+    reinserir o mês: insere as unidades novas, volta a semear (colunas da
+    Fase 1 e colunas calculadas limpas) apenas as existentes cujos insumos
+    mudaram e remove as unidades do mês que deixaram de vir no payload. Linhas
+    com os mesmos insumos não são regravadas, salvo com 'reseed_all'.
+    Retorna {"inserted": [...], "updated": [...], "removed": [...]} com os
+    códigos de lote novos, com insumos alterados e removidos.
     """
-    Prepara os dados brutos e insere na tabela temporária.
+    table = TempWaterBill.__tablename__
+    columns = ", ".join(_TEMP_COPY_COLUMNS)
+    set_clause = ", ".join(
+        [f"{c} = EXCLUDED.{c}" for c in _TEMP_COPY_COLUMNS if c not in _TEMP_KEY_COLUMNS]
+        + [f"{c} = NULL" for c in _TEMP_DERIVED_COLUMNS]
+    )
+    current = ", ".join(f"t.{c}" for c in _TEMP_INPUT_COLUMNS)
+    incoming = ", ".join(f"s.{c}" for c in _TEMP_INPUT_COLUMNS)
+    excluded = ", ".join(f"EXCLUDED.{c}" for c in _TEMP_INPUT_COLUMNS)
+    only_changed = "" if reseed_all else f"WHERE ({current}) IS DISTINCT FROM ({excluded}) "
+
+    # 'previous' lê o estado anterior ao upsert (mesmo snapshot do comando);
+    # xmax = 0 identifica as linhas inseridas (e não atualizadas).
+    written = db.execute(text(
+        f"WITH previous AS ("
+        f"SELECT t.codigo_lote, ({current}) IS DISTINCT FROM ({incoming}) AS changed "
+        f"FROM {_STAGING_TABLE} s JOIN {table} t "
+        f"ON t.data_ref = s.data_ref AND t.codigo_lote = s.codigo_lote), "
+        f"written AS ("
+        f"INSERT INTO {table} AS t ({columns}) SELECT {columns} FROM {_STAGING_TABLE} "
+        f"ON CONFLICT ({', '.join(_TEMP_KEY_COLUMNS)}) DO UPDATE SET {set_clause} "
+        f"{only_changed}"
+        f"RETURNING t.codigo_lote, (t.xmax = 0) AS inserted) "
+        f"SELECT w.codigo_lote, w.inserted, coalesce(p.changed, true) AS changed "
+        f"FROM written w LEFT JOIN previous p ON p.codigo_lote = w.codigo_lote"
+    )).all()
+
+    removed = db.execute(text(
+        f"DELETE FROM {table} AS t WHERE t.data_ref = :data_ref "
+        f"AND NOT EXISTS (SELECT 1 FROM {_STAGING_TABLE} s WHERE s.codigo_lote = t.codigo_lote) "
+        f"RETURNING t.codigo_lote"
+    ), {"data_ref": data_ref_date}).scalars().all()
+
+    return {
+        "inserted": sorted(r.codigo_lote for r in written if r.inserted),
+        "updated": sorted(r.codigo_lote for r in written if not r.inserted and r.changed),
+        "removed": sorted(removed),
+    }
+
+
+def _step1_prepare_and_store_data(db: Session, payload: ProcessReadingsPayload, reseed_all: bool = False):
+    """
+    Prepara os dados brutos e grava-os na tabela temporária por upsert na
+    chave (data_ref, codigo_lote): uma nova submissão do mesmo mês só volta a
+    semear as linhas cujos insumos mudaram (todas, com 'reseed_all'), remove
+    as unidades que saíram do payload e indica quais tiveram os insumos alterados.
+    Os nomes das unidades são carregados numa única query e as linhas são
+    enviadas via COPY para uma tabela de sessão, sem criar objetos ORM.
+    Retorna os códigos de lote inseridos, atualizados e removidos.
     Levanta uma exceção em caso de erro.
     """
     production_data = payload.production_data
     unit_readings = payload.unit_readings
     data_ref_date = production_data.data_ref
 
-    # Limpar registos antigos para a mesma data_ref
-    db.query(TempWaterBill).filter(TempWaterBill.data_ref == data_ref_date).delete(synchronize_session=False)
-    
     consumptions = [r.consumo for r in unit_readings if r.consumo is not None and r.consumo >= 0]
     total_consumption = sum(consumptions) if consumptions else 0
     average_consumption = statistics.mean(consumptions) if consumptions else 0
     median_consumption = statistics.median(consumptions) if consumptions else 0
     data_display = data_ref_date.strftime("%b-%Y").capitalize()
 
-    objects_to_add = []
+    unit_names = _load_unit_names(db, {r.codigo_lote for r in unit_readings})
+    # Médias móveis dos meses anteriores, a partir da janela guardada de cada unidade
+    moving_averages = rolling_stats.apply_month(
+        db, data_ref_date, {r.codigo_lote: _to_int(r.consumo) for r in unit_readings}
+    )
+
+    rows = []
     for reading in unit_readings:
-        unit_info = db.query(Unit.nome_lote).filter(Unit.codigo_lote == reading.codigo_lote).first()
-        nome_lote = unit_info.nome_lote if unit_info else f"Lote {reading.codigo_lote}"
-
-        temp_bill_entry = TempWaterBill(
-            data_ref=data_ref_date,
-            codigo_lote=reading.codigo_lote,
-            leitura=reading.leitura_atual,
-            consumo_medido_m3=reading.consumo,
-            data_leitura=reading.data_leitura_atual,
-            mes_producao_agua_m3=production_data.producao_m3,
-            mes_compra_agua_rs=production_data.compra_rs,
-            mes_outros_gastos_rs=production_data.outros_rs,
-            consumo_esgoto_m3=reading.consumo,
-            consumo_produzido_m3=reading.consumo,
-            consumo_comprado_m3=0,
-            nome_lote=nome_lote,
-            data_display=data_display,
-            mes_consumo_agua_m3=total_consumption,
-            mes_consumo_media_m3=average_consumption,
-            mes_consumo_mediana_m3=median_consumption,
-        )
-        objects_to_add.append(temp_bill_entry)
-
-    if objects_to_add:
-        db.bulk_save_objects(objects_to_add)
-    
+        nome_lote = unit_names[reading.codigo_lote] if reading.codigo_lote in unit_names else f"Lote {reading.codigo_lote}"
+        consumo = _to_int(reading.consumo)
+        media_6, media_12 = moving_averages[reading.codigo_lote]
+        rows.append((
+            data_ref_date.isoformat(),
+            reading.codigo_lote,
+            _to_int(reading.leitura_atual),
+            consumo,
+            reading.data_leitura_atual.isoformat() if reading.data_leitura_atual else None,
+            _to_int(production_data.producao_m3),
+            production_data.compra_rs,
+            production_data.outros_rs,
+            consumo,
+            consumo,
+            0,
+            nome_lote,
+            data_display,
+            _to_int(total_consumption),
+            _to_int(average_consumption),
+            _to_int(median_consumption),
+            _MENSAGEM_SEED,
+            media_6,
+            media_12,
+        ))
+
+    db.execute(text(
+        f"CREATE TEMP TABLE {_STAGING_TABLE} ON COMMIT DROP AS "
+        f"SELECT {', '.join(_TEMP_COPY_COLUMNS)} FROM {TempWaterBill.__tablename__} WITH NO DATA"
+    ))
+    if rows:
+        _copy_rows_to_temp(db, rows, _STAGING_TABLE)
+    changes = _upsert_staged_rows(db, data_ref_date, reseed_all=reseed_all)
+
     # O commit é feito pelo orquestrador
-    print("Fase 1: Dados preparados e inseridos na tabela temporária com sucesso.")
+    print(
+        f"Fase 1: {len(rows)} registos preparados; {len(changes['inserted'])} inseridos, "
+        f"{len(changes['updated'])} atualizados e {len(changes['removed'])} removidos na tabela temporária."
+    )
+    return changes
 
 
 # --- FASE 2: Execução do cálculo de custos ---
@@ -68,6 +228,19 @@ def _step2_run_calculation_rules(db: Session, data_ref: date):
     print("Fase 2: 'Update_20_calculoRS' executado com sucesso.")
 
 
+def _step2_run_engine(db: Session, data_ref: date):
+    """
+    Alternativa à Fase 2/3: calcula custos e totais com o motor vetorizado
+    em memória e grava o resultado com um único UPDATE.
+    Levanta uma exceção em caso de erro.
+    """
+    # Importado aqui para que o numpy não seja carregado no arranque do worker
+    from . import billing_engine
+    updated = billing_engine.run_engine_for_month(db, data_ref)
+    print(f"Fase 2: motor de faturação calculou {updated} registos com sucesso.")
+    return updated
+
+
 # --- FASE 3: Execução do cálculo de totais ---
 def _step3_run_total_rules(db: Session, data_ref: date):
     """
@@ -88,68 +261,171 @@ def _step4_run_mensagens(db: Session, data_ref: date):
 
 
 # --- FUNÇÃO ORQUESTRADORA PRINCIPAL ---
-def run_billing_pipeline_service(db: Session, payload: ProcessReadingsPayload):
+def _bill_to_dict(r):
+    """Converte uma linha da tabela temporária no formato devolvido ao frontend."""
+    return {
+        "codigo_lote": r.codigo_lote,
+        "nome_lote": r.nome_lote,
+        "prod_rs": r.cobrado_agua_prod_rs,
+        "esgoto_rs": r.total_esgoto_rs,
+        "comp_rs": r.cobrado_agua_comp_rs,
+        "outros_rs": r.cobrado_outros_gastos_rs,
+        "total_rs": r.total_conta_rs,
+        "faixa_agua": r.faixa_agua,
+        "tarifa_agua": r.tarifa_agua,
+        "deduzir_agua": r.deduzir_agua,
+        "faixa_esgoto": r.faixa_esgoto,
+        "tarifa_esgoto": r.tarifa_esgoto,
+        "deduzir_esgoto": r.deduzir_esgoto,
+        "mensagem": r.mes_mensagem
+    }
+
+
+def _month_bills(db: Session, data_ref_date):
+    """Contas do mês na tabela temporária, ordenadas por unidade."""
+    return db.query(TempWaterBill).filter(TempWaterBill.data_ref == data_ref_date).order_by(TempWaterBill.codigo_lote).all()
+
+
+def _invalidate_distribution(data_ref_date):
+    """
+    Descarta a distribuição do mês em cache. Se o módulo ainda não foi
+    carregado neste processo não há cache a limpar, e o numpy fica por carregar.
+    """
+    distribution_service = sys.modules.get(f"{__package__}.distribution_service")
+    if distribution_service is not None:
+        distribution_service.invalidate_distribution(data_ref_date)
+
+
+def _refresh_report_store(db: Session, data_ref_date, log):
+    """
+    Desloca a janela do relatório de 24 meses com o mês recém-gravado. Uma
+    falha aqui não desfaz a faturação já confirmada: fica registada no log e
+    o relatório pode ser reconstruído com 'python -m backend.reports rebuild-24m'.
+    """
+    try:
+        counts = report_store.apply_month_to_report_store(db, data_ref_date)
+        db.commit()
+        log("OK", f"Relatório 24m atualizado: {counts['updated']} unidades deslocadas, {counts['rebuilt']} recalculadas.")
+    except Exception as e:
+        db.rollback()
+        log("ERRO", f"Falha ao atualizar o relatório 24m: {str(e)}")
+
+
+BILLING_ENGINES = ('sql', 'python')
+
+def run_billing_pipeline_service(db: Session, payload: ProcessReadingsPayload, engine: str = 'sql', on_log=None,
+                                 recalculate: bool = False):
     """
     Orquestra a execução sequencial do pipeline de faturação.
     Gere a transação: ou tudo é bem-sucedido, ou tudo é revertido.
+    Com engine='python', as Fases 2 e 3 são calculadas pelo motor vetorizado
+    em vez de procedure_update_20/30.
+    'on_log', se informado, é chamado com cada entrada de log assim que ela é
+    produzida (usado pelo modo assíncrono para publicar o progresso).
+    Se o mês já foi faturado e a Fase 1 não encontrou insumos alterados, as
+    Fases 2-4 (que recalculam o mês inteiro) não são executadas e nenhuma
+    linha é regravada. 'recalculate' força o recálculo completo do mês, por
+    exemplo depois de corrigir as tarifas.
     """
+    if engine not in BILLING_ENGINES:
+        return {"error": f"Motor de faturação inválido: {engine}. Use um de {', '.join(BILLING_ENGINES)}."}, 400
+
     data_ref_date = payload.production_data.data_ref
     logs = []
 
+    def log(status, message, timing=None):
+        entry = {"status": status, "message": message}
+        if timing is not None:
+            entry.update(timing.as_log())
+        logs.append(entry)
+        if on_log:
+            on_log(entry)
+
     try:
-        # Fase 1: Inserir dados na tabela temporária
-        _step1_prepare_and_store_data(db, payload)
-        logs.append({"status": "OK", "message": "Fase 1: Dados preparados e inseridos na tabela temporária."})
+        # Contas da execução anterior do mesmo mês, para apurar o que mudou
+        previous_bills = {r.codigo_lote: _bill_to_dict(r) for r in _month_bills(db, data_ref_date)}
 
-        # Fase 2: Executar o primeiro cálculo
-        _step2_run_calculation_rules(db, data_ref_date)
-        logs.append({"status": "OK", "message": "Fase 2: Procedimento de cálculo de custos executado."})
+        # Fase 1: Gravar na tabela temporária apenas o que mudou
+        with track_phase(db, "fase1", engine) as timing:
+            changes = _step1_prepare_and_store_data(db, payload, reseed_all=recalculate)
+            timing.rows = len(changes["inserted"]) + len(changes["updated"]) + len(changes["removed"])
+        log("OK", (
+            f"Fase 1: Dados preparados na tabela temporária: {len(changes['inserted'])} unidades novas, "
+            f"{len(changes['updated'])} com insumos alterados, {len(changes['removed'])} removidas."
+        ), timing)
 
-        # Fase 3: Executar o segundo cálculo
-        _step3_run_total_rules(db, data_ref_date)
-        logs.append({"status": "OK", "message": "Fase 3: Procedimento de cálculo de totais executado."})
+        # As procedures recalculam o mês inteiro: as linhas afetadas são as unidades do payload
+        month_rows = len(payload.unit_readings)
+        unchanged = not recalculate and bool(previous_bills) and not any(changes.values())
 
-        # Fase 4: Executar as mensagens
-        _step4_run_mensagens(db, data_ref_date)
-        logs.append({"status": "OK", "message": "Fase 4: Procedimento de mensagens."})
+        if unchanged:
+            log("OK", "Fases 2-4 ignoradas: nenhum insumo do mês mudou desde a execução anterior.")
+        elif engine == 'python':
+            # Fases 2 e 3: custos e totais calculados em memória
+            with track_phase(db, "fase2_3", engine) as timing:
+                timing.rows = _step2_run_engine(db, data_ref_date)
+            log("OK", "Fase 2: Custos calculados pelo motor de faturação.", timing)
+            log("OK", "Fase 3: Totais calculados pelo motor de faturação.")
+        else:
+            # Fase 2: Executar o primeiro cálculo
+            with track_phase(db, "fase2", engine) as timing:
+                _step2_run_calculation_rules(db, data_ref_date)
+                timing.rows = month_rows
+            log("OK", "Fase 2: Procedimento de cálculo de custos executado.", timing)
 
+            # Fase 3: Executar o segundo cálculo
+            with track_phase(db, "fase3", engine) as timing:
+                _step3_run_total_rules(db, data_ref_date)
+                timing.rows = month_rows
+            log("OK", "Fase 3: Procedimento de cálculo de totais executado.", timing)
+
+        if not unchanged:
+            # Fase 4: Executar as mensagens
+            with track_phase(db, "fase4", engine) as timing:
+                _step4_run_mensagens(db, data_ref_date)
+                timing.rows = month_rows
+            log("OK", "Fase 4: Procedimento de mensagens.", timing)
 
         # Se todas as etapas foram bem-sucedidas, faz o commit
         db.commit()
+        PIPELINE_RUNS.labels(engine, "ok").inc()
+        write_lsn = mark_primary_write(db)
+        _invalidate_distribution(data_ref_date)
+        summary_service.invalidate_monthly_summary(data_ref_date)
+        report_cache.invalidate()
+        _refresh_report_store(db, data_ref_date, log)
 
         # Após o commit, busca os resultados calculados para retornar ao frontend
-        results = db.query(TempWaterBill).filter(TempWaterBill.data_ref == data_ref_date).order_by(TempWaterBill.codigo_lote).all()
-        logs.append({"status": "OK", "message": f"{len(results)} registos processados e retornados com sucesso."})
-        
+        results = _month_bills(db, data_ref_date)
+        log("OK", f"{len(results)} registos processados e retornados com sucesso.")
+
         # Converte os resultados para um formato serializável (dicionário)
-        processed_data = [{
-            "codigo_lote": r.codigo_lote,
-            "nome_lote": r.nome_lote,
-            "prod_rs": r.cobrado_agua_prod_rs,
-            "esgoto_rs": r.total_esgoto_rs,
-            "comp_rs": r.cobrado_agua_comp_rs,
-            "outros_rs": r.cobrado_outros_gastos_rs,
-            "total_rs": r.total_conta_rs,
-            "faixa_agua": r.faixa_agua,
-            "tarifa_agua": r.tarifa_agua,
-            "deduzir_agua": r.deduzir_agua,
-            "faixa_esgoto": r.faixa_esgoto,
-            "tarifa_esgoto": r.tarifa_esgoto,
-            "deduzir_esgoto": r.deduzir_esgoto,
-            "mensagem": r.mes_mensagem
-        } for r in results]
+        processed_data = [_bill_to_dict(r) for r in results]
+
+        # Unidades cuja conta difere da execução anterior (ou que são novas no mês)
+        changed_units = [b["codigo_lote"] for b in processed_data if previous_bills.get(b["codigo_lote"]) != b]
+        if previous_bills:
+            log("OK", (
+                f"{len(changed_units)} contas alteradas face à execução anterior"
+                + (f": {', '.join(map(str, changed_units))}." if changed_units else ".")
+            ))
 
         return {
             "message": "Pipeline de faturação executado com sucesso.",
             "logs": logs,
             "data": processed_data,
+            "changed_units": changed_units,
+            "removed_units": changes["removed"],
+            # Posição da escrita no WAL, para a leitura das próprias escritas em modo job
+            "write_lsn": write_lsn,
         }, 200
 
     except Exception as e:
         # Se qualquer etapa falhar, reverte todas as alterações
         db.rollback()
+        PIPELINE_RUNS.labels(engine, "erro").inc()
         error_message = f"Ocorreu um erro no pipeline de faturação: {str(e)}"
         print(f"ERRO no pipeline de faturação: {error_message}")
-        logs.append({"status": "ERRO", "message": error_message})
+        log("ERRO", error_message)
         # Retorna uma mensagem de erro específica para o frontend
         return {"error": error_message, "logs": logs}, 500
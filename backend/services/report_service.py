@@ -1,34 +1,55 @@
 # backend/services/report_service.py
 
+import hashlib
+import io
+import os
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from ..models import UserLote, Unit
-from ..reports.report_generator import generate_consumption_chart, create_unit_report_pdf
+from sqlalchemy import func
+from ..models import Unit, WaterBill, report_24m_store
+from . import access_service, report_store
+from ..reports.report_cache import report_cache
+
+# 'vector' desenha o gráfico com reportlab.graphics; 'matplotlib' mantém o PNG antigo.
+REPORT_CHART_RENDERER = os.environ.get("REPORT_CHART_RENDERER", "vector")
+# Linhas lidas do cursor do servidor por vez no modo streaming do relatório 24m.
+REPORT_24M_STREAM_CHUNK = int(os.environ.get("REPORT_24M_STREAM_CHUNK", "500"))
+
+def _report_data_version(db: Session, codigo_lote: int) -> str:
+    """
+    Versão dos dados do relatório de uma unidade: muda quando um mês da
+    unidade é gravado ou reprocessado e também a cada atualização do relatório
+    pré-calculado, que traz a mediana e o ranking de todo o condomínio.
+    Como vem do banco, a versão é a mesma em todos os processos.
+    """
+    row = db.query(
+        func.max(WaterBill.data_ref),
+        func.count(WaterBill.id),
+        func.sum(WaterBill.total_conta_rs),
+        func.sum(WaterBill.consumo_medido_m3),
+    ).filter(WaterBill.codigo_lote == codigo_lote).one()
+    store_updated_at = db.query(func.max(report_24m_store.c.updated_at)).scalar()
+    return hashlib.sha1(repr((*row, store_updated_at)).encode()).hexdigest()[:16]
 
 def generate_report_for_unit_service(db: Session, user_id: int, codigo_lote: int):
     """
     Lógica de negócio para gerar um relatório em PDF para uma unidade.
     Verifica permissão, busca dados, e chama os geradores de gráfico e PDF.
+    PDFs já gerados para a mesma versão dos dados são servidos da cache.
     """
     # 1. Verifica se o usuário tem acesso à unidade
-    user_has_access = db.query(UserLote).filter(
-        UserLote.user_id == user_id,
-        UserLote.codigo_lote == codigo_lote
-    ).first()
-
-    if not user_has_access:
+    if not access_service.user_has_unit_access(db, user_id, codigo_lote):
         return {'error': 'Acesso negado a esta unidade para geração de relatório.'}, 403
 
-    # 2. Busca os dados da view
-    query_result = db.execute(
-        text("SELECT * FROM vw_relatorio_24m WHERE codigo_lote = :codigo_lote"),
-        {"codigo_lote": codigo_lote}
-    ).fetchone()
+    data_version = _report_data_version(db, codigo_lote)
+    cached_pdf = report_cache.get(codigo_lote, data_version)
+    if cached_pdf is not None:
+        return io.BytesIO(cached_pdf), 200
+
+    # 2. Busca os dados do relatório de 24 meses pré-calculado
+    unit_report_data = report_store.fetch_unit_report(db, codigo_lote)
 
-    if not query_result:
+    if not unit_report_data:
         return {'error': f'Dados de relatório não encontrados para a unidade {codigo_lote}.'}, 404
-    
-    unit_report_data = dict(query_result._mapping)
 
     unit_obj = db.query(Unit).filter(Unit.codigo_lote == codigo_lote).first()
     unit_name = unit_obj.nome_lote if unit_obj else f"Unidade {codigo_lote}"
@@ -47,17 +68,24 @@ def generate_report_for_unit_service(db: Session, user_id: int, codigo_lote: int
     months_labels.reverse()
 
     # 4. Gera o gráfico e o PDF
-    chart_buffer = generate_consumption_chart(consumption_data, median_data, months_labels, unit_name)
+    # Importado aqui para que workers que só servem JSON não carreguem ReportLab/matplotlib
+    from ..reports.report_generator import generate_consumption_chart, generate_consumption_drawing, create_unit_report_pdf
+
+    if REPORT_CHART_RENDERER == 'matplotlib':
+        chart_buffer = generate_consumption_chart(consumption_data, median_data, months_labels, unit_name)
+    else:
+        chart_buffer = generate_consumption_drawing(consumption_data, median_data, months_labels, unit_name)
     pdf_buffer = create_unit_report_pdf(unit_report_data, chart_buffer)
+    report_cache.put(codigo_lote, data_version, pdf_buffer.getvalue())
 
     return pdf_buffer, 200 # Retorna o buffer do PDF em caso de sucesso
 
 def get_24m_report_data(db: Session):
     """
-    Busca todos os dados da tabela report_24m.
+    Busca o relatório de 24 meses de todas as unidades.
     """
     try:
-        query_result = db.execute(text("SELECT * FROM public.report_24m")).fetchall()
+        query_result = db.execute(report_store.all_units_query(db)).fetchall()
         
         if not query_result:
             return [], 200
@@ -70,3 +98,23 @@ def get_24m_report_data(db: Session):
     except Exception as e:
         print(f"Erro ao buscar dados do relatório 24m: {e}")
         return {'error': 'Ocorreu um erro interno ao buscar os dados do relatório.'}, 500
+
+def stream_24m_report_data(db: Session, chunk_size: int = REPORT_24M_STREAM_CHUNK):
+    """
+    Lê o relatório de 24 meses por um cursor do lado do servidor, sem carregar
+    a tabela inteira. Retorna (colunas, gerador de blocos de até 'chunk_size'
+    dicionários).
+    """
+    result = db.execute(
+        report_store.all_units_query(db),
+        execution_options={"stream_results": True, "yield_per": chunk_size},
+    )
+
+    def chunks():
+        try:
+            for partition in result.partitions(chunk_size):
+                yield [dict(row._mapping) for row in partition]
+        finally:
+            result.close()
+
+    return list(result.keys()), chunks()
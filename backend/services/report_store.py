@@ -0,0 +1,218 @@
+# backend/services/report_store.py
+
+import math
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from ..models import REPORT_24M_FIELDS, REPORT_24M_MONTHS, WaterBill, report_24m_store
+from .date_utils import month_range
+
+STORE_TABLE = report_24m_store.name
+LEGACY_UNIT_VIEW = "vw_relatorio_24m"
+LEGACY_TABLE = "public.report_24m"
+
+_FIELD_NAMES = [name for name, _ in REPORT_24M_FIELDS]
+_SLOT_COLUMNS = [f"mes{i:02d}_{name}" for i in range(1, REPORT_24M_MONTHS + 1) for name in _FIELD_NAMES]
+
+# Valores de cada mês a partir de 'newtab_agua_cobranca'. O ranking é a posição
+# do consumo da unidade entre todas as unidades no mesmo mês (maior = 1).
+_BILL_FIELDS_SQL = """b.codigo_lote,
+        b.data_ref,
+        b.data_display AS data_display,
+        b.mes_consumo_mediana_m3 AS mediana,
+        b.consumo_medido_m3 AS consumo,
+        RANK() OVER (PARTITION BY b.data_ref ORDER BY b.consumo_medido_m3 DESC NULLS LAST) AS ranking,
+        b.total_conta_rs AS total_conta,
+        b.mes_mensagem AS mensagem"""
+
+_store_populated = False
+
+
+def _rebuild_sql(only_units: bool) -> str:
+    slot_values = ",\n    ".join(
+        f"MAX({name}) FILTER (WHERE slot = {i})"
+        for i in range(1, REPORT_24M_MONTHS + 1) for name in _FIELD_NAMES
+    )
+    updates = ",\n    ".join(f"{c} = EXCLUDED.{c}" for c in ["data_ref", *_SLOT_COLUMNS, "updated_at"])
+    unit_filter = "AND codigo_lote = ANY(:codigo_lotes)" if only_units else ""
+    return f"""
+WITH ranked AS (
+    SELECT {_BILL_FIELDS_SQL},
+        ROW_NUMBER() OVER (PARTITION BY b.codigo_lote ORDER BY b.data_ref DESC) AS slot
+    FROM {WaterBill.__tablename__} b
+    WHERE b.codigo_lote IS NOT NULL
+)
+INSERT INTO {STORE_TABLE} (codigo_lote, data_ref, {", ".join(_SLOT_COLUMNS)}, updated_at)
+SELECT codigo_lote, MAX(data_ref),
+    {slot_values},
+    now()
+FROM ranked
+WHERE slot <= {REPORT_24M_MONTHS} {unit_filter}
+GROUP BY codigo_lote
+ON CONFLICT (codigo_lote) DO UPDATE SET
+    {updates}
+"""
+
+
+def _apply_month_sql() -> str:
+    # Num UPDATE o lado direito vê sempre os valores antigos da linha, por isso
+    # mesNN = mes(NN-1) desloca a janela inteira numa só passagem.
+    shifted = [
+        f"mes{i:02d}_{name} = CASE WHEN r.data_ref < m.data_ref "
+        f"THEN r.mes{i - 1:02d}_{name} ELSE r.mes{i:02d}_{name} END"
+        for i in range(REPORT_24M_MONTHS, 1, -1) for name in _FIELD_NAMES
+    ]
+    newest = [f"mes01_{name} = m.{name}" for name in _FIELD_NAMES]
+    assignments = ",\n    ".join(["data_ref = m.data_ref", *shifted, *newest, "updated_at = now()"])
+    return f"""
+WITH m AS (
+    SELECT {_BILL_FIELDS_SQL}
+    FROM {WaterBill.__tablename__} b
+    WHERE b.data_ref >= :start AND b.data_ref < :next AND b.codigo_lote IS NOT NULL
+)
+UPDATE {STORE_TABLE} AS r SET
+    {assignments}
+FROM m
+WHERE r.codigo_lote = m.codigo_lote AND r.data_ref <= m.data_ref
+"""
+
+
+def rebuild_report_store(db: Session, codigo_lotes=None) -> int:
+    """
+    Recalcula o relatório a partir do histórico completo, para todas as
+    unidades ou só para 'codigo_lotes'. Não faz commit. Retorna as linhas gravadas.
+    """
+    global _store_populated
+    if codigo_lotes is None:
+        db.execute(text(f"DELETE FROM {STORE_TABLE}"))
+        result = db.execute(text(_rebuild_sql(only_units=False)))
+    else:
+        if not codigo_lotes:
+            return 0
+        result = db.execute(text(_rebuild_sql(only_units=True)), {"codigo_lotes": list(codigo_lotes)})
+    _store_populated = _store_populated or result.rowcount > 0
+    return result.rowcount
+
+
+def apply_month_to_report_store(db: Session, data_ref) -> dict:
+    """
+    Atualiza o relatório com o mês 'data_ref' já gravado em newtab_agua_cobranca.
+    Unidades cujo último mês é anterior deslocam a janela em um mês; se é o
+    mesmo mês (reprocessamento), só mes01 é regravado. Unidades sem linha no
+    relatório ou com meses mais recentes que 'data_ref' são recalculadas do
+    histórico. Não faz commit.
+    """
+    global _store_populated
+    start, next_month = month_range(data_ref)
+    params = {"start": start, "next": next_month}
+
+    updated = db.execute(text(_apply_month_sql()), params).rowcount
+    stale_units = db.execute(text(f"""
+        SELECT b.codigo_lote
+        FROM {WaterBill.__tablename__} b
+        LEFT JOIN {STORE_TABLE} r ON r.codigo_lote = b.codigo_lote
+        WHERE b.data_ref >= :start AND b.data_ref < :next AND b.codigo_lote IS NOT NULL
+          AND (r.codigo_lote IS NULL OR r.data_ref > b.data_ref)
+    """), params).scalars().all()
+    rebuilt = rebuild_report_store(db, stale_units)
+    _store_populated = _store_populated or updated > 0
+    return {"updated": updated, "rebuilt": rebuilt}
+
+
+def _store_ready(db: Session) -> bool:
+    """Indica se o relatório pré-calculado já foi construído (tabela existe e tem linhas)."""
+    global _store_populated
+    if not _store_populated:
+        exists = db.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": STORE_TABLE}).scalar()
+        _store_populated = bool(exists) and db.execute(
+            text(f"SELECT EXISTS (SELECT 1 FROM {STORE_TABLE})")
+        ).scalar()
+    return _store_populated
+
+
+def _report_columns():
+    return [c for c in report_24m_store.c if c.name != "updated_at"]
+
+
+def fetch_unit_report(db: Session, codigo_lote: int) -> Optional[dict]:
+    """
+    Linha do relatório de 24 meses de uma unidade. Usa o relatório
+    pré-calculado e, se a unidade ainda não estiver nele, a view antiga.
+    """
+    row = None
+    if _store_ready(db):
+        row = db.execute(
+            select(*_report_columns()).where(report_24m_store.c.codigo_lote == codigo_lote)
+        ).first()
+    if row is None:
+        row = db.execute(
+            text(f"SELECT * FROM {LEGACY_UNIT_VIEW} WHERE codigo_lote = :codigo_lote"),
+            {"codigo_lote": codigo_lote}
+        ).first()
+    return dict(row._mapping) if row else None
+
+
+def all_units_query(db: Session):
+    """Query de todas as unidades: o relatório pré-calculado ou, antes de construído, 'report_24m'."""
+    if _store_ready(db):
+        return select(*_report_columns())
+    return text(f"SELECT * FROM {LEGACY_TABLE}")
+
+
+def _same_value(a, b) -> bool:
+    if a is None or b is None:
+        return a is None and b is None
+    if hasattr(a, "isoformat") or hasattr(b, "isoformat"):
+        as_date = lambda v: v.date() if isinstance(v, datetime) else v
+        return as_date(a) == as_date(b)
+    if isinstance(a, str) or isinstance(b, str):
+        return str(a) == str(b)
+    return math.isclose(float(a), float(b), abs_tol=0.005)
+
+
+def check_report_store(db: Session, max_mismatches: int = 50) -> dict:
+    """
+    Compara o relatório pré-calculado com vw_relatorio_24m: unidades presentes
+    só de um dos lados, colunas do relatório em falta na view e, nas unidades
+    comuns, os valores coluna a coluna. Retorna as divergências encontradas.
+    """
+    store_result = db.execute(select(*_report_columns()))
+    store_rows = {r.codigo_lote: dict(r._mapping) for r in store_result}
+    view_result = db.execute(text(f"SELECT * FROM {LEGACY_UNIT_VIEW}"))
+    view_columns = set(view_result.keys())
+    view_rows = {r.codigo_lote: dict(r._mapping) for r in view_result}
+
+    # 'data_ref' só existe no relatório pré-calculado (marca o mês de mes01_*)
+    compared_columns = ["codigo_lote", *_SLOT_COLUMNS]
+    missing_columns = [c for c in compared_columns if c not in view_columns]
+    unit_difference = store_rows.keys() ^ view_rows.keys()
+
+    mismatches = []
+    mismatch_count = 0
+    for codigo_lote in sorted(store_rows.keys() & view_rows.keys()):
+        store_row, view_row = store_rows[codigo_lote], view_rows[codigo_lote]
+        for column in compared_columns:
+            if column in missing_columns:
+                continue
+            if not _same_value(store_row[column], view_row[column]):
+                mismatch_count += 1
+                if len(mismatches) < max_mismatches:
+                    mismatches.append({
+                        "codigo_lote": codigo_lote,
+                        "column": column,
+                        "store": store_row[column],
+                        "view": view_row[column],
+                    })
+
+    return {
+        "consistent": not (mismatch_count or unit_difference or missing_columns),
+        "units_compared": len(store_rows.keys() & view_rows.keys()),
+        "mismatch_count": mismatch_count,
+        "mismatches": mismatches,
+        "missing_in_store": sorted(unit_difference - store_rows.keys()),
+        "missing_in_view": sorted(unit_difference - view_rows.keys()),
+        "columns_missing_in_view": missing_columns,
+    }
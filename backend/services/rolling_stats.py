@@ -0,0 +1,340 @@
+# backend/services/rolling_stats.py
+
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+import math
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..models import ConsumptionWindow, WaterBill
+
+# Meses guardados por unidade: o último mês faturado e os 12 anteriores, o
+# suficiente para calcular as médias de qualquer mês >= ultimo_mes.
+WINDOW_MONTHS = 13
+
+
+def _month_index(value) -> int:
+    return value.year * 12 + value.month - 1
+
+
+def _month_date(index: int) -> date:
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _round_half_up(value) -> Optional[int]:
+    """Arredonda como o PostgreSQL (metade para longe do zero)."""
+    if value is None:
+        return None
+    return int(Decimal(str(value)).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def _average(values) -> Optional[int]:
+    present = [v for v in values if v is not None]
+    return _round_half_up(sum(present) / len(present)) if present else None
+
+
+class RollingWindow:
+    """
+    Janela deslizante de consumos de uma unidade. 'values' é um buffer de
+    WINDOW_MONTHS posições (values[0] = mês 'last'); as somas e contagens das
+    janelas de 6 e 12 meses terminadas em 'last' são mantidas a cada avanço.
+    """
+
+    __slots__ = ("last", "values", "sum6", "count6", "sum12", "count12")
+
+    def __init__(self, last: Optional[int] = None, values: Optional[List[Optional[int]]] = None):
+        self.last = last
+        self.values = list(values) if values is not None else [None] * WINDOW_MONTHS
+        self._recompute_sums()
+
+    @classmethod
+    def from_state(cls, state: ConsumptionWindow) -> "RollingWindow":
+        window = cls.__new__(cls)
+        window.last = _month_index(state.ultimo_mes)
+        window.values = list(state.consumos)
+        window.sum6, window.count6 = state.soma_6, state.contagem_6
+        window.sum12, window.count12 = state.soma_12, state.contagem_12
+        return window
+
+    @classmethod
+    def from_history(cls, consumo_by_month: Dict[int, Optional[int]]) -> "RollingWindow":
+        """Janela a partir do histórico completo {índice do mês: consumo}."""
+        if not consumo_by_month:
+            return cls()
+        last = max(consumo_by_month)
+        return cls(last, [consumo_by_month.get(last - i) for i in range(WINDOW_MONTHS)])
+
+    def _recompute_sums(self):
+        head6 = [v for v in self.values[:6] if v is not None]
+        head12 = [v for v in self.values[:12] if v is not None]
+        self.sum6, self.count6 = sum(head6), len(head6)
+        self.sum12, self.count12 = sum(head12), len(head12)
+
+    def covers(self, month: int) -> bool:
+        """Indica se as médias de 'month' podem sair da janela (meses anteriores presentes)."""
+        return self.last is None or month >= self.last
+
+    def value_at(self, month: int) -> Optional[int]:
+        if self.last is None or not 0 <= self.last - month < WINDOW_MONTHS:
+            return None
+        return self.values[self.last - month]
+
+    def averages_before(self, month: int) -> Tuple[Optional[int], Optional[int]]:
+        """Médias dos 6 e 12 meses anteriores a 'month'. Requer covers(month)."""
+        if self.last is not None and month == self.last + 1:
+            avg6 = _round_half_up(self.sum6 / self.count6) if self.count6 else None
+            avg12 = _round_half_up(self.sum12 / self.count12) if self.count12 else None
+            return avg6, avg12
+        previous = [self.value_at(month - i) for i in range(1, 13)]
+        return _average(previous[:6]), _average(previous)
+
+    def push(self, month: int, consumo: Optional[int]):
+        """Grava o consumo de 'month'. Avançar um mês custa O(1)."""
+        if self.last is None:
+            self.last = month
+            self.values = [consumo] + [None] * (WINDOW_MONTHS - 1)
+            self._recompute_sums()
+        elif month == self.last + 1:
+            leaving6, leaving12 = self.values[5], self.values[11]
+            self.values = [consumo] + self.values[:-1]
+            self.last = month
+            self.sum6 += (consumo or 0) - (leaving6 or 0)
+            self.count6 += (consumo is not None) - (leaving6 is not None)
+            self.sum12 += (consumo or 0) - (leaving12 or 0)
+            self.count12 += (consumo is not None) - (leaving12 is not None)
+        elif month > self.last:
+            gap = min(month - self.last, WINDOW_MONTHS)
+            self.values = [consumo] + [None] * (gap - 1) + self.values[:WINDOW_MONTHS - gap]
+            self.last = month
+            self._recompute_sums()
+        elif self.last - month < WINDOW_MONTHS:
+            self.values[self.last - month] = consumo
+            self._recompute_sums()
+
+    def as_row(self, codigo_lote: int) -> dict:
+        return {
+            "codigo_lote": codigo_lote,
+            "ultimo_mes": _month_date(self.last),
+            "consumos": self.values,
+            "soma_6": self.sum6,
+            "contagem_6": self.count6,
+            "soma_12": self.sum12,
+            "contagem_12": self.count12,
+        }
+
+
+# --- Histórico e cálculo vetorizado ---
+
+def _load_history(db: Session, codigo_lotes=None):
+    """(id, codigo_lote, data_ref, consumo) de newtab_agua_cobranca, por unidade e mês."""
+    query = select(
+        WaterBill.id, WaterBill.codigo_lote, WaterBill.data_ref, WaterBill.consumo_medido_m3
+    ).where(WaterBill.codigo_lote.isnot(None))
+    if codigo_lotes is not None:
+        query = query.where(WaterBill.codigo_lote.in_(list(codigo_lotes)))
+    return db.execute(query.order_by(WaterBill.codigo_lote, WaterBill.data_ref)).all()
+
+
+def _np_round_half_up(values: "np.ndarray") -> "np.ndarray":
+    import numpy as np
+    return np.sign(values) * np.floor(np.abs(values) + 0.5)
+
+
+def compute_windows_vectorized(rows):
+    """
+    Calcula de uma vez, para todas as contas de 'rows', as médias dos 6 e 12
+    meses anteriores (somas acumuladas sobre uma matriz unidade x mês), e a
+    janela final de cada unidade. Retorna (avg6, avg12, {codigo_lote: RollingWindow});
+    as médias são arrays float alinhados com 'rows' (NaN = sem meses anteriores).
+    """
+    # Só a reconstrução usa numpy; importado aqui para não pesar no arranque do worker
+    import numpy as np
+    if not rows:
+        return np.array([]), np.array([]), {}
+    lotes = np.array([r.codigo_lote for r in rows], dtype=np.int64)
+    months = np.array([_month_index(r.data_ref) for r in rows], dtype=np.int64)
+    consumo = np.array(
+        [np.nan if r.consumo_medido_m3 is None else r.consumo_medido_m3 for r in rows], dtype=np.float64
+    )
+
+    unit_ids, unit_pos = np.unique(lotes, return_inverse=True)
+    first_month = months.min()
+    col = months - first_month
+    n_months = int(col.max()) + 1
+
+    present = ~np.isnan(consumo)
+    values = np.zeros((len(unit_ids), n_months + 1))
+    counts = np.zeros((len(unit_ids), n_months + 1))
+    values[unit_pos, col + 1] = np.where(present, consumo, 0.0)
+    counts[unit_pos, col + 1] = present
+    # cum[:, j] = soma dos meses 0..j-1; meses [t-k, t) = cum[:, t] - cum[:, t-k]
+    cum_values = np.cumsum(values, axis=1)
+    cum_counts = np.cumsum(counts, axis=1)
+
+    averages = []
+    for k in (6, 12):
+        start = np.maximum(col - k, 0)
+        total = cum_values[unit_pos, col] - cum_values[unit_pos, start]
+        count = cum_counts[unit_pos, col] - cum_counts[unit_pos, start]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            averages.append(np.where(count > 0, _np_round_half_up(total / count), np.nan))
+
+    windows = {}
+    last_col = np.zeros(len(unit_ids), dtype=np.int64)
+    np.maximum.at(last_col, unit_pos, col)
+    matrix = np.full((len(unit_ids), n_months), np.nan)
+    matrix[unit_pos, col] = consumo
+    for u, codigo_lote in enumerate(unit_ids.tolist()):
+        last = int(last_col[u])
+        ring = [
+            None if i > last or np.isnan(matrix[u, last - i]) else int(matrix[u, last - i])
+            for i in range(WINDOW_MONTHS)
+        ]
+        windows[codigo_lote] = RollingWindow(int(first_month) + last, ring)
+    return averages[0], averages[1], windows
+
+
+def _to_optional_int(value) -> Optional[int]:
+    return None if math.isnan(value) else int(value)
+
+
+def _save_windows(db: Session, windows: Dict[int, RollingWindow]):
+    if not windows:
+        return
+    stmt = insert(ConsumptionWindow.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["codigo_lote"],
+        set_={c: stmt.excluded[c] for c in ("ultimo_mes", "consumos", "soma_6", "contagem_6", "soma_12", "contagem_12")}
+        | {"updated_at": text("now()")},
+    )
+    db.execute(stmt, [w.as_row(codigo_lote) for codigo_lote, w in windows.items()])
+
+
+# --- Pipeline ---
+
+def apply_month(db: Session, data_ref, consumos: Dict[int, Optional[int]]) -> Dict[int, Tuple[Optional[int], Optional[int]]]:
+    """
+    Calcula as médias móveis dos 6 e 12 meses anteriores a 'data_ref' para as
+    unidades de 'consumos' ({codigo_lote: consumo do mês}) e grava o consumo
+    do mês na janela de cada uma. Em regime normal (mês seguinte ao último) é
+    O(1) por unidade; unidades sem janela são reconstruídas do histórico e o
+    reprocessamento de um mês antigo lê o histórico só dessas unidades.
+    Não faz commit. Retorna {codigo_lote: (media_6, media_12)}.
+    """
+    month = _month_index(data_ref)
+    lotes = list(consumos)
+    if not lotes:
+        return {}
+
+    windows = {
+        state.codigo_lote: RollingWindow.from_state(state)
+        for state in db.query(ConsumptionWindow).filter(ConsumptionWindow.codigo_lote.in_(lotes))
+    }
+    missing = [lote for lote in lotes if lote not in windows]
+    if missing:
+        _, _, rebuilt = compute_windows_vectorized(_load_history(db, missing))
+        windows.update(rebuilt)
+
+    older = [lote for lote in lotes if lote in windows and not windows[lote].covers(month)]
+    history = {}
+    for row in (_load_history(db, older) if older else []):
+        history.setdefault(row.codigo_lote, {})[_month_index(row.data_ref)] = row.consumo_medido_m3
+
+    averages = {}
+    for lote in lotes:
+        window = windows.setdefault(lote, RollingWindow())
+        if window.covers(month):
+            averages[lote] = window.averages_before(month)
+        else:
+            unit_history = history.get(lote, {})
+            previous = [unit_history.get(month - i) for i in range(1, 13)]
+            averages[lote] = (_average(previous[:6]), _average(previous))
+        window.push(month, consumos[lote])
+
+    _save_windows(db, {lote: windows[lote] for lote in lotes})
+    return averages
+
+
+# --- Reconstrução e verificação ---
+
+def rebuild(db: Session, backfill: bool = True) -> dict:
+    """
+    Reconstrói todas as janelas a partir do histórico com o cálculo vetorizado.
+    Com 'backfill', regrava também media_movel_6/12_meses_anteriores de todas
+    as contas. Não faz commit.
+    """
+    rows = _load_history(db)
+    avg6, avg12, windows = compute_windows_vectorized(rows)
+
+    db.execute(text(f"DELETE FROM {ConsumptionWindow.__tablename__}"))
+    _save_windows(db, windows)
+
+    if backfill and rows:
+        db.execute(
+            text(
+                f"UPDATE {WaterBill.__tablename__} AS b SET "
+                f"media_movel_6_meses_anteriores = v.avg6, media_movel_12_meses_anteriores = v.avg12 "
+                f"FROM unnest(CAST(:ids AS varchar[]), CAST(:avg6 AS integer[]), CAST(:avg12 AS integer[])) "
+                f"AS v(id, avg6, avg12) WHERE b.id = v.id"
+            ),
+            {
+                "ids": [r.id for r in rows],
+                "avg6": [_to_optional_int(v) for v in avg6],
+                "avg12": [_to_optional_int(v) for v in avg12],
+            },
+        )
+    return {"units": len(windows), "bills": len(rows) if backfill else 0}
+
+
+def verify(db: Session, max_mismatches: int = 50) -> dict:
+    """
+    Recalcula tudo do zero, mês a mês e sem o cálculo vetorizado, e compara
+    com as médias gravadas nas contas e com as janelas guardadas.
+    """
+    by_unit = {}
+    for row in _load_history(db):
+        by_unit.setdefault(row.codigo_lote, []).append(row)
+    stored_avgs = {
+        r.id: (r.media_movel_6_meses_anteriores, r.media_movel_12_meses_anteriores)
+        for r in db.execute(select(
+            WaterBill.id, WaterBill.media_movel_6_meses_anteriores, WaterBill.media_movel_12_meses_anteriores
+        ))
+    }
+    states = {s.codigo_lote: RollingWindow.from_state(s) for s in db.query(ConsumptionWindow)}
+
+    mismatches = []
+    mismatch_count = 0
+
+    def report(entry):
+        nonlocal mismatch_count
+        mismatch_count += 1
+        if len(mismatches) < max_mismatches:
+            mismatches.append(entry)
+
+    for lote, rows in by_unit.items():
+        history = {_month_index(r.data_ref): r.consumo_medido_m3 for r in rows}
+        for r in rows:
+            month = _month_index(r.data_ref)
+            previous = [history.get(month - i) for i in range(1, 13)]
+            expected = (_average(previous[:6]), _average(previous))
+            if stored_avgs.get(r.id) != expected:
+                report({"codigo_lote": lote, "data_ref": r.data_ref.isoformat(),
+                        "stored": stored_avgs.get(r.id), "expected": expected})
+
+        expected_window = RollingWindow.from_history(history)
+        state = states.get(lote)
+        if state is None or (state.last, state.values, state.sum6, state.count6, state.sum12, state.count12) != (
+            expected_window.last, expected_window.values, expected_window.sum6,
+            expected_window.count6, expected_window.sum12, expected_window.count12,
+        ):
+            report({"codigo_lote": lote, "window": "divergente" if state else "ausente"})
+
+    return {
+        "consistent": mismatch_count == 0,
+        "units": len(by_unit),
+        "mismatch_count": mismatch_count,
+        "mismatches": mismatches,
+    }
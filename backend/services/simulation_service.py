@@ -0,0 +1,137 @@
+# backend/services/simulation_service.py
+
+import time
+from collections import defaultdict
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..api.schemas import TariffSimulationPayload
+from ..models import Production, WaterBill
+from .billing_engine import compute_bills
+from .date_utils import month_range
+from .tariff_index import TariffBands, get_tariff_index
+
+SIMULATION_MAX_MONTHS = 36
+
+
+def _month_key(value):
+    return (value.year, value.month)
+
+
+def _load_history(db: Session, start, end_next):
+    """Contas gravadas no intervalo, com os insumos de produção de cada mês, numa só query."""
+    return db.query(
+        WaterBill.codigo_lote,
+        WaterBill.data_ref,
+        WaterBill.consumo_medido_m3,
+        WaterBill.total_conta_rs,
+        WaterBill.mes_producao_agua_m3,
+        WaterBill.mes_compra_agua_rs,
+        WaterBill.mes_outros_gastos_rs,
+    ).filter(
+        WaterBill.data_ref >= start,
+        WaterBill.data_ref < end_next,
+        WaterBill.codigo_lote.isnot(None),
+    ).order_by(WaterBill.data_ref, WaterBill.codigo_lote).all()
+
+
+def _load_area_comum(db: Session, start, end_next) -> dict:
+    rows = db.query(Production.data_ref, Production.mes_area_comum_rs).filter(
+        Production.data_ref >= start, Production.data_ref < end_next
+    ).all()
+    return {_month_key(r.data_ref): float(r.mes_area_comum_rs or 0.0) for r in rows if r.data_ref}
+
+
+def simulate_tariff_service(db: Session, payload: TariffSimulationPayload):
+    """
+    Simula o que cada unidade teria pago com uma tabela de tarifas candidata,
+    reaplicando o motor de faturação em memória aos consumos e insumos gravados
+    de cada mês do intervalo. Não grava nada.
+
+    Para cada mês compara três totais: o faturado ('actual_rs'), o recalculado
+    com as tarifas então vigentes ('baseline_rs', que isola diferenças entre o
+    motor e as procedures) e o simulado com a tabela candidata ('simulated_rs').
+    """
+    started = time.perf_counter()
+    start, _ = month_range(payload.start_month)
+    end_start, end_next = month_range(payload.end_month)
+    if end_start < start:
+        return {'error': 'end_month deve ser igual ou posterior a start_month.'}, 400
+    n_months = (end_start.year - start.year) * 12 + end_start.month - start.month + 1
+    if n_months > SIMULATION_MAX_MONTHS:
+        return {'error': f'O intervalo máximo é de {SIMULATION_MAX_MONTHS} meses.'}, 400
+
+    try:
+        candidate = TariffBands.from_rows([b.dict() for b in payload.tariff])
+        candidate_sewage = TariffBands.from_rows([b.dict() for b in payload.sewage_tariff]) if payload.sewage_tariff else None
+    except ValueError as e:
+        return {'error': f'Tabela de tarifas inválida: {e}'}, 400
+
+    rows = _load_history(db, start, end_next)
+    area_comum = _load_area_comum(db, start, end_next)
+    tariff_index = get_tariff_index(db)
+
+    by_month = defaultdict(list)
+    for row in rows:
+        by_month[_month_key(row.data_ref)].append(row)
+
+    months = []
+    unit_totals = defaultdict(lambda: np.zeros(3))  # actual, baseline, simulated
+    unit_months = defaultdict(int)
+    for (year, month), month_rows in sorted(by_month.items()):
+        first = month_rows[0]
+        consumptions = [r.consumo_medido_m3 if r.consumo_medido_m3 is not None else np.nan for r in month_rows]
+        inputs = dict(
+            producao_m3=first.mes_producao_agua_m3,
+            compra_rs=first.mes_compra_agua_rs,
+            outros_rs=first.mes_outros_gastos_rs,
+            area_comum_rs=area_comum.get((year, month), 0.0),
+        )
+        actual = np.array([r.total_conta_rs or 0.0 for r in month_rows], dtype=np.float64)
+        try:
+            baseline = compute_bills(consumptions, tariff_index.bands_for(first.data_ref), **inputs)["total_conta_rs"]
+        except LookupError:
+            baseline = np.full(len(month_rows), np.nan)
+        simulated = compute_bills(consumptions, candidate, sewage_bands=candidate_sewage, **inputs)["total_conta_rs"]
+
+        months.append({
+            "month": f"{year:04d}-{month:02d}",
+            "units": len(month_rows),
+            "actual_rs": round(float(actual.sum()), 2),
+            "baseline_rs": None if np.isnan(baseline).any() else round(float(baseline.sum()), 2),
+            "simulated_rs": round(float(simulated.sum()), 2),
+            "delta_rs": round(float(simulated.sum() - actual.sum()), 2),
+        })
+        for r, a, b, s in zip(month_rows, actual.tolist(), baseline.tolist(), simulated.tolist()):
+            unit_totals[r.codigo_lote] += (a, b, s)
+            unit_months[r.codigo_lote] += 1
+
+    units = []
+    for codigo_lote in sorted(unit_totals):
+        actual_rs, baseline_rs, simulated_rs = unit_totals[codigo_lote].tolist()
+        units.append({
+            "codigo_lote": codigo_lote,
+            "months": unit_months[codigo_lote],
+            "actual_rs": round(actual_rs, 2),
+            "baseline_rs": None if np.isnan(baseline_rs) else round(baseline_rs, 2),
+            "simulated_rs": round(simulated_rs, 2),
+            "delta_rs": round(simulated_rs - actual_rs, 2),
+            "delta_pct": round((simulated_rs - actual_rs) / actual_rs * 100, 2) if actual_rs else None,
+        })
+
+    total_actual = sum(m["actual_rs"] for m in months)
+    total_simulated = sum(m["simulated_rs"] for m in months)
+    return {
+        "start_month": start.isoformat(),
+        "end_month": end_start.isoformat(),
+        "bills": len(rows),
+        "totals": {
+            "actual_rs": round(total_actual, 2),
+            "simulated_rs": round(total_simulated, 2),
+            "delta_rs": round(total_simulated - total_actual, 2),
+        },
+        "months": months,
+        "units": units,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }, 200
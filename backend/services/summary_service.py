@@ -1,14 +1,37 @@
 # backend/services/summary_service.py
 
+import os
+from datetime import date
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from dateutil.parser import parse
 from ..models import Unit, WaterBill, Production
+from .cache import LRUCache
+from .date_utils import month_range
+from .fieldsets import parse_fields
 
-def get_monthly_summary_service(db: Session, year_month: str, sort_by: str, order: str, user_profile: str):
+# Cache do resultado base (sem ordenação) por (mês, perfil). O TTL limita o
+# tempo que outros processos levam a ver um mês reprocessado.
+_summary_cache = LRUCache(
+    maxsize=int(os.environ.get("SUMMARY_CACHE_SIZE", "256")),
+    ttl=float(os.environ.get("SUMMARY_CACHE_TTL", "600")),
+)
+
+# Campos de cada item de 'unit_details' que podem ser pedidos em '?fields='.
+UNIT_DETAIL_FIELDS = ("codigo_lote", "display_name", "cost_rs", "consumption_m3", "cost_rank", "consumption_rank")
+
+def get_monthly_summary_service(db: Session, year_month: str, sort_by: str, order: str, user_profile: str,
+                                fields: str = None):
     """
     Lógica de negócio para buscar e formatar o resumo mensal do condomínio.
+    O resultado base de cada mês/perfil fica em cache; as ordenações são
+    derivadas dele sem novo acesso ao banco. 'fields' restringe as chaves de
+    cada item de 'unit_details'.
     """
+    try:
+        selected = parse_fields(fields, UNIT_DETAIL_FIELDS)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+
     try:
         date_obj = parse(year_month + '-01')
     except ValueError:
@@ -17,11 +40,30 @@ def get_monthly_summary_service(db: Session, year_month: str, sort_by: str, orde
         except ValueError:
             return {'error': 'Formato de data inválido. Use YYYY-MM ou YYYY-MM-DD.'}, 400
 
-    start_of_month = date_obj.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    start_of_month, start_of_next_month = month_range(date_obj)
 
+    cache_key = (start_of_month.date(), user_profile)
+    base = _summary_cache.get(cache_key)
+    if base is None:
+        base = _load_monthly_summary_base(db, date_obj, start_of_month, start_of_next_month, user_profile)
+        _summary_cache.set(cache_key, base)
+
+    response_data = dict(base)
+    unit_details = _sort_unit_details(base["unit_details"], sort_by, order, user_profile)
+    if selected:
+        unit_details = [{f: d[f] for f in selected} for d in unit_details]
+    response_data["unit_details"] = unit_details
+    return response_data, 200
+
+def _load_monthly_summary_base(db: Session, date_obj, start_of_month, start_of_next_month, user_profile: str):
+    """
+    Busca no banco os totais do condomínio e os dados das unidades do mês,
+    sem ordenação.
+    """
     # 1. Busca os dados de produção e custos gerais do condomínio
     condo_production_summary = db.query(Production).filter(
-        func.date_trunc('month', Production.data_ref) == func.date_trunc('month', start_of_month)
+        Production.data_ref >= start_of_month,
+        Production.data_ref < start_of_next_month
     ).first()
 
     total_condo_cost_rs = 0.0
@@ -41,21 +83,50 @@ def get_monthly_summary_service(db: Session, year_month: str, sort_by: str, orde
         )
 
     # 2. Busca os dados de todas as unidades para aquele mês
-    unit_bills = db.query(WaterBill, Unit.nome_lote, Unit.codinome01).join(Unit, WaterBill.codigo_lote == Unit.codigo_lote).filter(
-        func.date_trunc('month', WaterBill.data_ref) == func.date_trunc('month', start_of_month)
+    # Apenas as colunas usadas no resumo, cobertas pelo índice (data_ref, codigo_lote).
+    unit_bills = db.query(
+        WaterBill.codigo_lote, WaterBill.total_conta_rs, WaterBill.consumo_medido_m3,
+        Unit.nome_lote, Unit.codinome01
+    ).join(Unit, WaterBill.codigo_lote == Unit.codigo_lote).filter(
+        WaterBill.data_ref >= start_of_month.date(),
+        WaterBill.data_ref < start_of_next_month.date()
     ).all()
     
+    # Rankings do mês vêm da distribuição (em cache para meses fechados).
+    # Importado aqui para que o numpy não seja carregado no arranque do worker.
+    from . import distribution_service
+    distribution = distribution_service.get_month_distribution(db, start_of_month.date())
+    ranks = {u["codigo_lote"]: u for u in distribution["units"]}
+
     unit_details = []
-    for bill, nome_lote, codinome01 in unit_bills:
-        display_name = nome_lote if user_profile == 'admin' else codinome01
+    for bill in unit_bills:
+        display_name = bill.nome_lote if user_profile == 'admin' else bill.codinome01
+        unit_rank = ranks.get(bill.codigo_lote, {})
         unit_details.append({
             "codigo_lote": bill.codigo_lote,
             "display_name": display_name,
             "cost_rs": float(bill.total_conta_rs) if bill.total_conta_rs is not None else 0.0,
-            "consumption_m3": bill.consumo_medido_m3 if bill.consumo_medido_m3 is not None else 0
+            "consumption_m3": bill.consumo_medido_m3 if bill.consumo_medido_m3 is not None else 0,
+            "cost_rank": unit_rank.get("cost_rank"),
+            "consumption_rank": unit_rank.get("consumption_rank"),
         })
+
+    # 3. Formata a resposta base
+    month_name = date_obj.strftime("%B-%Y").replace("January", "Janeiro").replace("February", "Fevereiro").replace("March", "Março").replace("April", "Abril").replace("May", "Maio").replace("June", "Junho").replace("July", "Julho").replace("August", "Agosto").replace("September", "Setembro").replace("October", "Outubro").replace("November", "Novembro").replace("December", "Dezembro")
     
-    # 3. Ordena os resultados
+    response_data = {
+        "month_year": month_name,
+        "total_condo_cost_rs": total_condo_cost_rs,
+        "total_condo_consumption_m3": total_condo_consumption_m3,
+        "unit_details": unit_details
+    }
+
+    return response_data
+
+def _sort_unit_details(unit_details, sort_by: str, order: str, user_profile: str):
+    """
+    Retorna uma nova lista ordenada conforme o parâmetro de ordenação.
+    """
     reverse_order = (order == 'desc')
     if sort_by == 'a':
         if user_profile == 'admin':
@@ -71,16 +142,12 @@ def get_monthly_summary_service(db: Session, year_month: str, sort_by: str, orde
         key_func = lambda x: x['codigo_lote']
         reverse_order = (order == 'desc') # Só aplica desc se for explícito para o padrão
 
-    unit_details.sort(key=key_func, reverse=reverse_order)
-
-    # 4. Formata a resposta final
-    month_name = date_obj.strftime("%B-%Y").replace("January", "Janeiro").replace("February", "Fevereiro").replace("March", "Março").replace("April", "Abril").replace("May", "Maio").replace("June", "Junho").replace("July", "Julho").replace("August", "Agosto").replace("September", "Setembro").replace("October", "Outubro").replace("November", "Novembro").replace("December", "Dezembro")
-    
-    response_data = {
-        "month_year": month_name,
-        "total_condo_cost_rs": total_condo_cost_rs,
-        "total_condo_consumption_m3": total_condo_consumption_m3,
-        "unit_details": unit_details
-    }
+    return sorted(unit_details, key=key_func, reverse=reverse_order)
 
-    return response_data, 200
\ No newline at end of file
+def invalidate_monthly_summary(data_ref):
+    """
+    Remove da cache todas as entradas do mês de 'data_ref' (todos os perfis).
+    Chamado pelo pipeline de faturação após o commit.
+    """
+    month = date(data_ref.year, data_ref.month, 1)
+    _summary_cache.delete_where(lambda key: key[0] == month)
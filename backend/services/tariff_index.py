@@ -0,0 +1,210 @@
+# backend/services/tariff_index.py
+
+import os
+import threading
+import time as _time
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from ..models import Tariff
+
+# Intervalo (s) após o qual o índice confirma, com uma query barata, se
+# 'newtab_tarifa' foi alterada fora deste processo. Só vale para leituras:
+# o pipeline de faturação confirma a assinatura em cada execução.
+TARIFF_INDEX_TTL = float(os.environ.get("TARIFF_INDEX_TTL", "300"))
+
+_MIN_DATE = datetime.min
+_MAX_DATE = datetime.max
+
+
+def _check_contiguous(bands):
+    """
+    Garante que as faixas (faixa, consumo_inicial, consumo_final), ordenadas
+    por consumo_inicial, cobrem o consumo sem lacunas nem sobreposições. Como o
+    consumo é inteiro, a faixa seguinte pode começar no fim da anterior ou no
+    m³ seguinte (0-10 e 10-20, ou 0-10 e 11-20). Só a última faixa pode ficar
+    sem consumo_final. Levanta ValueError se não for o caso.
+    """
+    for (faixa, inicial, final), (next_faixa, next_inicial, _) in zip(bands, bands[1:]):
+        if final is None:
+            raise ValueError(f"A faixa '{faixa}' não tem consumo_final mas não é a última.")
+        if final < inicial:
+            raise ValueError(f"A faixa '{faixa}' termina antes de começar ({inicial} a {final}).")
+        if next_inicial < final:
+            raise ValueError(f"As faixas '{faixa}' e '{next_faixa}' sobrepõem-se ({final} > {next_inicial}).")
+        if next_inicial > final + 1:
+            raise ValueError(f"Lacuna entre as faixas '{faixa}' e '{next_faixa}' ({final} a {next_inicial}).")
+    faixa, inicial, final = bands[-1]
+    if final is not None and final < inicial:
+        raise ValueError(f"A faixa '{faixa}' termina antes de começar ({inicial} a {final}).")
+
+
+@dataclass
+class TariffBands:
+    """Faixas de uma tabela de tarifas, ordenadas por consumo_inicial."""
+    faixa: np.ndarray
+    consumo_inicial: np.ndarray
+    consumo_final: np.ndarray
+    valor_m3: np.ndarray
+    parcela_deduzir: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Constrói as faixas a partir de objetos Tariff ou dicionários com os
+        campos faixa/consumo_inicial/consumo_final/valor_m3/parcela_deduzir.
+        """
+        def get(row, field):
+            return row.get(field) if isinstance(row, dict) else getattr(row, field)
+
+        ordered = sorted(rows, key=lambda r: get(r, 'consumo_inicial') or 0)
+        if not ordered:
+            raise ValueError("Nenhuma faixa de tarifa informada.")
+        _check_contiguous([(get(r, 'faixa'), get(r, 'consumo_inicial') or 0, get(r, 'consumo_final')) for r in ordered])
+        return cls(
+            faixa=np.array([get(r, 'faixa') or '' for r in ordered], dtype=object),
+            consumo_inicial=np.array([get(r, 'consumo_inicial') or 0 for r in ordered], dtype=np.float64),
+            consumo_final=np.array(
+                [np.inf if get(r, 'consumo_final') is None else get(r, 'consumo_final') for r in ordered],
+                dtype=np.float64,
+            ),
+            valor_m3=np.array([get(r, 'valor_m3') or 0.0 for r in ordered], dtype=np.float64),
+            parcela_deduzir=np.array([get(r, 'parcela_deduzir') or 0.0 for r in ordered], dtype=np.float64),
+        )
+
+    def classify(self, consumptions: np.ndarray) -> np.ndarray:
+        """
+        Retorna o índice da faixa de cada consumo. As faixas são contíguas
+        (ver _check_contiguous), por isso basta o consumo_inicial: consumos
+        abaixo da primeira faixa caem na primeira; acima da última, na última.
+        """
+        idx = np.searchsorted(self.consumo_inicial, consumptions, side='right') - 1
+        return np.clip(idx, 0, len(self.consumo_inicial) - 1)
+
+    def lookup(self, consumption: float) -> dict:
+        """Faixa, preço e dedução para um único consumo, em O(log n)."""
+        i = int(self.classify(np.float64(consumption)))
+        return {
+            "faixa": self.faixa[i],
+            "valor_m3": float(self.valor_m3[i]),
+            "parcela_deduzir": float(self.parcela_deduzir[i]),
+        }
+
+
+@dataclass
+class _ValidityWindow:
+    start: datetime
+    end: datetime
+    bands: TariffBands
+
+
+class TariffIndex:
+    """
+    Índice em memória de 'newtab_tarifa': uma lista de janelas de vigência
+    ordenada por início, cada uma com as suas faixas ordenadas por consumo.
+    Ambas as pesquisas são feitas por bissecção.
+    """
+
+    def __init__(self, rows, fingerprint: Optional[str] = None):
+        self.fingerprint = fingerprint
+        grouped = {}
+        current = []
+        for row in rows:
+            key = (row.data_vigencia or _MIN_DATE, row.data_fim_vigencia or _MAX_DATE)
+            grouped.setdefault(key, []).append(row)
+            if row.vigente:
+                current.append(row)
+
+        self._windows: List[_ValidityWindow] = [
+            _ValidityWindow(start, end, TariffBands.from_rows(band_rows))
+            for (start, end), band_rows in sorted(grouped.items())
+        ]
+        self._starts = [w.start for w in self._windows]
+        self._current = TariffBands.from_rows(current) if current else None
+
+    def bands_for(self, on_date) -> TariffBands:
+        """
+        Faixas vigentes na data informada. Se nenhuma janela cobrir a data,
+        usa as faixas marcadas como 'vigente'.
+        """
+        ref = on_date if isinstance(on_date, datetime) else datetime.combine(on_date, time.min)
+        i = bisect_right(self._starts, ref) - 1
+        while i >= 0:
+            window = self._windows[i]
+            if window.end >= ref:
+                return window.bands
+            i -= 1
+        if self._current is not None:
+            return self._current
+        raise LookupError(f"Nenhuma tarifa vigente em {ref.date().isoformat()}.")
+
+    def lookup(self, consumption: float, on_date) -> dict:
+        """Faixa, preço e dedução para o consumo X na data D."""
+        return self.bands_for(on_date).lookup(consumption)
+
+    def classify(self, consumptions, on_date) -> dict:
+        """
+        Classifica um array de consumos de uma vez. Retorna arrays alinhados
+        com as chaves faixa/valor_m3/parcela_deduzir.
+        """
+        bands = self.bands_for(on_date)
+        idx = bands.classify(np.asarray(consumptions, dtype=np.float64))
+        return {
+            "faixa": bands.faixa[idx],
+            "valor_m3": bands.valor_m3[idx],
+            "parcela_deduzir": bands.parcela_deduzir[idx],
+        }
+
+
+# --- Cache do índice (partilhado pelo processo) ---
+
+_index: Optional[TariffIndex] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _fingerprint(db: Session) -> str:
+    """Assinatura do conteúdo de 'newtab_tarifa' (a tabela tem poucas linhas)."""
+    return db.execute(text(
+        f"SELECT md5(coalesce(string_agg(t::text, ',' ORDER BY t.id), '')) FROM {Tariff.__tablename__} t"
+    )).scalar()
+
+
+def get_tariff_index(db: Session, revalidate: bool = False) -> TariffIndex:
+    """
+    Retorna o índice de tarifas, construindo-o na primeira chamada. Depois de
+    TARIFF_INDEX_TTL segundos confirma a assinatura da tabela e só reconstrói
+    se ela mudou. Com 'revalidate' a assinatura é confirmada já: é o caso do
+    pipeline de faturação, que grava valores e não pode usar tarifas antigas.
+    """
+    global _index, _checked_at
+    with _lock:
+        now = _time.monotonic()
+        if _index is not None and not revalidate and now - _checked_at < TARIFF_INDEX_TTL:
+            return _index
+
+        fingerprint = _fingerprint(db)
+        if _index is None or _index.fingerprint != fingerprint:
+            _index = TariffIndex(db.query(Tariff).all(), fingerprint=fingerprint)
+        _checked_at = now
+        return _index
+
+
+def invalidate_tariff_index():
+    """Descarta o índice; a próxima chamada o reconstrói."""
+    global _index
+    with _lock:
+        _index = None
+
+
+@event.listens_for(Tariff, "after_insert")
+@event.listens_for(Tariff, "after_update")
+@event.listens_for(Tariff, "after_delete")
+def _on_tariff_change(mapper, connection, target):
+    invalidate_tariff_index()
@@ -1,9 +1,13 @@
 # backend/services/unit_service.py
 
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func
+from datetime import date
+from sqlalchemy import select, func, tuple_
 
 from ..models import Unit, WaterBill, UserLote, Morador
+from . import access_service
+from .fieldsets import parse_fields
+from .pagination import clamp_limit, decode_cursor, encode_cursor, page_response
 
 def get_units_for_user_service(db: Session, user_id: int):
     """
@@ -16,39 +20,64 @@ def get_units_for_user_service(db: Session, user_id: int):
         .order_by(Unit.codigo_lote)
         .all()
     )
+    # Aproveita a mesma query para preencher a cache de permissões
+    access_service.prime_user_unit_ids(user_id, [u.codigo_lote for u in units])
     return [u.to_dict() for u in units], 200
 
-def get_bills_for_unit_service(db: Session, user_id: int, unit_id: int):
+def get_bills_for_unit_service(db: Session, user_id: int, unit_id: int, limit: int = None, cursor: str = None,
+                               fields: str = None):
     """
     Busca as contas de uma unidade, verificando se o usuário tem permissão.
+    Sem 'limit'/'cursor' retorna o histórico completo; com eles, retorna uma
+    página (mais recente primeiro) paginada por keyset em (data_ref DESC, id DESC).
+    Com 'fields' (ex.: "data_ref,total_conta_rs"), só essas colunas são lidas
+    do banco e serializadas.
     """
-    user_has_access = db.query(UserLote).filter(
-        UserLote.user_id == user_id,
-        UserLote.codigo_lote == unit_id
-    ).first()
+    try:
+        selected = parse_fields(fields, WaterBill.API_FIELDS)
+    except ValueError as e:
+        return {'error': str(e)}, 400
 
-    if not user_has_access:
+    if not access_service.user_has_unit_access(db, user_id, unit_id):
         return {'error': 'Acesso negado a esta unidade.'}, 403
 
-    bills = (
-        db.query(WaterBill)
-        .filter(WaterBill.codigo_lote == unit_id)
-        .order_by(WaterBill.data_ref.desc(), WaterBill.codigo_lote)
-        .all()
-    )
-    
-    return [b.to_dict() for b in bills], 200
+    if selected:
+        # Projeção de colunas; data_ref e id entram sempre por causa do cursor
+        columns = dict.fromkeys(selected + ['data_ref', 'id'])
+        query = db.query(*[getattr(WaterBill, c) for c in columns])
+        serialize = lambda b: WaterBill.row_to_dict(b, selected)
+    else:
+        query = db.query(WaterBill)
+        serialize = lambda b: b.to_dict()
+    query = query.filter(WaterBill.codigo_lote == unit_id)
+
+    if limit is None and cursor is None:
+        bills = query.order_by(WaterBill.data_ref.desc(), WaterBill.codigo_lote).all()
+        return [serialize(b) for b in bills], 200
+
+    limit = clamp_limit(limit)
+    if cursor:
+        try:
+            position = decode_cursor(cursor)
+            after_data_ref = date.fromisoformat(position['d'])
+            after_id = position['i']
+            # O id das contas é texto (VARCHAR(36)); outro tipo falharia só no banco
+            if not isinstance(after_id, str) or len(after_id) > 36:
+                raise ValueError("Cursor inválido.")
+        except (ValueError, KeyError, TypeError):
+            return {'error': 'Cursor inválido.'}, 400
+        query = query.filter(tuple_(WaterBill.data_ref, WaterBill.id) < tuple_(after_data_ref, after_id))
+
+    bills = query.order_by(WaterBill.data_ref.desc(), WaterBill.id.desc()).limit(limit + 1).all()
+    page = page_response(bills, limit, lambda b: encode_cursor({'d': b.data_ref.isoformat(), 'i': b.id}))
+    page["items"] = [serialize(b) for b in page["items"]]
+    return page, 200
 
 def get_moradores_for_unit_service(db: Session, user_id: int, unit_id: int):
     """
     Busca os moradores de uma unidade, verificando se o usuário tem permissão.
     """
-    user_has_access = db.query(UserLote).filter(
-        UserLote.user_id == user_id,
-        UserLote.codigo_lote == unit_id
-    ).first()
-
-    if not user_has_access:
+    if not access_service.user_has_unit_access(db, user_id, unit_id):
         return {'error': 'Acesso negado a esta unidade.'}, 403
 
     moradores = (
@@ -16,6 +16,13 @@ def get_veiculo(db: Session, veiculo_id: int):
 def get_veiculos(db: Session, skip: int = 0, limit: int = 100):
     return db.query(Veiculo).offset(skip).limit(limit).all()
 
+def get_veiculos_after(db: Session, after_id: int = None, limit: int = 100):
+    """Página de veículos por keyset em id: os 'limit' seguintes a 'after_id'."""
+    query = db.query(Veiculo)
+    if after_id is not None:
+        query = query.filter(Veiculo.id > after_id)
+    return query.order_by(Veiculo.id).limit(limit).all()
+
 def get_veiculos_by_lote(db: Session, codigo_lote: int):
     return db.query(Veiculo).filter(Veiculo.codigo_lote == codigo_lote).all()
 
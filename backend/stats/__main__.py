@@ -0,0 +1,40 @@
+# backend/stats/__main__.py
+#
+# Manutenção das janelas de médias móveis por unidade (newtab_consumo_janela).
+#
+# Uso: python -m backend.stats rebuild [--no-backfill]   # recalcula do histórico (vetorizado)
+#      python -m backend.stats check                     # compara com um cálculo do zero (código 1 se divergir)
+
+import argparse
+import json
+import sys
+
+from ..database import SessionLocal
+from ..services import rolling_stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Médias móveis de consumo por unidade.")
+    parser.add_argument("command", choices=("rebuild", "check"))
+    parser.add_argument("--no-backfill", action="store_true",
+                        help="Só reconstrói as janelas, sem regravar as médias nas contas.")
+    parser.add_argument("--max-mismatches", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            result = rolling_stats.rebuild(db, backfill=not args.no_backfill)
+            db.commit()
+            print(f"--- Janelas reconstruídas: {result['units']} unidades, {result['bills']} contas atualizadas ---")
+            return 0
+
+        result = rolling_stats.verify(db, max_mismatches=args.max_mismatches)
+        print(json.dumps(result, indent=2, default=str))
+        return 0 if result["consistent"] else 1
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+# backend/tests/conftest.py
+
+import datetime
+import os
+import uuid
+
+import jwt
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+# backend.database monta a URL a partir destas variáveis no import; a conexão
+# só é aberta quando usada, por isso valores fictícios bastam para os testes
+# que não tocam no banco.
+for _name, _value in {
+    "DB_USER": "test", "DB_PASSWORD": "test", "DB_HOST": "localhost",
+    "DB_PORT": "5432", "DB_NAME": "test",
+}.items():
+    os.environ.setdefault(_name, _value)
+
+# Tabelas dos modelos cujo DDL vive em backend/migrations.
+MIGRATION_TABLES = {"newtab_relatorio_24m", "newtab_consumo_janela", "newtab_pipeline_jobs"}
+
+
+@pytest.fixture(scope="session")
+def pg_engine():
+    """
+    Engine num schema descartável de um PostgreSQL de testes, apontado por
+    TEST_DATABASE_URL, com as tabelas dos modelos e as migrações aplicadas.
+    Sem a variável, os testes que dependem dele são ignorados.
+    """
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL não definido")
+
+    from backend.database import Base
+    from backend import models  # noqa: F401 - regista as tabelas em Base.metadata
+
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    admin = create_engine(url)
+    with admin.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+
+    engine = create_engine(url, connect_args={"options": f"-csearch_path={schema}"})
+    # As tabelas criadas pelas migrações ficam a cargo delas
+    Base.metadata.create_all(engine, tables=[
+        t for t in Base.metadata.sorted_tables if t.name not in MIGRATION_TABLES
+    ])
+    from backend.migrations import apply_migrations
+    apply_migrations(engine)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+        with admin.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        admin.dispose()
+
+
+@pytest.fixture
+def pg_session(pg_engine):
+    """Sessão no banco de testes; as tabelas são esvaziadas no fim de cada teste."""
+    session = sessionmaker(bind=pg_engine)()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+        from backend.database import Base
+        with pg_engine.begin() as conn:
+            names = ", ".join(t.name for t in Base.metadata.sorted_tables)
+            conn.execute(text(f"TRUNCATE {names} CASCADE"))
+
+
+@pytest.fixture
+def app():
+    from backend import create_app
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["SECRET_KEY"] = "chave-de-testes-com-pelo-menos-32-bytes"
+    return app
+
+
+@pytest.fixture
+def pg_app(app, pg_engine):
+    """Aplicação cujas sessões por requisição usam o banco de testes."""
+    from backend.database import SessionLocal, engine
+    SessionLocal.configure(bind=pg_engine)
+    try:
+        yield app
+    finally:
+        SessionLocal.configure(bind=engine)
+
+
+def auth_header(app, user_id=1, profile="user"):
+    """Header Authorization com um JWT válido para a SECRET_KEY da aplicação."""
+    token = jwt.encode({
+        "user_id": user_id,
+        "profile": profile,
+        "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1),
+    }, app.config["SECRET_KEY"], algorithm="HS256")
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,61 @@
+# backend/tests/test_access_service.py
+
+import pytest
+from sqlalchemy import text
+
+from backend.models import Unit, User, UserLote
+from backend.services import access_service
+
+
+@pytest.fixture
+def memberships(pg_session, monkeypatch):
+    db = pg_session
+    monkeypatch.setattr(access_service, "UNIT_ACCESS_CHECK_INTERVAL", 0)
+    access_service.invalidate_user_units()
+    for user_id in (1, 2):
+        db.add(User(id=user_id, nome_usuario=f"u{user_id}", email_usuario=f"u{user_id}@x", senha_usuario="h"))
+    db.add_all([Unit(codigo_lote=10), Unit(codigo_lote=20)])
+    db.flush()
+    db.add_all([UserLote(user_id=1, codigo_lote=10), UserLote(user_id=1, codigo_lote=20)])
+    db.commit()
+    yield db
+    access_service.invalidate_user_units()
+
+
+def test_access_revoked_in_sql_is_denied(memberships):
+    db = memberships
+    assert access_service.user_has_unit_access(db, 1, 10)
+
+    # Revogação feita diretamente no banco, sem eventos do ORM
+    db.execute(text("DELETE FROM newtab_usuarios_lotes WHERE user_id = 1 AND codigo_lote = 10"))
+    db.commit()
+
+    assert not access_service.user_has_unit_access(db, 1, 10)
+    assert access_service.user_has_unit_access(db, 1, 20)
+
+
+def test_cache_is_kept_between_checks(memberships, monkeypatch):
+    db = memberships
+    assert access_service.user_has_unit_access(db, 1, 10)
+    monkeypatch.setattr(access_service, "UNIT_ACCESS_CHECK_INTERVAL", 3600)
+    monkeypatch.setattr(access_service, "_checked_at", access_service.time.monotonic())
+
+    db.execute(text("DELETE FROM newtab_usuarios_lotes WHERE user_id = 1 AND codigo_lote = 10"))
+    db.commit()
+
+    # Sem nova verificação, a cache continua a responder sem ir ao banco
+    assert access_service.user_has_unit_access(db, 1, 10)
+
+
+def test_row_moved_to_another_user_evicts_previous_user(memberships, monkeypatch):
+    db = memberships
+    monkeypatch.setattr(access_service, "UNIT_ACCESS_CHECK_INTERVAL", 3600)
+    monkeypatch.setattr(access_service, "_checked_at", access_service.time.monotonic())
+    assert access_service.user_has_unit_access(db, 1, 10)
+
+    row = db.get(UserLote, (1, 10))
+    row.user_id = 2
+    db.commit()
+
+    assert not access_service.user_has_unit_access(db, 1, 10)
+    assert access_service.user_has_unit_access(db, 2, 10)
@@ -0,0 +1,72 @@
+# backend/tests/test_billing_engine.py
+
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import text
+
+from backend.api.schemas import ProcessReadingsPayload
+from backend.benchmarks.engine_parity import check_month
+from backend.models import Production, Tariff, Unit
+from backend.services import billing_engine, reading_service
+from backend.tests.conftest import auth_header
+
+DATA_REF = date(2024, 5, 1)
+
+
+def _readings_payload():
+    return {
+        "production_data": {"data_ref": DATA_REF.isoformat(), "producao_m3": 300, "outros_rs": 120, "compra_rs": 80},
+        "unit_readings": [
+            {"codigo_lote": lote, "data_leitura_atual": None, "leitura_atual": 1000, "consumo": consumo}
+            for lote, consumo in ((1, 8), (2, 15), (3, 27), (4, 0))
+        ],
+    }
+
+
+@pytest.fixture
+def month_inputs(pg_session):
+    """Unidades, tarifa, produção e os insumos da Fase 1 de um mês."""
+    db = pg_session
+    db.add_all([Unit(codigo_lote=lote, nome_lote=f"Casa {lote}") for lote in (1, 2, 3, 4)])
+    db.add_all([
+        Tariff(faixa="F1", consumo_inicial=0, consumo_final=10, valor_m3=4.5, parcela_deduzir=0, vigente=True),
+        Tariff(faixa="F2", consumo_inicial=11, consumo_final=20, valor_m3=6.0, parcela_deduzir=15, vigente=True),
+        Tariff(faixa="F3", consumo_inicial=21, consumo_final=None, valor_m3=8.0, parcela_deduzir=55, vigente=True),
+        Production(id=1, data_ref=datetime(2024, 5, 1), mes_area_comum_rs=40),
+    ])
+    db.commit()
+    reading_service._step1_prepare_and_store_data(db, ProcessReadingsPayload(**_readings_payload()))
+    return db
+
+
+def test_python_engine_is_restricted_to_admins(app):
+    response = app.test_client().post(
+        "/api/process-readings?engine=python", json=_readings_payload(), headers=auth_header(app, profile="user")
+    )
+    assert response.status_code == 403
+
+
+def test_compare_with_sql_results_flags_divergent_rows(month_inputs):
+    db = month_inputs
+    billing_engine.run_engine_for_month(db, DATA_REF)
+    assert billing_engine.compare_with_sql_results(db, DATA_REF) == []
+
+    db.execute(text("UPDATE newtemp_agua_cobranca SET total_conta_rs = total_conta_rs + 1 WHERE codigo_lote = 2"))
+    mismatches = billing_engine.compare_with_sql_results(db, DATA_REF)
+
+    assert [(m["codigo_lote"], m["coluna"]) for m in mismatches] == [(2, "total_conta_rs")]
+
+
+def test_engine_matches_sql_procedures(month_inputs):
+    db = month_inputs
+    has_procedures = db.execute(text(
+        "SELECT count(DISTINCT proname) = 2 FROM pg_proc "
+        "WHERE proname IN ('procedure_update_20', 'procedure_update_30')"
+    )).scalar()
+    if not has_procedures:
+        pytest.skip("procedure_update_20/30 não existem no banco de testes")
+
+    result = check_month(db, DATA_REF, max_mismatches=20)
+
+    assert result["mismatches"] == []
@@ -0,0 +1,72 @@
+# backend/tests/test_database.py
+
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+from flask import g
+from sqlalchemy import exc
+from sqlalchemy.orm import sessionmaker
+
+from backend import create_app, database
+
+
+@pytest.fixture
+def replica(pg_app, pg_engine, monkeypatch):
+    """
+    Uma "réplica" apontada para o banco de testes. Fora de recuperação,
+    pg_last_wal_replay_lsn() é NULL: a réplica nunca alcança um LSN pedido.
+    """
+    monkeypatch.setattr(database, "ReplicaSessionLocals", [sessionmaker(bind=pg_engine, info={"replica": True})])
+
+
+def _read_session(app, headers=None):
+    with app.test_request_context(headers=headers or {}):
+        g.db_read_only = True
+        db = database.get_db()
+        try:
+            return bool(db.info.get("replica"))
+        finally:
+            db.close()
+
+
+def test_write_marker_reaches_other_app_instance(replica, pg_app):
+    # Dois workers: a escrita passa por um e a leitura seguinte pelo outro
+    writer, reader = pg_app, create_app()
+
+    with writer.test_request_context():
+        lsn = database.mark_primary_write(database.get_db())
+        response = writer.process_response(writer.make_response("ok"))
+        database.get_db().close()
+    assert response.headers[database.WRITE_LSN_HEADER] == lsn
+
+    assert _read_session(reader, {database.MIN_LSN_HEADER: lsn}) is False
+    assert _read_session(reader) is True
+
+
+def test_malformed_lsn_header_is_ignored(replica, pg_app):
+    assert _read_session(pg_app, {database.MIN_LSN_HEADER: "1/2'; SELECT 1"}) is True
+
+
+def test_no_write_marker_without_replicas(app):
+    with app.test_request_context():
+        assert database.mark_primary_write(None) is None
+        response = app.process_response(app.make_response("ok"))
+    assert database.WRITE_LSN_HEADER not in response.headers
+
+
+def test_pool_counts_only_successful_checkouts():
+    pool = database.InstrumentedQueuePool(
+        lambda: sqlite3.connect(":memory:"), pool_size=1, max_overflow=0, timeout=0.05
+    )
+    held = pool.connect()
+    with pytest.raises(exc.TimeoutError):
+        pool.connect()
+    held.close()
+    pool.connect().close()
+
+    assert pool.checkouts == 2
+    assert pool.timeouts == 1
+    assert pool.waits == 1
+    assert pool.wait_time_max_s >= 0.05
+    assert database._engine_pool_stats(SimpleNamespace(pool=pool))["max_overflow"] == 0
@@ -0,0 +1,83 @@
+# backend/tests/test_distribution_service.py
+
+from datetime import date
+
+import numpy as np
+import pytest
+
+from backend.models import Unit, WaterBill
+from backend.services import distribution_service
+from backend.tests.conftest import auth_header
+
+MONTH = date(2024, 3, 1)
+
+
+def test_ties_share_rank_like_sql_rank():
+    stats, ranks, _ = distribution_service._column_stats(np.array([10.0, 30.0, 20.0, 30.0]), bins=4)
+
+    # 30 e 30 empatam em 1.º; o seguinte é 3.º, como RANK() ... DESC
+    assert ranks.tolist() == [4, 1, 3, 1]
+    assert stats["count"] == 4 and stats["max"] == 30.0
+
+
+def test_percentiles_of_known_values():
+    stats, _, z_scores = distribution_service._column_stats(np.arange(1.0, 102.0), bins=10)
+
+    assert stats["percentiles"]["p50"] == 51.0
+    assert stats["percentiles"]["p5"] == 6.0 and stats["percentiles"]["p95"] == 96.0
+    assert sum(stats["histogram"]["counts"]) == 101
+    assert z_scores[50] == 0.0
+
+
+def test_identical_values_have_zero_z_score():
+    _, ranks, z_scores = distribution_service._column_stats(np.array([5.0, 5.0]), bins=2)
+    assert ranks.tolist() == [1, 1]
+    assert z_scores.tolist() == [0.0, 0.0]
+
+
+def test_missing_values_are_left_out_of_the_ranking():
+    stats, ranks, z_scores = distribution_service._per_unit(np.array([10.0, np.nan, 20.0]), bins=2)
+    assert stats["count"] == 2
+    assert ranks == [2, None, 1]
+    assert z_scores[1] is None
+
+
+def test_empty_month(pg_session):
+    result = distribution_service.compute_month_distribution(pg_session, MONTH)
+
+    assert result["unit_count"] == 0
+    assert result["consumption"] == {"count": 0} and result["cost"] == {"count": 0}
+    assert result["units"] == []
+
+
+@pytest.fixture
+def month_bills(pg_session):
+    db = pg_session
+    distribution_service._distribution_cache.clear()
+    db.add_all([Unit(codigo_lote=lote) for lote in (1, 2, 3)])
+    db.flush()
+    db.add_all([
+        WaterBill(id=f"b{lote}", codigo_lote=lote, data_ref=MONTH, data_display="Mar-2024",
+                  consumo_medido_m3=consumo, total_conta_rs=consumo * 2)
+        for lote, consumo in ((1, 10), (2, 20), (3, 20))
+    ])
+    db.commit()
+    yield db
+    distribution_service._distribution_cache.clear()
+
+
+def test_distribution_etag_round_trip(pg_app, month_bills):
+    client = pg_app.test_client()
+    headers = auth_header(pg_app)
+
+    first = client.get("/api/distribution/2024-03", headers=headers)
+    assert first.status_code == 200
+    assert first.get_json()["units"][0]["consumption_rank"] == 3
+    etag = first.headers["ETag"]
+
+    again = client.get("/api/distribution/2024-03", headers={**headers, "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.get_data() == b""
+
+    other_bins = client.get("/api/distribution/2024-03?bins=3", headers={**headers, "If-None-Match": etag})
+    assert other_bins.status_code == 200
@@ -0,0 +1,48 @@
+# backend/tests/test_fieldsets.py
+
+from datetime import date
+
+import pytest
+
+from backend.models import Unit, WaterBill
+from backend.services import access_service, summary_service, unit_service
+from backend.services.fieldsets import parse_fields
+
+
+def test_parse_fields_keeps_order_and_drops_repeats():
+    assert parse_fields(" b,a,,b ", ("a", "b")) == ["b", "a"]
+    assert parse_fields(None, ("a",)) is None and parse_fields("  ", ("a",)) is None
+
+
+def test_parse_fields_rejects_unknown_names():
+    with pytest.raises(ValueError, match="Campos inválidos: senha, x"):
+        parse_fields("a,senha,x", ("a", "b"))
+
+
+def test_summary_rejects_unknown_fields():
+    # A validação acontece antes de qualquer acesso ao banco
+    response, status = summary_service.get_monthly_summary_service(
+        None, "2024-03", None, "asc", "user", fields="cost_rs,nome_lote"
+    )
+    assert status == 400
+    assert "nome_lote" in response["error"]
+
+
+def test_bills_reject_unknown_fields():
+    response, status = unit_service.get_bills_for_unit_service(None, 1, 1, fields="total_conta_rs,senha_usuario")
+    assert status == 400
+    assert "senha_usuario" in response["error"]
+
+
+def test_bills_projection_returns_only_requested_fields(pg_session, monkeypatch):
+    db = pg_session
+    monkeypatch.setattr(access_service, "user_has_unit_access", lambda db, user_id, unit_id: True)
+    db.add(Unit(codigo_lote=1))
+    db.flush()
+    db.add(WaterBill(id="b1", codigo_lote=1, data_ref=date(2024, 3, 1), data_display="Mar-2024", total_conta_rs=12.5))
+    db.commit()
+
+    response, status = unit_service.get_bills_for_unit_service(db, 1, 1, fields="total_conta_rs")
+
+    assert status == 200
+    assert response == [{"total_conta_rs": 12.5}]
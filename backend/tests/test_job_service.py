@@ -0,0 +1,53 @@
+# backend/tests/test_job_service.py
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import inspect
+
+from backend.models import PipelineJob
+from backend.services import job_service
+from backend.tests.conftest import auth_header
+
+
+def test_migration_creates_jobs_table_like_the_model(pg_engine):
+    columns = {c["name"] for c in inspect(pg_engine).get_columns(PipelineJob.__tablename__)}
+    assert columns == {c.name for c in PipelineJob.__table__.c}
+
+
+def test_job_endpoint_returns_changed_and_removed_units(pg_app, pg_session):
+    pg_session.add(PipelineJob(
+        id="job-1", user_id=7, status="done", status_code=200, logs=[],
+        result={"message": "ok", "data": [], "changed_units": [3, 5], "removed_units": [9]},
+    ))
+    pg_session.commit()
+
+    response = pg_app.test_client().get("/api/jobs/job-1", headers=auth_header(pg_app, user_id=7))
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["changed_units"] == [3, 5]
+    assert body["removed_units"] == [9]
+
+
+def test_stale_running_job_is_marked_failed(pg_app, pg_session):
+    started = datetime.now(timezone.utc) - timedelta(seconds=job_service.PIPELINE_JOB_STALE_SECONDS + 60)
+    pg_session.add(PipelineJob(id="job-2", user_id=7, status="running", logs=[], started_at=started))
+    pg_session.commit()
+
+    response = pg_app.test_client().get("/api/jobs/job-2", headers=auth_header(pg_app, user_id=7))
+
+    body = response.get_json()
+    assert body["status"] == "failed"
+    assert body["error"]
+    assert body["finished_at"] is not None
+
+
+def test_running_job_with_recent_progress_is_kept(pg_app, pg_session):
+    started = datetime.now(timezone.utc) - timedelta(seconds=job_service.PIPELINE_JOB_STALE_SECONDS + 60)
+    logs = [{"status": "OK", "message": "Fase 1", "elapsed_s": job_service.PIPELINE_JOB_STALE_SECONDS}]
+    pg_session.add(PipelineJob(id="job-3", user_id=7, status="running", logs=logs, started_at=started))
+    pg_session.commit()
+
+    response = pg_app.test_client().get("/api/jobs/job-3", headers=auth_header(pg_app, user_id=7))
+
+    assert response.get_json()["status"] == "running"
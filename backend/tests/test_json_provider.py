@@ -0,0 +1,57 @@
+# backend/tests/test_json_provider.py
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from backend import json_provider
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def provider(request, app, monkeypatch):
+    if request.param == "orjson":
+        if json_provider.orjson is None:
+            pytest.skip("orjson não instalado")
+    else:
+        monkeypatch.setattr(json_provider, "orjson", None)
+    return app.json
+
+
+@pytest.fixture(scope="module")
+def row():
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        yield conn.execute(text("SELECT 7 AS codigo_lote, 'Casa 7' AS nome_lote")).first()
+    engine.dispose()
+
+
+def test_serializes_decimal_dates_and_rows(provider, row):
+    payload = {
+        "total": Decimal("12.50"),
+        "data_ref": date(2024, 3, 1),
+        "lida_em": datetime(2024, 3, 1, 10, 30),
+        "row": row,
+        "rows": [row],
+    }
+
+    assert json.loads(provider.dumps(payload)) == {
+        "total": 12.5,
+        "data_ref": "2024-03-01",
+        "lida_em": "2024-03-01T10:30:00",
+        "row": {"codigo_lote": 7, "nome_lote": "Casa 7"},
+        "rows": [{"codigo_lote": 7, "nome_lote": "Casa 7"}],
+    }
+
+
+def test_unknown_types_still_fail(provider):
+    with pytest.raises(TypeError):
+        provider.dumps({"value": object()})
+
+
+def test_jsonify_uses_the_provider(app):
+    with app.app_context():
+        response = app.json.response({"total": Decimal("1.10")})
+    assert response.get_json() == {"total": 1.1}
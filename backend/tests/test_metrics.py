@@ -0,0 +1,18 @@
+# backend/tests/test_metrics.py
+
+from backend.auth import decorators
+from backend.tests.conftest import auth_header
+
+
+def test_metrics_export_token_cache_stats(app):
+    client = app.test_client()
+    # A segunda requisição com o mesmo token é servida pela cache
+    for _ in range(2):
+        client.get("/api/admin/db-pool", headers=auth_header(app))
+
+    body = client.get("/metrics").get_data(as_text=True)
+
+    hits = decorators.token_cache_stats()["hits"]
+    assert hits >= 1
+    assert f'app_cache_hits_total{{cache="token"}} {float(hits)}' in body
+    assert 'app_cache_entries{cache="unit_access"}' in body
@@ -0,0 +1,45 @@
+# backend/tests/test_migrations.py
+
+from datetime import date
+
+from sqlalchemy import text
+
+from backend.migrations import _index_is_valid, apply_migrations
+
+
+def _seed_bills(conn, units=200, months=24):
+    conn.execute(text("INSERT INTO newtab_lotes (codigo_lote) SELECT g FROM generate_series(1, :n) g"), {"n": units})
+    conn.execute(text(
+        "INSERT INTO newtab_agua_cobranca (id, codigo_lote, data_ref, data_display, total_conta_rs, consumo_medido_m3) "
+        "SELECT l || '-' || m, l, DATE '2022-01-01' + make_interval(months => m), 'x', l * 1.5, l "
+        "FROM generate_series(1, :units) l, generate_series(0, :months - 1) m"
+    ), {"units": units, "months": months})
+    conn.execute(text("ANALYZE newtab_agua_cobranca"))
+
+
+def test_month_range_filter_uses_covering_index(pg_engine):
+    with pg_engine.begin() as conn:
+        _seed_bills(conn)
+        plan = "\n".join(conn.execute(text(
+            "EXPLAIN SELECT codigo_lote, total_conta_rs, consumo_medido_m3 FROM newtab_agua_cobranca "
+            "WHERE data_ref >= :start AND data_ref < :next_month"
+        ), {"start": date(2023, 5, 1), "next_month": date(2023, 6, 1)}).scalars())
+        conn.execute(text("TRUNCATE newtab_agua_cobranca, newtab_lotes CASCADE"))
+
+    assert "ix_agua_cobranca_data_ref_lote" in plan
+    assert "Seq Scan" not in plan
+
+
+def test_invalid_concurrent_index_is_rebuilt(pg_engine):
+    with pg_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # Simula um CREATE INDEX CONCURRENTLY interrompido
+        conn.execute(text(
+            "UPDATE pg_index SET indisvalid = false WHERE indexrelid = to_regclass('ix_producao_data_ref')"
+        ))
+        conn.execute(text("DELETE FROM schema_migrations WHERE version = '001'"))
+        assert _index_is_valid(conn, "ix_producao_data_ref") is False
+
+    assert apply_migrations(pg_engine) == ["001"]
+
+    with pg_engine.connect() as conn:
+        assert _index_is_valid(conn, "ix_producao_data_ref") is True
@@ -0,0 +1,50 @@
+# backend/tests/test_password_hasher.py
+
+import threading
+
+import pytest
+
+from backend.services import auth_service, password_hasher
+from backend.services.password_hasher import BoundedHasher, HashingOverloaded
+
+
+def test_slow_hash_is_reported_as_overloaded():
+    hasher = BoundedHasher(workers=1, queue_limit=0, timeout=0.05)
+    release = threading.Event()
+    try:
+        with pytest.raises(HashingOverloaded):
+            hasher.run(release.wait)
+        assert hasher.timed_out == 1
+    finally:
+        release.set()
+        hasher._executor.shutdown(wait=True)
+
+
+def test_login_returns_503_when_hash_times_out(monkeypatch):
+    hasher = BoundedHasher(workers=1, queue_limit=0, timeout=0.05)
+    release = threading.Event()
+    monkeypatch.setattr(password_hasher, "_hasher", hasher)
+    monkeypatch.setattr(password_hasher, "check_password_hash", lambda *_: release.wait())
+
+    class _User:
+        senha_usuario = "hash"
+
+    class _Query:
+        def filter_by(self, **_):
+            return self
+
+        def first(self):
+            return _User()
+
+    class _Session:
+        def query(self, _):
+            return _Query()
+
+    try:
+        _, status = auth_service.login_user_service(
+            _Session(), {"email_usuario": "a@b.c", "senha_usuario": "x"}, "segredo"
+        )
+        assert status == 503
+    finally:
+        release.set()
+        hasher._executor.shutdown(wait=True)
@@ -0,0 +1,143 @@
+# backend/tests/test_reading_service.py
+
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+from backend.api.schemas import ProcessReadingsPayload
+from backend.models import TempWaterBill, Unit
+from backend.services import reading_service
+
+DATA_REF = date(2024, 3, 1)
+
+
+def _payload(consumos):
+    return ProcessReadingsPayload(
+        production_data={"data_ref": DATA_REF, "producao_m3": 100, "outros_rs": 50, "compra_rs": 10},
+        unit_readings=[
+            {"codigo_lote": lote, "data_leitura_atual": None, "leitura_atual": 1000 + consumo, "consumo": consumo}
+            for lote, consumo in consumos.items()
+        ],
+    )
+
+
+def _simulate_phases(db):
+    """Preenche colunas calculadas como fariam as Fases 2-4."""
+    db.execute(text(
+        "UPDATE newtemp_agua_cobranca SET total_conta_rs = 99, faixa_agua = 'F2', "
+        "consumo_comprado_m3 = 5, mes_mensagem = 'Consumo na mediana'"
+    ))
+
+
+def _rows(db):
+    return {r.codigo_lote: r for r in db.query(TempWaterBill).filter(TempWaterBill.data_ref == DATA_REF)}
+
+
+def test_rerun_after_unit_removed_reseeds_remaining_rows(pg_session):
+    db = pg_session
+    db.add_all([Unit(codigo_lote=lote, nome_lote=f"Casa {lote}") for lote in (1, 2, 3)])
+    db.commit()
+
+    first = reading_service._step1_prepare_and_store_data(db, _payload({1: 10, 2: 20, 3: 30}))
+    _simulate_phases(db)
+    db.commit()
+    ids = {lote: r.id for lote, r in _rows(db).items()}
+    assert first["inserted"] == [1, 2, 3]
+
+    # Sem a unidade 2, média e mediana continuam 20 mas o total do mês cai para 40
+    second = reading_service._step1_prepare_and_store_data(db, _payload({1: 10, 3: 30}))
+    db.commit()
+
+    assert second == {"inserted": [], "updated": [1, 3], "removed": [2]}
+    rows = _rows(db)
+    assert sorted(rows) == [1, 3]
+    for lote, row in rows.items():
+        assert row.id == ids[lote]
+        assert row.mes_consumo_agua_m3 == 40
+        assert row.mes_consumo_media_m3 == 20 and row.mes_consumo_mediana_m3 == 20
+        # Colunas calculadas voltam ao estado de uma linha recém-inserida
+        assert row.total_conta_rs is None and row.faixa_agua is None
+        assert row.consumo_comprado_m3 == 0 and row.mes_mensagem == ""
+
+
+def _versions(db):
+    """xmin de cada linha do mês: muda sempre que a linha é regravada."""
+    return dict(db.execute(text(
+        "SELECT codigo_lote, xmin::text FROM newtemp_agua_cobranca WHERE data_ref = :d"
+    ), {"d": DATA_REF}).all())
+
+
+def test_identical_rerun_does_not_rewrite_rows(pg_session):
+    db = pg_session
+    db.add_all([Unit(codigo_lote=lote, nome_lote=f"Casa {lote}") for lote in (1, 2)])
+    db.commit()
+
+    reading_service._step1_prepare_and_store_data(db, _payload({1: 10, 2: 20}))
+    _simulate_phases(db)
+    db.commit()
+    versions = _versions(db)
+    again = reading_service._step1_prepare_and_store_data(db, _payload({1: 10, 2: 20}))
+    db.commit()
+
+    assert again == {"inserted": [], "updated": [], "removed": []}
+    assert _versions(db) == versions
+    # Os valores calculados da execução anterior continuam válidos
+    assert all(r.total_conta_rs == 99 for r in _rows(db).values())
+
+
+def test_reseed_all_resets_unchanged_rows(pg_session):
+    db = pg_session
+    db.add_all([Unit(codigo_lote=lote, nome_lote=f"Casa {lote}") for lote in (1, 2)])
+    db.commit()
+
+    reading_service._step1_prepare_and_store_data(db, _payload({1: 10, 2: 20}))
+    _simulate_phases(db)
+    db.commit()
+    again = reading_service._step1_prepare_and_store_data(db, _payload({1: 10, 2: 20}), reseed_all=True)
+    db.commit()
+
+    assert again == {"inserted": [], "updated": [], "removed": []}
+    assert all(r.total_conta_rs is None for r in _rows(db).values())
+
+
+@pytest.fixture
+def phase_calls(monkeypatch):
+    """Substitui as Fases 2-4 (procedures do banco) e regista as chamadas."""
+    calls = []
+    for name in ("_step2_run_calculation_rules", "_step3_run_total_rules", "_step4_run_mensagens"):
+        monkeypatch.setattr(reading_service, name, lambda db, data_ref, name=name: calls.append(name))
+    return calls
+
+
+@pytest.mark.parametrize("recalculate, expected_calls", [(False, 0), (True, 3)])
+def test_identical_rerun_skips_month_recalculation(pg_session, phase_calls, recalculate, expected_calls):
+    db = pg_session
+    db.add_all([Unit(codigo_lote=lote, nome_lote=f"Casa {lote}") for lote in (1, 2)])
+    db.commit()
+
+    _, status = reading_service.run_billing_pipeline_service(db, _payload({1: 10, 2: 20}))
+    assert status == 200 and len(phase_calls) == 3
+
+    phase_calls.clear()
+    response, status = reading_service.run_billing_pipeline_service(
+        db, _payload({1: 10, 2: 20}), recalculate=recalculate
+    )
+
+    assert status == 200
+    assert len(phase_calls) == expected_calls
+    assert response["changed_units"] == []
+
+
+def test_new_rows_get_the_model_default_message(pg_session):
+    # O Phase 1 antigo inseria objetos ORM, que recebiam o default '' da coluna
+    db = pg_session
+    db.add(Unit(codigo_lote=1, nome_lote="Casa 1"))
+    db.commit()
+
+    reading_service._step1_prepare_and_store_data(db, _payload({1: 10}))
+    db.commit()
+
+    assert TempWaterBill.__table__.c.mes_mensagem.default.arg == ""
+    assert _rows(db)[1].mes_mensagem == ""
+    assert db.execute(text("SELECT count(*) FROM newtemp_agua_cobranca WHERE mes_mensagem IS NULL")).scalar() == 0
@@ -0,0 +1,48 @@
+# backend/tests/test_report_cache.py
+
+import os
+from datetime import date
+
+from sqlalchemy import text
+
+from backend.reports.report_cache import ReportCache
+from backend.services.report_service import _report_data_version
+
+
+def test_memory_entry_expires_after_ttl(monkeypatch):
+    cache = ReportCache(max_bytes=1024, ttl=60)
+    now = [1000.0]
+    monkeypatch.setattr("backend.reports.report_cache.time.time", lambda: now[0])
+    cache.put(1, "v1", b"pdf")
+
+    now[0] += 59
+    assert cache.get(1, "v1") == b"pdf"
+    now[0] += 2
+    assert cache.get(1, "v1") is None
+
+
+def test_disk_entry_expires_after_ttl(tmp_path):
+    writer = ReportCache(max_bytes=1024, cache_dir=str(tmp_path), ttl=60)
+    writer.put(1, "v1", b"pdf")
+    path = writer._disk_path(1, "v1")
+    os.utime(path, (os.path.getmtime(path) - 120,) * 2)
+
+    # Outro processo: só a camada em disco tem a entrada
+    reader = ReportCache(max_bytes=1024, cache_dir=str(tmp_path), ttl=60)
+    assert reader.get(1, "v1") is None
+
+
+def test_data_version_follows_store_refresh(pg_session):
+    db = pg_session
+    db.execute(text("INSERT INTO newtab_lotes (codigo_lote) VALUES (1), (2)"))
+    db.execute(text(
+        "INSERT INTO newtab_relatorio_24m (codigo_lote, data_ref, updated_at) "
+        "VALUES (1, :d, now() - interval '1 hour'), (2, :d, now() - interval '1 hour')"
+    ), {"d": date(2024, 1, 1)})
+    before = _report_data_version(db, 1)
+
+    # Reprocessar o mês muda a mediana e o ranking de todas as unidades,
+    # mesmo que as contas da unidade 1 fiquem iguais
+    db.execute(text("UPDATE newtab_relatorio_24m SET updated_at = now() WHERE codigo_lote = 2"))
+
+    assert _report_data_version(db, 1) != before
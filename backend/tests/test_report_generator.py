@@ -0,0 +1,35 @@
+# backend/tests/test_report_generator.py
+
+from reportlab.graphics import renderPDF
+
+from backend.reports.report_generator import create_unit_report_pdf, generate_consumption_drawing
+
+
+def _unit_without_readings():
+    """Linha do relatório de 24 meses de uma unidade sem leituras no período."""
+    data = {"codigo_lote": 101}
+    for i in range(1, 25):
+        data[f"mes{i:02d}_data_display"] = f"M{i:02d}"
+        for field in ("consumo", "mediana", "ranking", "total_conta", "mensagem"):
+            data[f"mes{i:02d}_{field}"] = None
+    return data
+
+
+def test_drawing_without_any_values_renders_placeholder():
+    drawing = generate_consumption_drawing([None] * 3, [None] * 3, ["a", "b", "c"], "101")
+    assert renderPDF.drawToString(drawing).startswith(b"%PDF")
+
+
+def test_drawing_skips_series_without_values():
+    drawing = generate_consumption_drawing([10, 12, None], [None] * 3, ["a", "b", "c"], "101")
+    assert renderPDF.drawToString(drawing).startswith(b"%PDF")
+
+
+def test_pdf_for_unit_without_data():
+    unit_data = _unit_without_readings()
+    labels = [unit_data[f"mes{i:02d}_data_display"] for i in range(24, 0, -1)]
+    drawing = generate_consumption_drawing([None] * 24, [None] * 24, labels, "101")
+
+    pdf = create_unit_report_pdf(unit_data, drawing).getvalue()
+
+    assert pdf.startswith(b"%PDF")
@@ -0,0 +1,55 @@
+# backend/tests/test_report_routes.py
+
+import pytest
+from werkzeug.test import EnvironBuilder
+
+from backend.services import report_service
+from backend.tests.conftest import auth_header
+
+
+@pytest.fixture
+def streamed_session(monkeypatch):
+    """Substitui a consulta do relatório e conta os fechos da sessão usada."""
+    state = {"closes": 0, "started": False}
+
+    def fake_stream(db):
+        original_close = db.close
+
+        def close():
+            state["closes"] += 1
+            original_close()
+
+        db.close = close
+
+        def chunks():
+            state["started"] = True
+            yield [{"codigo_lote": 1}]
+
+        return ["codigo_lote"], chunks()
+
+    monkeypatch.setattr(report_service, "stream_24m_report_data", fake_stream)
+    return state
+
+
+def test_session_closed_when_stream_is_never_iterated(pg_app, streamed_session):
+    # Servidor WSGI cujo cliente desliga antes do primeiro bloco: o corpo
+    # é fechado sem nunca ser iterado
+    environ = EnvironBuilder(
+        path="/api/reports/24m", query_string="format=ndjson", headers=auth_header(pg_app)
+    ).get_environ()
+    statuses = []
+    body = pg_app.wsgi_app(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    body.close()
+
+    assert statuses == ["200 OK"]
+    assert streamed_session["started"] is False
+    assert streamed_session["closes"] >= 1
+
+
+def test_session_closed_after_full_stream(pg_app, streamed_session):
+    response = pg_app.test_client().get("/api/reports/24m?format=ndjson", headers=auth_header(pg_app))
+
+    assert response.get_data(as_text=True) == '{"codigo_lote":1}\n'
+    response.close()
+
+    assert streamed_session["closes"] >= 1
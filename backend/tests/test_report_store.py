@@ -0,0 +1,68 @@
+# backend/tests/test_report_store.py
+
+from datetime import date
+
+import pytest
+from sqlalchemy import inspect, text
+
+from backend.models import report_24m_store
+from backend.services import report_store
+
+
+def test_migration_creates_store_table_like_the_model(pg_engine):
+    columns = {c["name"] for c in inspect(pg_engine).get_columns(report_24m_store.name)}
+    assert columns == {c.name for c in report_24m_store.c}
+
+
+@pytest.fixture
+def legacy_view(pg_session):
+    """Tabela com o nome e as colunas de vw_relatorio_24m (sem data_ref)."""
+    pg_session.execute(text(
+        "CREATE TABLE vw_relatorio_24m AS SELECT * FROM newtab_relatorio_24m WITH NO DATA"
+    ))
+    pg_session.execute(text("ALTER TABLE vw_relatorio_24m DROP COLUMN data_ref, DROP COLUMN updated_at"))
+    pg_session.execute(text("INSERT INTO newtab_lotes (codigo_lote) VALUES (1), (2), (3)"))
+    yield pg_session
+    pg_session.rollback()
+    pg_session.execute(text("DROP TABLE IF EXISTS vw_relatorio_24m"))
+    pg_session.commit()
+
+
+def _store(db, *lotes):
+    for lote in lotes:
+        db.execute(text(
+            "INSERT INTO newtab_relatorio_24m (codigo_lote, data_ref, mes01_consumo) VALUES (:l, :d, 10)"
+        ), {"l": lote, "d": date(2024, 1, 1)})
+
+
+def _view(db, *lotes):
+    for lote in lotes:
+        db.execute(text("INSERT INTO vw_relatorio_24m (codigo_lote, mes01_consumo) VALUES (:l, 10)"), {"l": lote})
+
+
+def test_check_is_consistent_when_both_sides_match(legacy_view):
+    _store(legacy_view, 1, 2)
+    _view(legacy_view, 1, 2)
+    assert report_store.check_report_store(legacy_view)["consistent"] is True
+
+
+def test_check_reports_units_present_on_one_side_only(legacy_view):
+    _store(legacy_view, 1, 2)
+    _view(legacy_view, 2, 3)
+
+    result = report_store.check_report_store(legacy_view)
+
+    assert result["consistent"] is False
+    assert result["missing_in_store"] == [3]
+    assert result["missing_in_view"] == [1]
+
+
+def test_check_reports_columns_missing_in_view(legacy_view):
+    legacy_view.execute(text("ALTER TABLE vw_relatorio_24m DROP COLUMN mes24_mensagem"))
+    _store(legacy_view, 1)
+    _view(legacy_view, 1)
+
+    result = report_store.check_report_store(legacy_view)
+
+    assert result["consistent"] is False
+    assert result["columns_missing_in_view"] == ["mes24_mensagem"]
@@ -0,0 +1,26 @@
+# backend/tests/test_rolling_stats.py
+
+from datetime import date
+
+from sqlalchemy import inspect
+
+from backend.models import ConsumptionWindow, Unit
+from backend.services import rolling_stats
+
+
+def test_migration_creates_window_table_like_the_model(pg_engine):
+    columns = {c["name"] for c in inspect(pg_engine).get_columns(ConsumptionWindow.__tablename__)}
+    assert columns == {c.name for c in ConsumptionWindow.__table__.c}
+
+
+def test_apply_month_averages_previous_months(pg_session):
+    db = pg_session
+    db.add(Unit(codigo_lote=1, nome_lote="Casa 1"))
+    db.commit()
+
+    for month, consumo in enumerate((10, 20, 30), start=1):
+        averages = rolling_stats.apply_month(db, date(2024, month, 1), {1: consumo})
+    db.commit()
+
+    # Março: média dos meses anteriores (jan e fev)
+    assert averages[1] == (15, 15)
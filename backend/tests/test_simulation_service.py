@@ -0,0 +1,86 @@
+# backend/tests/test_simulation_service.py
+
+from datetime import date
+
+import pytest
+
+from backend.api.schemas import TariffSimulationPayload
+from backend.models import Tariff, Unit, WaterBill
+from backend.services import simulation_service, tariff_index
+from backend.tests.conftest import auth_header
+
+# Até 10 m³ a 1,00/m³; acima, 2,00/m³ com 10,00 a deduzir (contínua em 10 m³)
+BANDS = [
+    {"faixa": "F1", "consumo_inicial": 0, "consumo_final": 10, "valor_m3": 1.0},
+    {"faixa": "F2", "consumo_inicial": 11, "consumo_final": None, "valor_m3": 2.0, "parcela_deduzir": 10.0},
+]
+
+
+def _payload(tariff=BANDS, **extra):
+    return TariffSimulationPayload(start_month=date(2024, 3, 1), end_month=date(2024, 3, 1), tariff=tariff, **extra)
+
+
+@pytest.fixture
+def billed_month(pg_session):
+    db = pg_session
+    tariff_index.invalidate_tariff_index()
+    db.add_all([Unit(codigo_lote=1), Unit(codigo_lote=2)])
+    db.add_all([Tariff(vigente=True, **{"parcela_deduzir": 0.0, **band}) for band in BANDS])
+    db.flush()
+    # Produção cobre todo o consumo: sem água comprada nem outros gastos a ratear
+    db.add_all([
+        WaterBill(id=f"b{lote}", codigo_lote=lote, data_ref=date(2024, 3, 1), data_display="Mar-2024",
+                  consumo_medido_m3=consumo, total_conta_rs=total, mes_producao_agua_m3=1000,
+                  mes_compra_agua_rs=0, mes_outros_gastos_rs=0)
+        for lote, consumo, total in ((1, 5, 10.0), (2, 15, 30.0))
+    ])
+    db.commit()
+    yield db
+    tariff_index.invalidate_tariff_index()
+
+
+def test_simulation_against_known_bands(billed_month):
+    response, status = simulation_service.simulate_tariff_service(billed_month, _payload())
+
+    assert status == 200
+    # Água e esgoto pela mesma tabela: 5 m³ -> 5 + 5; 15 m³ -> (30 - 10) x 2
+    units = {u["codigo_lote"]: u for u in response["units"]}
+    assert units[1]["simulated_rs"] == 10.0 and units[1]["delta_rs"] == 0.0
+    assert units[2]["simulated_rs"] == 40.0 and units[2]["delta_rs"] == 10.0
+    assert units[2]["delta_pct"] == pytest.approx(33.33)
+    month = response["months"][0]
+    assert month["baseline_rs"] == month["simulated_rs"] == 50.0
+    assert response["totals"] == {"actual_rs": 40.0, "simulated_rs": 50.0, "delta_rs": 10.0}
+
+
+def test_separate_sewage_tariff(billed_month):
+    sewage = [{"faixa": "E", "consumo_inicial": 0, "consumo_final": None, "valor_m3": 0.5}]
+    response, _ = simulation_service.simulate_tariff_service(billed_month, _payload(sewage_tariff=sewage))
+
+    units = {u["codigo_lote"]: u for u in response["units"]}
+    assert units[1]["simulated_rs"] == 7.5
+    assert units[2]["simulated_rs"] == 27.5
+
+
+@pytest.mark.parametrize("tariff", [
+    [{"faixa": "A", "consumo_inicial": 0, "consumo_final": 10, "valor_m3": 1},
+     {"faixa": "B", "consumo_inicial": 20, "consumo_final": None, "valor_m3": 2}],
+    [{"faixa": "A", "consumo_inicial": 0, "consumo_final": 10, "valor_m3": 1},
+     {"faixa": "B", "consumo_inicial": 5, "consumo_final": None, "valor_m3": 2}],
+    [{"faixa": "A", "consumo_inicial": 0, "consumo_final": None, "valor_m3": 1},
+     {"faixa": "B", "consumo_inicial": 10, "consumo_final": None, "valor_m3": 2}],
+])
+def test_invalid_band_definitions_are_rejected(pg_session, tariff):
+    response, status = simulation_service.simulate_tariff_service(pg_session, _payload(tariff=tariff))
+
+    assert status == 400
+    assert response["error"].startswith("Tabela de tarifas inválida")
+
+
+def test_route_rejects_empty_tariff_and_non_admins(pg_app):
+    client = pg_app.test_client()
+    body = {"start_month": "2024-03-01", "end_month": "2024-03-01", "tariff": []}
+
+    assert client.post("/api/simulations/tariff", json=body, headers=auth_header(pg_app)).status_code == 403
+    response = client.post("/api/simulations/tariff", json=body, headers=auth_header(pg_app, profile="admin"))
+    assert response.status_code == 422
@@ -0,0 +1,13 @@
+# backend/tests/test_startup.py
+
+from backend.benchmarks import startup
+
+
+def test_create_app_does_not_load_heavy_modules():
+    env = dict(startup.os.environ)
+    for key, default in (("DB_USER", "test"), ("DB_PASSWORD", "test"), ("DB_HOST", "localhost"),
+                         ("DB_PORT", "5432"), ("DB_NAME", "test")):
+        env.setdefault(key, default)
+
+    # Processo novo: os testes deste processo já podem ter importado o numpy
+    assert startup._run_once(env)["loaded"] == []
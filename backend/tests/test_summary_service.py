@@ -0,0 +1,72 @@
+# backend/tests/test_summary_service.py
+
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+from backend.api.schemas import ProcessReadingsPayload
+from backend.models import Unit, WaterBill
+from backend.services import reading_service, summary_service
+from backend.tests.conftest import auth_header
+
+MONTH = date(2024, 3, 1)
+URL = "/api/monthly-summary/2024-03"
+
+
+@pytest.fixture
+def month_bills(pg_session):
+    db = pg_session
+    summary_service._summary_cache.clear()
+    db.add_all([Unit(codigo_lote=lote, nome_lote=f"Casa {lote}", codinome01=f"C{lote}") for lote in (1, 2)])
+    db.flush()
+    db.add_all([
+        WaterBill(id=f"b{lote}", codigo_lote=lote, data_ref=MONTH, data_display="Mar-2024",
+                  consumo_medido_m3=10 * lote, total_conta_rs=25.0 * lote)
+        for lote in (1, 2)
+    ])
+    db.commit()
+    yield db
+    summary_service._summary_cache.clear()
+
+
+def _costs(response):
+    return {u["codigo_lote"]: u["cost_rs"] for u in response.get_json()["unit_details"]}
+
+
+def test_matching_etag_returns_304(pg_app, month_bills):
+    client, headers = pg_app.test_client(), auth_header(pg_app)
+
+    first = client.get(URL, headers=headers)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    again = client.get(URL, headers={**headers, "If-None-Match": etag})
+    assert again.status_code == 304
+    stale = client.get(URL, headers={**headers, "If-None-Match": '"outra-versao"'})
+    assert stale.status_code == 200 and stale.headers["ETag"] == etag
+
+
+def test_summary_is_cached_until_the_pipeline_runs(pg_app, month_bills, monkeypatch):
+    client, headers = pg_app.test_client(), auth_header(pg_app)
+    etag = client.get(URL, headers=headers).headers["ETag"]
+
+    # Alteração direta no banco: a cache continua a servir o resumo anterior
+    month_bills.execute(text("UPDATE newtab_agua_cobranca SET total_conta_rs = 99 WHERE codigo_lote = 1"))
+    month_bills.commit()
+    cached = client.get(URL, headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+
+    # Uma execução do pipeline para o mês invalida a entrada
+    for name in ("_step2_run_calculation_rules", "_step3_run_total_rules", "_step4_run_mensagens"):
+        monkeypatch.setattr(reading_service, name, lambda db, data_ref: None)
+    payload = ProcessReadingsPayload(
+        production_data={"data_ref": MONTH, "producao_m3": 30, "outros_rs": 0, "compra_rs": 0},
+        unit_readings=[{"codigo_lote": 1, "data_leitura_atual": None, "leitura_atual": 10, "consumo": 10}],
+    )
+    _, status = reading_service.run_billing_pipeline_service(month_bills, payload)
+    assert status == 200
+
+    fresh = client.get(URL, headers={**headers, "If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert _costs(fresh)[1] == 99.0
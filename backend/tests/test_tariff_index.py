@@ -0,0 +1,130 @@
+# backend/tests/test_tariff_index.py
+
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from backend.services import tariff_index
+from backend.services.tariff_index import TariffBands, TariffIndex
+
+
+def _band(faixa, inicial, final, valor, deduzir=0.0, start=None, end=None, vigente=False):
+    return SimpleNamespace(
+        faixa=faixa, consumo_inicial=inicial, consumo_final=final, valor_m3=valor,
+        parcela_deduzir=deduzir, data_vigencia=start, data_fim_vigencia=end, vigente=vigente,
+    )
+
+
+def _table(start, end, valor, vigente=False):
+    """Tabela de três faixas (0-10, 11-20, 21+) com preços base, 2x e 3x."""
+    return [
+        _band("F1", 0, 10, valor, start=start, end=end, vigente=vigente),
+        _band("F2", 11, 20, valor * 2, 5.0, start=start, end=end, vigente=vigente),
+        _band("F3", 21, None, valor * 3, 15.0, start=start, end=end, vigente=vigente),
+    ]
+
+
+@pytest.fixture
+def index():
+    return TariffIndex(
+        _table(datetime(2023, 1, 1), datetime(2023, 12, 31, 23, 59), 1.0)
+        + _table(datetime(2024, 1, 1), None, 2.0, vigente=True)
+    )
+
+
+# --- Faixas ---
+
+@pytest.mark.parametrize("consumo, faixa", [
+    (0, "F1"), (10, "F1"), (10.5, "F1"), (11, "F2"), (20, "F2"), (21, "F3"), (1000, "F3"),
+    (-5, "F1"),
+])
+def test_band_boundaries(consumo, faixa):
+    bands = TariffBands.from_rows(_table(None, None, 1.0))
+    assert bands.lookup(consumo)["faixa"] == faixa
+
+
+def test_classify_matches_single_lookups():
+    bands = TariffBands.from_rows(_table(None, None, 1.0))
+    consumos = np.array([0, 10, 11, 20, 21, 50], dtype=np.float64)
+    assert [bands.faixa[i] for i in bands.classify(consumos)] == [bands.lookup(c)["faixa"] for c in consumos]
+
+
+def test_bands_sharing_a_boundary_are_accepted():
+    bands = TariffBands.from_rows([
+        {"faixa": "A", "consumo_inicial": 0, "consumo_final": 10, "valor_m3": 1},
+        {"faixa": "B", "consumo_inicial": 10, "consumo_final": None, "valor_m3": 2},
+    ])
+    assert bands.lookup(9)["faixa"] == "A" and bands.lookup(10)["faixa"] == "B"
+
+
+@pytest.mark.parametrize("rows, message", [
+    ([("A", 0, 10), ("B", 15, None)], "Lacuna"),
+    ([("A", 0, 10), ("B", 5, None)], "sobrepõem"),
+    ([("A", 0, None), ("B", 10, None)], "não é a última"),
+    ([("A", 10, 5)], "termina antes"),
+    ([], "Nenhuma faixa"),
+])
+def test_invalid_band_definitions_are_rejected(rows, message):
+    with pytest.raises(ValueError, match=message):
+        TariffBands.from_rows([
+            {"faixa": f, "consumo_inicial": i, "consumo_final": fim, "valor_m3": 1} for f, i, fim in rows
+        ])
+
+
+# --- Janelas de vigência ---
+
+@pytest.mark.parametrize("on_date, valor", [
+    (date(2023, 1, 1), 1.0),
+    (date(2023, 12, 31), 1.0),
+    (date(2024, 1, 1), 2.0),
+    (date(2030, 6, 1), 2.0),
+])
+def test_window_selection(index, on_date, valor):
+    assert index.lookup(5, on_date)["valor_m3"] == valor
+
+
+def test_date_before_every_window_uses_current_bands(index):
+    assert index.lookup(5, date(2020, 1, 1))["valor_m3"] == 2.0
+
+
+def test_date_outside_every_window_without_current_bands_fails():
+    only_2023 = TariffIndex(_table(datetime(2023, 1, 1), datetime(2023, 12, 31), 1.0))
+    with pytest.raises(LookupError):
+        only_2023.bands_for(date(2024, 2, 1))
+
+
+def test_classify_returns_aligned_arrays(index):
+    result = index.classify([5, 15, 25], date(2024, 3, 1))
+    assert list(result["faixa"]) == ["F1", "F2", "F3"]
+    assert result["valor_m3"].tolist() == [2.0, 4.0, 6.0]
+    assert result["parcela_deduzir"].tolist() == [0.0, 5.0, 15.0]
+
+
+# --- Cache do índice ---
+
+class _FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def query(self, model):
+        return SimpleNamespace(all=lambda: self.rows)
+
+
+def test_revalidate_picks_up_changes_made_elsewhere(monkeypatch):
+    fingerprint = ["v1"]
+    monkeypatch.setattr(tariff_index, "_fingerprint", lambda db: fingerprint[0])
+    monkeypatch.setattr(tariff_index, "TARIFF_INDEX_TTL", 3600)
+    tariff_index.invalidate_tariff_index()
+    db = _FakeSession(_table(None, None, 1.0, vigente=True))
+    try:
+        first = tariff_index.get_tariff_index(db)
+
+        # Alteração feita noutro processo: dentro do TTL, só o pipeline a vê
+        db.rows = _table(None, None, 9.0, vigente=True)
+        fingerprint[0] = "v2"
+        assert tariff_index.get_tariff_index(db) is first
+        assert tariff_index.get_tariff_index(db, revalidate=True).lookup(5, date(2024, 1, 1))["valor_m3"] == 9.0
+    finally:
+        tariff_index.invalidate_tariff_index()
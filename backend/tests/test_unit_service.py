@@ -0,0 +1,37 @@
+# backend/tests/test_unit_service.py
+
+import pytest
+
+from backend.services import access_service, unit_service
+from backend.services.pagination import encode_cursor
+
+
+@pytest.fixture
+def unit_access(monkeypatch):
+    monkeypatch.setattr(access_service, "user_has_unit_access", lambda db, user_id, unit_id: True)
+
+
+@pytest.mark.parametrize("position", [
+    {"d": "2024-01-01", "i": 7},
+    {"d": "2024-01-01", "i": None},
+    {"d": "2024-01-01", "i": ["x"]},
+    {"d": "2024-01-01", "i": "x" * 37},
+    {"d": "2024-01-01"},
+    {"d": 20240101, "i": 1},
+])
+def test_tampered_cursor_is_rejected(pg_session, unit_access, position):
+    response, status = unit_service.get_bills_for_unit_service(
+        pg_session, 1, 1, limit=10, cursor=encode_cursor(position)
+    )
+
+    assert status == 400
+    assert response == {"error": "Cursor inválido."}
+
+
+def test_valid_cursor_returns_page(pg_session, unit_access):
+    response, status = unit_service.get_bills_for_unit_service(
+        pg_session, 1, 1, limit=10, cursor=encode_cursor({"d": "2024-01-01", "i": "c0a8-0001"})
+    )
+
+    assert status == 200
+    assert response == {"items": [], "next_cursor": None}
@@ -109,8 +109,14 @@ const MonthlySummaryPanel: React.FC<MonthlySummaryPanelProps> = ({ summaryData,
             {summaryData.unit_details.map(unit => (
               <li key={unit.codigo_lote} className="grid grid-cols-3 gap-1 items-center">
                 <span className="text-slate-700 bg-white p-1  shadow-sm">{unit.display_name}</span> {/* USANDO display_name */}
-                <span className="text-slate-600 bg-white p-1 shadow-sm text-right">{formatCurrency(unit.cost_rs)}</span>
-                <span className="text-slate-600 bg-white p-1  shadow-sm text-right">{MonthlySummaryModel.formatConsumption(unit.consumption_m3)}</span>
+                <span className="text-slate-600 bg-white p-1 shadow-sm text-right">
+                  {formatCurrency(unit.cost_rs)}
+                  {unit.cost_rank != null && <span className="ml-1 text-xs text-slate-400">#{unit.cost_rank}</span>}
+                </span>
+                <span className="text-slate-600 bg-white p-1  shadow-sm text-right">
+                  {MonthlySummaryModel.formatConsumption(unit.consumption_m3)}
+                  {unit.consumption_rank != null && <span className="ml-1 text-xs text-slate-400">#{unit.consumption_rank}</span>}
+                </span>
               </li>
             ))}
           </ul>
@@ -1,5 +1,5 @@
 import React, { useEffect, useReducer, useRef } from 'react';
-import { fetchLatestReadings, submitProcessedReadings, ProcessReadingsPayload, LatestReading } from '../services/apiService';
+import { fetchLatestReadings, submitProcessedReadingsJob, waitForPipelineJob, ProcessReadingsPayload, LatestReading } from '../services/apiService';
 import { modalReducer, initialState, NewReading } from './ProcessReading.state';
 import Step1_ReadingInput from './Step1_ReadingInput';
 import Step2_ResultsDisplay from './Step2_ResultsDisplay';
@@ -122,20 +122,20 @@ const ProcessReadingModal: React.FC<ProcessReadingModalProps> = ({ isOpen, onClo
     };
 
     try {
-      // --- ALTERAÇÃO PRINCIPAL ---
-      // Agora consome a resposta real do backend
-      const result = await submitProcessedReadings(payload);
-      
-      // Adiciona os logs retornados pelo backend ao painel
-      if (result.logs) {
-        dispatch({ type: 'ADD_BACKEND_LOGS', payload: result.logs });
-      }
+      // O pipeline corre como job no backend; acompanhamos o progresso por consulta
+      const { job_id } = await submitProcessedReadingsJob(payload);
+      addLog(`Pipeline colocado na fila (job ${job_id}).`, 'info');
+
+      // Adiciona os logs do backend ao painel à medida que cada fase termina
+      const job = await waitForPipelineJob(job_id, logs => dispatch({ type: 'ADD_BACKEND_LOGS', payload: logs }));
 
       // Se a operação foi bem-sucedida e retornou dados, avança para a próxima etapa
-      if (result.data) {
-        dispatch({ type: 'SUBMIT_SUCCESS', payload: { results: result.data } });
+      if (job.status === 'done' && job.data) {
+        if (job.duration_s !== null) addLog(`Pipeline concluído em ${job.duration_s.toFixed(1)}s.`, 'success');
+        dispatch({ type: 'SUBMIT_SUCCESS', payload: { results: job.data } });
       } else {
         // Se não houver dados, significa que houve um erro no pipeline
+        if (job.error) addLog(`Falha no pipeline: ${job.error}`, 'error');
         dispatch({ type: 'SUBMIT_FAILURE' });
       }
     } catch (err: any) {
@@ -16,7 +16,16 @@ async function authenticatedFetch(url: string, options?: RequestInit): Promise<R
   if (token) {
     headers['Authorization'] = `Bearer ${token}`;
   }
+  // Leitura das próprias escritas: reenvia a última posição de escrita recebida
+  const writeLsn = sessionStorage.getItem('dbWriteLsn');
+  if (writeLsn) {
+    headers['X-DB-Min-LSN'] = writeLsn;
+  }
   const response = await fetch(url, { ...options, headers });
+  const newWriteLsn = response.headers.get('X-DB-Write-LSN');
+  if (newWriteLsn) {
+    sessionStorage.setItem('dbWriteLsn', newWriteLsn);
+  }
   if (!response.ok) {
     const errorBody = await response.json().catch(() => ({ error: `Erro na requisição: ${response.statusText}` }));
     
@@ -80,6 +89,40 @@ export async function getMonthlySummary(yearMonth: string, sortBy?: string, sort
   return response.json();
 }
 
+export interface DistributionStats {
+  count: number;
+  mean?: number;
+  std?: number;
+  min?: number;
+  max?: number;
+  percentiles?: Record<string, number>;
+  histogram?: { edges: number[]; counts: number[] };
+}
+
+export interface ConsumptionDistribution {
+  data_ref: string;
+  closed: boolean;
+  unit_count: number;
+  consumption: DistributionStats;
+  cost: DistributionStats;
+  units: {
+    codigo_lote: number;
+    consumption_m3: number | null;
+    cost_rs: number | null;
+    consumption_rank: number | null;
+    consumption_z: number | null;
+    cost_rank: number | null;
+    cost_z: number | null;
+  }[];
+}
+
+export async function getConsumptionDistribution(yearMonth: string, bins?: number): Promise<ConsumptionDistribution> {
+  let url = `${API_BASE_URL}/api/distribution/${yearMonth}`;
+  if (bins) url += `?bins=${bins}`;
+  const response = await authenticatedFetch(url);
+  return response.json();
+}
+
 export async function generateUnitReportPdf(codigoLote: number, dataRefMes: string): Promise<Blob> {
   const url = `${API_BASE_URL}/api/report/unit/${codigoLote}/${dataRefMes}`;
   const response = await authenticatedFetch(url, { method: 'GET' });
@@ -137,12 +180,20 @@ export interface PipelineResult {
 export interface BackendLog {
     status: 'OK' | 'ERRO';
     message: string;
+    elapsed_s?: number;
+    // Medidas da fase (presentes nas entradas de cada fase do pipeline)
+    phase?: string;
+    duration_ms?: number;
+    rows?: number | null;
+    round_trips?: number;
 }
 
 export interface SubmitReadingsResponse {
     message: string;
     logs: BackendLog[];
     data?: PipelineResult[]; // 'data' é opcional, pode não vir em caso de erro
+    changed_units?: number[]; // unidades cuja conta mudou face à execução anterior do mês
+    removed_units?: number[];
     error?: string;
 }
 
@@ -155,6 +206,58 @@ export async function submitProcessedReadings(payload: ProcessReadingsPayload):
   return response.json();
 }
 
+// --- MODO ASSÍNCRONO DO PIPELINE (JOBS) ---
+export interface PipelineJob {
+    id: string;
+    status: 'queued' | 'running' | 'done' | 'failed';
+    status_code: number | null;
+    data_ref: string | null;
+    engine: string | null;
+    logs: BackendLog[];
+    created_at: string | null;
+    started_at: string | null;
+    finished_at: string | null;
+    duration_s: number | null;
+    message?: string | null;
+    error?: string | null;
+    data?: PipelineResult[] | null;
+    changed_units?: number[] | null;
+    removed_units?: number[] | null;
+}
+
+export async function submitProcessedReadingsJob(payload: ProcessReadingsPayload): Promise<{ job_id: string; status: string; status_url: string }> {
+  const response = await authenticatedFetch(`${API_BASE_URL}/api/process-readings?mode=async`, {
+    method: 'POST',
+    body: JSON.stringify(payload),
+  });
+  return response.json();
+}
+
+export async function fetchPipelineJob(jobId: string): Promise<PipelineJob> {
+  const response = await authenticatedFetch(`${API_BASE_URL}/api/jobs/${jobId}`);
+  return response.json();
+}
+
+// Consulta o job até terminar, repassando apenas os logs novos a cada consulta.
+// Desiste após maxWaitMs; por omissão, um pouco mais que o tempo sem progresso
+// após o qual o backend marca o job como falhado (PIPELINE_JOB_STALE_SECONDS).
+export async function waitForPipelineJob(jobId: string, onNewLogs: (logs: BackendLog[]) => void, intervalMs: number = 1000, maxWaitMs: number = 35 * 60 * 1000): Promise<PipelineJob> {
+  const deadline = Date.now() + maxWaitMs;
+  let seenLogs = 0;
+  for (;;) {
+    const job = await fetchPipelineJob(jobId);
+    if (job.logs.length > seenLogs) {
+      onNewLogs(job.logs.slice(seenLogs));
+      seenLogs = job.logs.length;
+    }
+    if (job.status === 'done' || job.status === 'failed') return job;
+    if (Date.now() >= deadline) {
+      throw new Error(`O job ${jobId} não terminou em ${Math.round(maxWaitMs / 60000)} minutos (último estado: ${job.status}).`);
+    }
+    await new Promise(resolve => setTimeout(resolve, intervalMs));
+  }
+}
+
 export async function getRelatorio24m(): Promise<Relatorio24mModel[]> {
   const response = await authenticatedFetch(`${API_BASE_URL}/api/reports/24m`);
   return response.json();
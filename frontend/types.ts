@@ -63,5 +63,7 @@ export interface MonthlySummary {
     display_name: string;
     cost_rs: number;
     consumption_m3: number;
+    cost_rank: number | null;
+    consumption_rank: number | null;
   }[];
 }